@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Scanner Benchmark - Backends against synthetic listener fleets
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Spawns fleets of local listening sockets (10, 1k, 10k by default) in
+    child processes and measures, for every available backend, the latency,
+    Python memory and subprocess count of `get_processes_on_ports`, plus the
+    throughput of `kill_port` and `kill_all`. Results are written as JSON and
+    can be compared against a previous run to catch regressions. Runs offline
+    on plain Linux; only loopback sockets are used.
+
+Usage:
+    python3 benchmarks/scanners.py --output results.json
+    python3 benchmarks/scanners.py --sizes 10 1000 --compare results.json
+"""
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import argparse
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from port_destroyer import PortDestroyer, SCANNER_BACKENDS  # noqa: E402
+
+# Sockets abiertos por cada proceso de la flota
+SOCKETS_PER_WORKER = 1000
+
+# Descriptores extra que necesita cada proceso además de sus sockets
+FD_HEADROOM = 64
+
+
+def _worker_main(start_port: int, end_port: int, count: int) -> None:
+    """
+    Proceso de la flota: escucha en `count` puertos libres del rango,
+    imprime los puertos obtenidos y espera a que el padre cierre stdin.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = count + FD_HEADROOM
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    sockets = []
+    for port in range(start_port, end_port + 1):
+        if len(sockets) == count:
+            break
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.bind(('127.0.0.1', port))
+            sock.listen(1)
+        except OSError:
+            sock.close()
+            continue
+        sockets.append(sock)
+
+    print(' '.join(str(sock.getsockname()[1]) for sock in sockets), flush=True)
+    sys.stdin.read()
+
+
+class ListenerFleet:
+    """
+    Conjunto de procesos hijos que mantienen sockets en LISTEN.
+
+    Con `per_process=True` cada puerto tiene su propio proceso (para medir
+    kills); si no, los sockets se reparten en bloques de SOCKETS_PER_WORKER.
+    """
+
+    def __init__(self, size: int, base_port: int, per_process: bool = False):
+        self.size = size
+        self.base_port = base_port
+        self.per_process = per_process
+        self.workers: List[subprocess.Popen] = []
+        self.ports: List[int] = []
+
+    def __enter__(self) -> 'ListenerFleet':
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def port_range(self) -> tuple:
+        return (min(self.ports), max(self.ports))
+
+    def start(self) -> None:
+        """Arranca los procesos y espera a que todos estén escuchando"""
+        chunk = 1 if self.per_process else SOCKETS_PER_WORKER
+        next_port = self.base_port
+        remaining = self.size
+
+        while remaining > 0:
+            count = min(chunk, remaining)
+            # Margen para saltar puertos ocupados por otros procesos
+            end_port = min(65535, next_port + count * 2 + 16)
+            worker = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--worker',
+                 str(next_port), str(end_port), str(count)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+            )
+            self.workers.append(worker)
+            ports = [int(port) for port in worker.stdout.readline().split()]
+            if not ports:
+                raise RuntimeError(f"No se pudo abrir ningún puerto desde {next_port}")
+            self.ports.extend(ports)
+            remaining -= len(ports)
+            next_port = ports[-1] + 1
+
+    def stop(self) -> None:
+        """Cierra stdin de los procesos (que salen solos) y los recoge"""
+        for worker in self.workers:
+            try:
+                worker.stdin.close()
+            except OSError:
+                pass
+        for worker in self.workers:
+            try:
+                worker.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+                worker.wait()
+        self.workers = []
+
+
+@contextmanager
+def count_subprocesses():
+    """Cuenta los subprocesos lanzados dentro del bloque"""
+    counter = {'count': 0}
+    original = subprocess.Popen
+
+    class CountingPopen(original):
+        def __init__(self, *args, **kwargs):
+            counter['count'] += 1
+            super().__init__(*args, **kwargs)
+
+    subprocess.Popen = CountingPopen
+    try:
+        yield counter
+    finally:
+        subprocess.Popen = original
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure_scan(backend: str, port_range: tuple, expected: int, rounds: int) -> Dict:
+    """
+    Latencia en frío y en caliente, memoria y subprocesos de un backend.
+
+    Cada backend usa un PortDestroyer nuevo, así que la primera ronda incluye
+    el llenado de sus cachés (índice de inodos, nombres).
+    """
+    destroyer = PortDestroyer(port_range=port_range, backend=backend)
+
+    timings = []
+    with count_subprocesses() as spawned:
+        for _ in range(rounds + 1):
+            start = time.perf_counter()
+            processes = destroyer.get_processes_on_ports()
+            timings.append((time.perf_counter() - start) * 1000)
+    found = len({process.port for process in processes})
+
+    # Memoria en una ronda aparte: tracemalloc ralentiza el escaneo
+    tracemalloc.start()
+    destroyer.get_processes_on_ports()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    warm = timings[1:]
+    return {
+        'cold_ms': timings[0],
+        'median_ms': statistics.median(warm),
+        'p95_ms': _percentile(warm, 0.95),
+        'min_ms': min(warm),
+        'peak_kib': peak / 1024,
+        'subprocesses_per_scan': spawned['count'] / len(timings),
+        'found': found,
+        'expected': expected,
+        'correct': found == expected,
+    }
+
+
+def measure_kill_port(size: int, base_port: int, grace: float) -> Dict:
+    """Tiempo de kill_port sobre `size` procesos de un puerto cada uno"""
+    with ListenerFleet(size, base_port, per_process=True) as fleet:
+        destroyer = PortDestroyer(port_range=fleet.port_range, grace_period=grace)
+        destroyer.resolve_backend()
+        killed = 0
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            start = time.perf_counter()
+            for port in fleet.ports:
+                killed += destroyer.kill_port(port)
+            elapsed = time.perf_counter() - start
+
+    return {
+        'processes': size,
+        'killed': killed,
+        'total_ms': elapsed * 1000,
+        'per_kill_ms': elapsed * 1000 / size,
+        'kills_per_second': killed / elapsed if elapsed else 0.0,
+    }
+
+
+def measure_kill_all(size: int, base_port: int, grace: float) -> Dict:
+    """Tiempo de kill_all sobre `size` procesos de un puerto cada uno"""
+    with ListenerFleet(size, base_port, per_process=True) as fleet:
+        destroyer = PortDestroyer(port_range=fleet.port_range, grace_period=grace)
+        destroyer.resolve_backend()
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            start = time.perf_counter()
+            killed = destroyer.kill_all()
+            elapsed = time.perf_counter() - start
+
+    return {
+        'processes': size,
+        'killed': killed,
+        'total_ms': elapsed * 1000,
+        'kills_per_second': killed / elapsed if elapsed else 0.0,
+    }
+
+
+def run_suite(sizes: List[int], backends: List[str], rounds: int, base_port: int,
+              kill_sizes: List[int], grace: float, quiet: bool = False) -> Dict:
+    """Ejecuta todos los escenarios y devuelve el resultado serializable"""
+    def log(message: str) -> None:
+        if not quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    results = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': sys.version.split()[0],
+            'system': ' '.join(os.uname()[0:3:2]),
+            'cpus': os.cpu_count(),
+            'rounds': rounds,
+            'grace': grace,
+        },
+        'scan': {},
+        'kill_port': {},
+        'kill_all': {},
+    }
+
+    for size in sizes:
+        log(f"[INFO] Flota de {size} listeners...")
+        with ListenerFleet(size, base_port) as fleet:
+            results['scan'][str(size)] = {}
+            for backend in backends:
+                stats = measure_scan(backend, fleet.port_range, len(fleet.ports), rounds)
+                results['scan'][str(size)][backend] = stats
+                log(f"       {backend:<8} {stats['median_ms']:>9.2f} ms"
+                    f"  {'ok' if stats['correct'] else 'INCORRECTO'}")
+
+    for size in kill_sizes:
+        log(f"[INFO] kill_port / kill_all con {size} procesos...")
+        results['kill_port'][str(size)] = measure_kill_port(size, base_port, grace)
+        results['kill_all'][str(size)] = measure_kill_all(size, base_port, grace)
+
+    return results
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compara la mediana de cada escaneo y el total de cada kill con una
+    ejecución anterior. Devuelve las regresiones que superan la tolerancia.
+    """
+    regressions = []
+    rows = []
+    for size, backends in current['scan'].items():
+        for backend, stats in backends.items():
+            old = baseline.get('scan', {}).get(size, {}).get(backend)
+            if old:
+                rows.append((f"scan {size} {backend}", old['median_ms'], stats['median_ms']))
+    for scenario in ('kill_port', 'kill_all'):
+        for size, stats in current[scenario].items():
+            old = baseline.get(scenario, {}).get(size)
+            if old:
+                rows.append((f"{scenario} {size}", old['total_ms'], stats['total_ms']))
+
+    print(f"\n{'Escenario':<24} {'Antes (ms)':<12} {'Ahora (ms)':<12} {'Ratio':<8}")
+    print("-" * 58)
+    for name, before, after in rows:
+        ratio = after / before if before else float('inf')
+        flag = '  <-- regresión' if ratio > tolerance else ''
+        print(f"{name:<24} {before:<12.2f} {after:<12.2f} {ratio:<8.2f}{flag}")
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def print_summary(results: Dict) -> None:
+    """Tablas legibles con el resultado"""
+    print(f"\n{'Listeners':<10} {'Backend':<9} {'Frío (ms)':<11} {'Mediana (ms)':<13} "
+          f"{'p95 (ms)':<10} {'Pico (KiB)':<11} {'Subproc.':<9} {'Correcto':<8}")
+    print("-" * 86)
+    for size, backends in results['scan'].items():
+        for backend, stats in backends.items():
+            correct = 'si' if stats['correct'] else f"NO ({stats['found']}/{stats['expected']})"
+            print(f"{size:<10} {backend:<9} {stats['cold_ms']:<11.2f} {stats['median_ms']:<13.2f} "
+                  f"{stats['p95_ms']:<10.2f} {stats['peak_kib']:<11.1f} "
+                  f"{stats['subprocesses_per_scan']:<9.1f} {correct:<8}")
+
+    if results['kill_port']:
+        print(f"\n{'Procesos':<10} {'kill_port (ms)':<16} {'ms/kill':<9} {'kill_all (ms)':<14} {'kills/s':<8}")
+        print("-" * 60)
+        for size, stats in results['kill_port'].items():
+            all_stats = results['kill_all'][size]
+            print(f"{size:<10} {stats['total_ms']:<16.1f} {stats['per_kill_ms']:<9.2f} "
+                  f"{all_stats['total_ms']:<14.1f} {all_stats['kills_per_second']:<8.1f}")
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--worker':
+        _worker_main(*(int(arg) for arg in sys.argv[2:]))
+        return
+
+    parser = argparse.ArgumentParser(description='Benchmark de backends de escaneo de PortDestroyer')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='Tamaños de flota a escanear (default: 10 1000 10000)')
+    parser.add_argument('--backends', nargs='+', choices=tuple(SCANNER_BACKENDS),
+                        help='Backends a medir (default: todos los disponibles)')
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='Escaneos en caliente por backend (default: 5)')
+    parser.add_argument('--base-port', type=int, default=20000,
+                        help='Primer puerto de las flotas (default: 20000)')
+    parser.add_argument('--kill-sizes', type=int, nargs='*', default=[10, 100],
+                        help='Procesos para medir kill_port/kill_all (default: 10 100)')
+    parser.add_argument('--grace', type=float, default=2.0,
+                        help='Periodo de gracia de los kills (default: 2)')
+    parser.add_argument('--output', metavar='FILE',
+                        help='Guardar el resultado en JSON')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='Comparar con un resultado JSON anterior')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='Ratio a partir del cual --compare marca una regresión (default: 1.25)')
+    args = parser.parse_args()
+
+    available = PortDestroyer().available_backends()
+    backends = [name for name in (args.backends or available) if name in available]
+    if not backends:
+        print("[ERROR] No hay backends disponibles en este sistema")
+        sys.exit(1)
+
+    results = run_suite(args.sizes, backends, args.rounds, args.base_port,
+                        args.kill_sizes, args.grace)
+    print_summary(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[OK] Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n[ERROR] {len(regressions)} regresión(es) por encima de x{args.tolerance:g}")
+            sys.exit(1)
+        print("\n[OK] Sin regresiones")
+
+
+if __name__ == '__main__':
+    main()
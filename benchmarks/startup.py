@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Startup Benchmark - Cold-start latency of the CLI
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Measures what a shell prompt or git hook pays for each `port-destroyer`
+    call: interpreter start, module imports (`python -X importtime`) and the
+    end-to-end wall clock of cold `--list` and `--kill PORT` runs, compared
+    against a latency budget.
+
+Usage:
+    python3 benchmarks/startup.py [--runs 15] [--budget 100] [--json]
+"""
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Equivalente al script de consola `port-destroyer` (usa el .pyc del módulo)
+CLI_CODE = 'from port_destroyer import main; main()'
+
+# Proceso que escucha en un puerto hasta recibir una señal
+LISTENER_CODE = (
+    "import socket, sys, time\n"
+    "s = socket.socket()\n"
+    "s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)\n"
+    "s.bind(('127.0.0.1', int(sys.argv[1])))\n"
+    "s.listen()\n"
+    "print('ready', flush=True)\n"
+    "time.sleep(60)\n"
+)
+
+
+def _run(args, env=None) -> float:
+    """Ejecuta un comando y devuelve su duración en ms"""
+    start = time.perf_counter()
+    subprocess.run(args, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def _free_port() -> int:
+    """Puerto libre elegido por el kernel"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _spawn_listener(port: int) -> subprocess.Popen:
+    """Arranca un listener en el puerto y espera a que esté escuchando"""
+    proc = subprocess.Popen([sys.executable, '-c', LISTENER_CODE, str(port)],
+                            stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()
+    return proc
+
+
+def _summary(samples) -> dict:
+    return {
+        'median_ms': statistics.median(samples),
+        'min_ms': min(samples),
+        'max_ms': max(samples),
+        'runs': len(samples),
+    }
+
+
+def measure_imports() -> dict:
+    """
+    Desglose de `python -X importtime -c "import port_destroyer"`.
+
+    Returns:
+        {'total_us': coste acumulado de port_destroyer,
+         'modules': [(módulo, self_us, cumulative_us), ...] ordenados por coste}
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import port_destroyer'],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    total = next((cumulative for name, _, cumulative in modules if name == 'port_destroyer'), 0)
+    modules.sort(key=lambda module: module[1], reverse=True)
+    return {'total_us': total, 'modules': modules}
+
+
+def measure_startup(runs: int, use_daemon: bool = False) -> dict:
+    """Latencia de extremo a extremo del intérprete vacío, --list y --kill"""
+    cli = [sys.executable, '-c', CLI_CODE]
+    extra = [] if use_daemon else ['--no-daemon']
+
+    # Calentar la caché de disco y la calibración del backend
+    _run(cli + ['--list'] + extra)
+
+    interpreter, listing, kill_idle, kill_live = [], [], [], []
+    for _ in range(runs):
+        interpreter.append(_run([sys.executable, '-c', 'pass']))
+        listing.append(_run(cli + ['--list'] + extra))
+
+        port = _free_port()
+        kill_idle.append(_run(cli + ['--kill', str(port)] + extra))
+
+        listener = _spawn_listener(port)
+        try:
+            kill_live.append(_run(cli + ['--kill', str(port)] + extra))
+        finally:
+            listener.kill()
+            listener.wait()
+
+    return {
+        'interpreter': _summary(interpreter),
+        'list': _summary(listing),
+        'kill_free_port': _summary(kill_idle),
+        'kill_listener': _summary(kill_live),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de arranque del CLI de PortDestroyer')
+    parser.add_argument('--runs', type=int, default=15,
+                        help='Ejecuciones por escenario (default: 15)')
+    parser.add_argument('--budget', type=float, default=100.0, metavar='MS',
+                        help='Presupuesto de --kill PORT en ms (default: 100)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Módulos más costosos a mostrar (default: 10)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Permitir que el CLI consulte al daemon si está activo')
+    parser.add_argument('--json', action='store_true',
+                        help='Imprimir el resultado en JSON')
+    args = parser.parse_args()
+
+    imports = measure_imports()
+    startup = measure_startup(args.runs, args.daemon)
+    within_budget = startup['kill_listener']['median_ms'] <= args.budget
+
+    if args.json:
+        print(json.dumps({
+            'python': sys.version.split()[0],
+            'budget_ms': args.budget,
+            'within_budget': within_budget,
+            'import_total_ms': imports['total_us'] / 1000,
+            'top_imports': [{'module': name, 'self_ms': self_us / 1000,
+                             'cumulative_ms': cumulative_us / 1000}
+                            for name, self_us, cumulative_us in imports['modules'][:args.top]],
+            'startup': startup,
+        }, indent=2))
+    else:
+        print(f"import port_destroyer: {imports['total_us'] / 1000:.1f} ms")
+        print(f"\n{'Módulo':<30} {'Propio (ms)':<12} {'Acumulado (ms)':<14}")
+        print("-" * 58)
+        for name, self_us, cumulative_us in imports['modules'][:args.top]:
+            print(f"{name:<30} {self_us / 1000:<12.2f} {cumulative_us / 1000:<14.2f}")
+
+        print(f"\n{'Escenario':<16} {'Mediana (ms)':<14} {'Mín (ms)':<10} {'Máx (ms)':<10}")
+        print("-" * 52)
+        for scenario, stats in startup.items():
+            print(f"{scenario:<16} {stats['median_ms']:<14.1f} "
+                  f"{stats['min_ms']:<10.1f} {stats['max_ms']:<10.1f}")
+
+        status = '[OK]' if within_budget else '[ERROR]'
+        print(f"\n{status} --kill PORT: {startup['kill_listener']['median_ms']:.1f} ms "
+              f"(presupuesto {args.budget:g} ms)")
+
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == '__main__':
+    main()
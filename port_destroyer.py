@@ -12,26 +12,472 @@ Description:
     Supports both CLI and GUI (system tray) interfaces.
 """
 
+from __future__ import annotations
+
 __author__ = "Jesus Posso"
 __version__ = "1.0.0"
 __license__ = "MIT"
 
-import subprocess
-import platform
-import signal
+import os
 import sys
-from typing import List, Dict, Optional
+import threading
+import time
+
+from port_destroyer_snapshot import (
+    DEFAULT_FIELDS, ListenerEvent, ListenerRecord, Snapshot, diff_events
+)
+from port_destroyer_ports import PortSet, format_ranges
+from port_destroyer_metrics import METRICS, count_subprocess, record_kills
+
+# El CLI se invoca desde prompts y hooks de git, así que el arranque importa:
+# typing, json, subprocess, shutil y argparse solo se cargan cuando hacen
+# falta (ver benchmarks/startup.py)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Iterable, Iterator, List, Dict, Mapping, Optional, Set, Tuple, Union
+    from port_destroyer_netns import NetNamespaceIndex
+
+
+# Tablas de sockets TCP del kernel (Linux)
+PROC_NET_TCP_FILES = ('/proc/net/tcp', '/proc/net/tcp6')
+
+# Estado LISTEN en /proc/net/tcp (ver include/net/tcp_states.h)
+TCP_LISTEN_STATE = '0A'
+
+# Campos que cuestan una consulta extra por proceso (puerto y PID salen del escaneo)
+RESOLVABLE_FIELDS = frozenset(('name', 'user'))
+
+# Histograma de las fases de cada escaneo (ver port_destroyer_metrics)
+SCAN_PHASE_METRIC = 'port_destroyer_scan_phase_seconds'
+
+# PIDs cuyos nombres se resuelven juntos mientras se generan los registros
+NAME_BATCH_SIZE = 64
+
+# Caché en disco del backend elegido por la calibración (texto clave=valor,
+# para leerla sin importar json en cada arranque)
+CALIBRATION_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'port-destroyer', 'backend.cache'
+)
+
+
+def _system_info() -> tuple:
+    """(sistema, release) sin importar platform"""
+    try:
+        uname = os.uname()
+    except AttributeError:
+        import platform
+        return platform.system(), platform.release()
+    return uname.sysname, uname.release
+
+
+class ScannerBackend:
+    """
+    Backend de escaneo registrado.
+    
+    Todos los backends comparten la misma interfaz: un método de PortDestroyer
+    que devuelve la lista de procesos del rango configurado. Los que ejecutan
+    una herramienta externa registran además el método que construye su
+    comando (`argv`) y el que interpreta su salida (`parser`), de modo que
+    AsyncPortDestroyer puede lanzarla sin bloquear el bucle de eventos.
+    """
+    
+    def __init__(self, name: str, platforms: tuple, method: str,
+                 command: Optional[str] = None, path: Optional[str] = None,
+                 module: Optional[str] = None, argv: Optional[str] = None,
+                 parser: Optional[str] = None):
+        self.name = name
+        self.platforms = platforms
+        self.method = method
+        self.command = command
+        self.path = path
+        self.module = module
+        self.argv = argv
+        self.parser = parser
+    
+    def is_available(self, os_type: str) -> bool:
+        """Indica si el backend puede usarse en este sistema"""
+        if os_type not in self.platforms:
+            return False
+        if self.command:
+            import shutil
+            if not shutil.which(self.command):
+                return False
+        if self.path and not os.path.exists(self.path):
+            return False
+        if self.module:
+            try:
+                return bool(__import__(self.module).is_available())
+            except ImportError:
+                return False
+        return True
+
+
+# Registro de backends, en orden de preferencia cuando no hay calibración
+SCANNER_BACKENDS: Dict[str, ScannerBackend] = {}
+
+
+def register_backend(backend: ScannerBackend) -> None:
+    """Registra un backend de escaneo"""
+    SCANNER_BACKENDS[backend.name] = backend
+
+
+register_backend(ScannerBackend('lsof', ('Darwin', 'Linux'), '_get_processes_lsof', command='lsof',
+                                argv='_lsof_argv', parser='_parse_lsof'))
+register_backend(ScannerBackend('ss', ('Linux',), '_get_processes_ss', command='ss',
+                                argv='_ss_argv', parser='_parse_socket_table'))
+register_backend(ScannerBackend('netstat', ('Linux',), '_get_processes_netstat', command='netstat',
+                                argv='_netstat_argv', parser='_parse_socket_table'))
+register_backend(ScannerBackend('proc', ('Linux',), '_get_processes_proc',
+                                path=PROC_NET_TCP_FILES[0]))
+register_backend(ScannerBackend('netlink', ('Linux',), '_get_processes_netlink',
+                                module='port_destroyer_netlink'))
+
+
+class SocketInodeIndex:
+    """
+    Índice persistente inodo de socket -> PID construido desde /proc/<pid>/fd.
+    
+    Entre escaneos solo se vuelven a leer los procesos nuevos o cuyo
+    directorio fd cambió (detectado con stat: el kernel expone el número de
+    descriptores abiertos en st_size). Los PIDs muertos se eliminan y cada
+    consulta de inodo es O(1).
+    """
+    
+    def __init__(self, proc_root: str = '/proc'):
+        self.proc_root = proc_root
+        self._lock = threading.Lock()
+        # pid -> firma (st_ino, st_size) de /proc/<pid>/fd
+        self._signatures: Dict[int, tuple] = {}
+        # pid -> {inodo: fd}
+        self._pid_sockets: Dict[int, Dict[int, str]] = {}
+        # inodo -> (pid, fd)
+        self._owners: Dict[int, tuple] = {}
+        self.stats = {'refreshes': 0, 'rescanned_pids': 0, 'full_scans': 0}
+    
+    def lookup(self, inodes: Set[int]) -> Dict[int, int]:
+        """
+        Devuelve {inodo: pid} para los inodos indicados.
+        
+        Primero actualiza el índice de forma incremental. Si algún inodo sigue
+        sin dueño (p. ej. un proceso cerró y abrió descriptores sin cambiar su
+        número), se releen los procesos restantes hasta encontrarlo.
+        """
+        with self._lock:
+            if not self._signatures:
+                # Índice vacío (p. ej. un único --kill): parar al encontrar todo
+                self._scan_until_found(inodes)
+                return self._resolve(inodes)[0]
+            
+            visited = self._refresh()
+            result, missing = self._resolve(inodes)
+            
+            if missing:
+                self.stats['full_scans'] += 1
+                for pid in list(self._signatures):
+                    if pid in visited:
+                        continue
+                    self._scan_pid(pid)
+                    missing = {i for i in missing if i not in self._owners}
+                    if not missing:
+                        break
+                found, _ = self._resolve(inodes)
+                result.update(found)
+            
+            return result
+    
+    def clear(self) -> None:
+        """Vacía el índice"""
+        with self._lock:
+            self._signatures.clear()
+            self._pid_sockets.clear()
+            self._owners.clear()
+    
+    def _scan_until_found(self, inodes: Set[int]) -> None:
+        """
+        Lee procesos hasta encontrar todos los inodos. Los procesos no
+        visitados quedan sin firma y se leerán en el siguiente refresco.
+        """
+        pending = set(inodes)
+        # Los PIDs más recientes primero: los servidores de desarrollo suelen serlo
+        for entry in reversed(os.listdir(self.proc_root)):
+            if not pending:
+                break
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            try:
+                st = os.stat(f'{self.proc_root}/{entry}/fd')
+            except OSError:
+                continue
+            
+            self._signatures[pid] = (st.st_ino, st.st_size)
+            self._scan_pid(pid)
+            pending.difference_update(self._pid_sockets.get(pid, {}))
+    
+    def _refresh(self) -> Set[int]:
+        """Sincroniza el índice con /proc y devuelve los PIDs releídos"""
+        self.stats['refreshes'] += 1
+        alive = set()
+        visited = set()
+        
+        for entry in os.listdir(self.proc_root):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            try:
+                st = os.stat(f'{self.proc_root}/{entry}/fd')
+            except OSError:
+                continue
+            
+            alive.add(pid)
+            signature = (st.st_ino, st.st_size)
+            if self._signatures.get(pid) != signature:
+                self._signatures[pid] = signature
+                self._scan_pid(pid)
+                visited.add(pid)
+        
+        for pid in [p for p in self._signatures if p not in alive]:
+            self._forget(pid)
+        
+        return visited
+    
+    def _scan_pid(self, pid: int) -> None:
+        """Relee los sockets abiertos por un proceso"""
+        self.stats['rescanned_pids'] += 1
+        fd_dir = f'{self.proc_root}/{pid}/fd'
+        sockets = {}
+        
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            fds = []
+        
+        for fd in fds:
+            try:
+                target = os.readlink(f'{fd_dir}/{fd}')
+            except OSError:
+                continue
+            if target.startswith('socket:['):
+                sockets[int(target[8:-1])] = fd
+        
+        for inode in self._pid_sockets.get(pid, {}):
+            if inode not in sockets and self._owners.get(inode, (None,))[0] == pid:
+                del self._owners[inode]
+        
+        self._pid_sockets[pid] = sockets
+        for inode, fd in sockets.items():
+            self._owners[inode] = (pid, fd)
+    
+    def _forget(self, pid: int) -> None:
+        """Elimina un proceso muerto del índice"""
+        self._signatures.pop(pid, None)
+        for inode in self._pid_sockets.pop(pid, {}):
+            if self._owners.get(inode, (None,))[0] == pid:
+                del self._owners[inode]
+    
+    def _resolve(self, inodes: Set[int]) -> Tuple[Dict[int, int], Set[int]]:
+        """
+        Resuelve inodos con el índice, verificando cada entrada con un
+        readlink del descriptor guardado.
+        """
+        result: Dict[int, int] = {}
+        missing: Set[int] = set()
+        
+        for inode in inodes:
+            owner = self._owners.get(inode)
+            if owner:
+                pid, fd = owner
+                try:
+                    if os.readlink(f'{self.proc_root}/{pid}/fd/{fd}') == f'socket:[{inode}]':
+                        result[inode] = pid
+                        continue
+                except OSError:
+                    pass
+                del self._owners[inode]
+            missing.add(inode)
+        
+        return result, missing
+
+
+class ProcessNameCache:
+    """
+    Caché LRU acotada de nombres de proceso.
+    
+    La clave es (pid, tiempo de inicio del proceso) leída de /proc/<pid>/stat,
+    de modo que un PID reutilizado por otro proceso nunca devuelve un nombre
+    obsoleto. Los nombres se leen de /proc/<pid>/comm y /proc/<pid>/cmdline;
+    sin /proc se hace una única llamada a `ps` para todos los PIDs pendientes.
+    """
+    
+    def __init__(self, maxsize: int = 512, proc_root: str = '/proc'):
+        self.maxsize = maxsize
+        self.proc_root = proc_root
+        # Los dict conservan el orden de inserción: el primero es el menos reciente
+        self._entries: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos y fallos de la caché"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+    
+    def get(self, pid: int) -> str:
+        """Obtiene el nombre de un único proceso"""
+        return self.resolve_many([pid])[pid]
+    
+    def resolve_many(self, pids: Iterable[int]) -> Dict[int, str]:
+        """Devuelve {pid: nombre} resolviendo de una vez todos los PIDs"""
+        names, pending = self.resolve_local(pids)
+        if pending:
+            names.update(self._resolve_with_ps(pending))
+        return names
+    
+    def resolve_local(self, pids: Iterable[int]) -> Tuple[Dict[int, str], List[int]]:
+        """
+        Resuelve desde la caché y /proc, sin lanzar procesos.
+        
+        Returns:
+            ({pid: nombre}, [PIDs que hay que preguntar a `ps`])
+        """
+        names: Dict[int, str] = {}
+        pending: List[int] = []
+        
+        with self._lock:
+            for pid in set(pids):
+                start_time = self._read_start_time(pid)
+                if start_time is None:
+                    pending.append(pid)
+                    continue
+                
+                key = (pid, start_time)
+                name = self._entries.get(key)
+                if name is not None:
+                    self._entries[key] = self._entries.pop(key)
+                    self.hits += 1
+                    names[pid] = name
+                    continue
+                
+                self.misses += 1
+                name = self._read_proc_name(pid)
+                if name is None:
+                    pending.append(pid)
+                    continue
+                
+                self._entries[key] = name
+                if len(self._entries) > self.maxsize:
+                    del self._entries[next(iter(self._entries))]
+                names[pid] = name
+        
+        return names, pending
+    
+    def _read_start_time(self, pid: int) -> Optional[int]:
+        """Campo starttime (22) de /proc/<pid>/stat, en ticks desde el arranque"""
+        try:
+            with open(f'{self.proc_root}/{pid}/stat', 'rb') as f:
+                data = f.read()
+            # El nombre (campo 2) puede contener espacios y paréntesis
+            return int(data[data.rindex(b')') + 2:].split()[19])
+        except (OSError, ValueError, IndexError):
+            return None
+    
+    def _read_proc_name(self, pid: int) -> Optional[str]:
+        """
+        Lee el nombre desde /proc. `comm` está truncado a 15 caracteres, así
+        que se usa el ejecutable de `cmdline` cuando lo extiende.
+        """
+        try:
+            with open(f'{self.proc_root}/{pid}/comm') as f:
+                comm = f.read().strip()
+        except OSError:
+            return None
+        
+        try:
+            with open(f'{self.proc_root}/{pid}/cmdline', 'rb') as f:
+                argv0 = f.read().split(b'\0', 1)[0].decode(errors='replace')
+            exe = os.path.basename(argv0.split(' ', 1)[0])
+            if len(comm) == 15 and exe.startswith(comm):
+                return exe
+        except OSError:
+            pass
+        
+        return comm
+    
+    def _resolve_with_ps(self, pids: List[int]) -> Dict[int, str]:
+        """Resuelve en una sola llamada a `ps` los PIDs sin acceso a /proc"""
+        import subprocess
+        
+        argv = self.ps_argv(pids)
+        count_subprocess(argv)
+        try:
+            result = subprocess.run(argv, capture_output=True, text=True)
+        except OSError:
+            return self.parse_ps('', pids)
+        return self.parse_ps(result.stdout, pids)
+    
+    @staticmethod
+    def ps_argv(pids: List[int]) -> List[str]:
+        """Comando `ps` que imprime 'pid nombre' de los PIDs indicados"""
+        return ['ps', '-o', 'pid=,comm=', '-p', ','.join(str(pid) for pid in pids)]
+    
+    @staticmethod
+    def parse_ps(output: str, pids: List[int]) -> Dict[int, str]:
+        """{pid: nombre} de la salida de ps_argv(); PID-<n> si no aparece"""
+        names = {pid: f"PID-{pid}" for pid in pids}
+        for line in output.splitlines():
+            parts = line.split(None, 1)
+            try:
+                if len(parts) == 2 and int(parts[0]) in names:
+                    names[int(parts[0])] = parts[1].strip()
+            except ValueError:
+                continue
+        return names
 
 
 class PortDestroyer:
     """Gestor de puertos multiplataforma"""
     
-    def __init__(self, port_range: tuple = (3000, 9000)):
-        self.start_port = port_range[0]
-        self.end_port = port_range[1]
-        self.os_type = platform.system()
+    def __init__(self, port_range=(3000, 9000), backend: str = 'auto',
+                 grace_period: float = 2.0, kill_tree: bool = False,
+                 all_netns: bool = False, policy=None):
+        # Puertos vigilados: tupla (inicio, fin), PortSet o '3000-3010,5432,!3005'
+        self.ports = PortSet.coerce(port_range)
+        self.os_type = _system_info()[0]
+        self.backend = backend
+        self.active_backend: Optional[str] = None
+        # Segundos entre SIGTERM y SIGKILL (0 = SIGKILL directo)
+        self.grace_period = grace_period
+        # Matar también los descendientes de cada proceso
+        self.kill_tree = kill_tree
+        # Escanear también los namespaces de red de contenedores e `ip netns`
+        self.all_netns = all_netns
+        self._netns_index: Optional[NetNamespaceIndex] = None
+        # Policy (port_destroyer_policy) que protege listeners de los kills
+        self.policy = policy
+        # [(listener, motivo)] que la política protegió en el último kill
+        self.last_protected: List[tuple] = []
+        # {pid: KillResult} del último kill
+        self.last_results: Dict = {}
+        # Con una lista, los mensajes de los kills se guardan en ella en lugar
+        # de imprimirse (el daemon los devuelve a la CLI que pidió el kill)
+        self.kill_messages: Optional[List[str]] = None
+        self._inode_index = SocketInodeIndex()
+        self.name_cache = ProcessNameCache()
+        self._user_names: Dict[int, str] = {}
+    
+    @property
+    def start_port(self) -> int:
+        """Puerto más bajo de la selección"""
+        return self.ports.start
+    
+    @property
+    def end_port(self) -> int:
+        """Puerto más alto de la selección"""
+        return self.ports.end
         
-    def get_processes_on_ports(self) -> List[Dict]:
+    def get_processes_on_ports(self) -> List[ListenerRecord]:
         """
         Obtiene todos los procesos usando puertos en el rango especificado.
         
@@ -40,114 +486,570 @@ class PortDestroyer:
         múltiples interfaces (ej: IPv4 e IPv6).
         
         Returns:
-            Lista de diccionarios con información de procesos únicos
+            Lista de ListenerRecord (puerto, pid, nombre, usuario) únicos
         """
-        processes = []
+        backend = self.resolve_backend()
+        if backend is None:
+            print(f"Sistema operativo no soportado: {self.os_type}")
+            return []
         
-        if self.os_type == "Darwin":  # macOS
-            processes = self._get_processes_macos()
-        elif self.os_type == "Linux":  # Ubuntu/Linux
-            processes = self._get_processes_linux()
-        else:
+        return self._scan(backend, self.ports)
+    
+    def iter_processes(self, fields: Optional[Iterable[str]] = None) -> Iterator[ListenerRecord]:
+        """
+        Genera los procesos del rango a medida que se resuelven, sin ordenar.
+        
+        Args:
+            fields: Campos que se van a usar. 'name' y 'user' solo se resuelven
+                si están incluidos; si no, quedan vacíos. None = todos.
+        """
+        backend = self.resolve_backend()
+        if backend is None:
             print(f"Sistema operativo no soportado: {self.os_type}")
+            return iter(())
+        
+        resolve = RESOLVABLE_FIELDS if fields is None else RESOLVABLE_FIELDS.intersection(fields)
+        return self._timed_scan(backend, self.ports, resolve)
+    
+    def snapshot(self) -> Snapshot:
+        """
+        Escanea el rango y devuelve un Snapshot inmutable, ordenado por
+        (puerto, PID), que se puede comparar con el anterior con diff().
+        """
+        return Snapshot(self.get_processes_on_ports())
+    
+    def watch(self, interval: float = 0.25, stop_event=None, include_initial: bool = True,
+              full_refresh_interval: float = 30.0) -> Iterator[ListenerEvent]:
+        """
+        Genera un ListenerEvent por cada listener que aparece, desaparece o
+        cambia en el rango, sondeando continuamente.
+        
+        Cada sondeo solo consulta la huella de la tabla de sockets; el escaneo
+        completo (PIDs y nombres) se hace cuando la huella cambia o cada
+        `full_refresh_interval` segundos.
+        
+        Args:
+            interval: Segundos entre sondeos
+            stop_event: threading.Event opcional para terminar el generador
+            include_initial: Emitir 'opened' para los listeners ya presentes
+            full_refresh_interval: Segundos máximos entre escaneos completos
+        """
+        previous = None
+        first_seen: Dict[tuple, float] = {}
+        last_fingerprint = None
+        last_full_scan = 0.0
+        
+        while stop_event is None or not stop_event.is_set():
+            fingerprint = self.listener_fingerprint()
+            now = time.monotonic()
+            
+            if (previous is None or fingerprint is None or fingerprint != last_fingerprint
+                    or now - last_full_scan >= full_refresh_interval):
+                snapshot = self.snapshot()
+                last_fingerprint = fingerprint
+                last_full_scan = now
+                
+                if previous is None and not include_initial:
+                    diff = None
+                    first_seen = {record.key: snapshot.taken_at for record in snapshot}
+                else:
+                    diff = snapshot.diff(previous)
+                previous = snapshot
+                
+                if diff:
+                    yield from diff_events(diff, snapshot.taken_at, first_seen)
             
-        return processes
+            if stop_event is not None:
+                stop_event.wait(interval)
+            else:
+                time.sleep(interval)
     
-    def _get_processes_macos(self) -> List[Dict]:
-        """Obtiene procesos en macOS usando lsof"""
-        # Usar diccionario para evitar duplicados (mismo puerto + PID)
-        processes_dict = {}
+    def find_port_listeners(self, port: int) -> List[ListenerRecord]:
+        """
+        Obtiene los procesos que escuchan en un único puerto.
         
+        Consulta solo ese puerto (filtro del kernel, de ss o de lsof según el
+        backend), por lo que no escanea el rango configurado ni resuelve
+        nombres de otros listeners. El puerto puede estar fuera del rango.
+        """
+        backend = self.resolve_backend()
+        if backend is None:
+            print(f"Sistema operativo no soportado: {self.os_type}")
+            return []
+        
+        return self._scan(backend, PortSet.from_range(port, port))
+    
+    def _scan(self, backend: str, ports: PortSet) -> List[ListenerRecord]:
+        """Ejecuta un backend sobre los puertos indicados"""
+        with METRICS.timer('port_destroyer_scan_seconds', backend=backend):
+            records = list(self._iter_scan(backend, ports))
+        METRICS.inc('port_destroyer_listeners_scanned_total', len(records), backend=backend)
+        return records
+    
+    def _timed_scan(self, backend: str, ports: PortSet,
+                    resolve: frozenset = RESOLVABLE_FIELDS) -> Iterator[ListenerRecord]:
+        """
+        _iter_scan medido como _scan: solo cuenta el tiempo dentro del
+        backend, no el que el consumidor tarda en escribir cada registro.
+        """
+        from time import perf_counter
+        
+        start = perf_counter()
+        records = self._iter_scan(backend, ports, resolve)
+        elapsed = perf_counter() - start
+        count = 0
+        while True:
+            start = perf_counter()
+            record = next(records, None)
+            elapsed += perf_counter() - start
+            if record is None:
+                break
+            count += 1
+            yield record
+        METRICS.observe('port_destroyer_scan_seconds', elapsed, backend=backend)
+        METRICS.inc('port_destroyer_listeners_scanned_total', count, backend=backend)
+    
+    def _iter_scan(self, backend: str, ports: PortSet,
+                   resolve: frozenset = RESOLVABLE_FIELDS) -> Iterator[ListenerRecord]:
+        """
+        Ejecuta un backend y devuelve sus registros de forma perezosa: la
+        enumeración de sockets ya está hecha, los nombres se resuelven al iterar.
+        """
+        records: Iterator[ListenerRecord] = iter(
+            getattr(self, SCANNER_BACKENDS[backend].method)(ports, resolve))
+        if self.all_netns and self.os_type == "Linux":
+            from itertools import chain
+            return chain(records, self.scan_namespaces(ports, resolve))
+        return records
+    
+    def scan_namespaces(self, ports: PortSet,
+                        resolve: frozenset = RESOLVABLE_FIELDS) -> Iterator[ListenerRecord]:
+        """
+        Listeners de los demás namespaces de red, con `netns` etiquetado con
+        el nombre de `ip netns` o el contenedor al que pertenecen.
+        """
+        with METRICS.timer(SCAN_PHASE_METRIC, backend='netns', phase='enumerate'):
+            namespaces = self.read_namespace_listeners(ports)
+        for namespace, listeners in namespaces:
+            if not listeners:
+                continue
+            # Los inodos de socket son únicos en todo el sistema: el índice
+            # global encuentra también a los procesos de los contenedores
+            with METRICS.timer(SCAN_PHASE_METRIC, backend='netns', phase='resolve_pids'):
+                entries = self.listener_entries(listeners)
+            for record in self.build_records(entries, resolve, backend='netns'):
+                yield record._replace(netns=namespace.label)
+    
+    def read_namespace_listeners(self, ports: PortSet) -> List[tuple]:
+        """[(NetNamespace, [(puerto, inodo, uid)])] leídos en paralelo"""
+        index = self._netns_index
+        if index is None:
+            from port_destroyer_netns import NetNamespaceIndex
+            index = self._netns_index = NetNamespaceIndex()
+        return index.read_all(
+            lambda namespace: self.read_proc_listeners(ports, namespace.tcp_files))
+    
+    def available_backends(self) -> List[str]:
+        """Backends registrados que pueden usarse en este sistema"""
+        return [name for name, backend in SCANNER_BACKENDS.items()
+                if backend.is_available(self.os_type)]
+    
+    def resolve_backend(self) -> Optional[str]:
+        """
+        Determina el backend a usar.
+        
+        Un backend explícito tiene prioridad. Con 'auto' se usa la elección
+        guardada por la calibración y, si no existe o ya no es válida, se
+        calibra en ese momento.
+        """
+        if self.active_backend:
+            return self.active_backend
+        
+        if self.backend != 'auto':
+            if self.backend not in SCANNER_BACKENDS:
+                raise ValueError(f"Backend desconocido: {self.backend}")
+            self.active_backend = self.backend
+            return self.active_backend
+        
+        # Solo se comprueba el backend guardado: probar todos costaría varias
+        # búsquedas en PATH y un socket netlink en cada arranque
+        cached = self._load_calibration()
+        backend = SCANNER_BACKENDS.get(cached.get('backend', '')) if cached else None
+        if backend and backend.is_available(self.os_type):
+            self.active_backend = backend.name
+        elif self.available_backends():
+            self.calibrate()
+        
+        return self.active_backend
+    
+    def calibrate(self, rounds: int = 3) -> Optional[str]:
+        """
+        Mide los backends disponibles y elige el más rápido cuyos resultados
+        son correctos. La elección se guarda en disco para los siguientes
+        arranques.
+        """
+        # Un listener propio garantiza que la comparación no sea trivial
+        probe = self._open_probe_listener()
         try:
-            # Usar lsof para obtener procesos en puertos TCP
-            cmd = "lsof -iTCP -sTCP:LISTEN -n -P"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            for line in result.stdout.split('\n')[1:]:  # Saltar header
-                if not line.strip():
+            results = self.benchmark_backends(rounds)
+        finally:
+            if probe:
+                probe.close()
+        correct = [name for name, stats in results.items()
+                   if stats['matches'] and (not probe or stats['count'] > 0)]
+        
+        chosen: Optional[str]
+        if correct:
+            chosen = min(correct, key=lambda name: results[name]['mean_ms'])
+        else:
+            available = self.available_backends()
+            chosen = available[0] if available else None
+        
+        self.active_backend = chosen
+        if chosen:
+            self._save_calibration(chosen, results)
+        return chosen
+    
+    def _open_probe_listener(self):
+        """Abre un socket en LISTEN en algún puerto libre de la selección"""
+        import socket
+        from itertools import islice
+        
+        for port in islice(reversed(self.ports), 51):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                sock.bind(('127.0.0.1', port))
+                sock.listen(1)
+                return sock
+            except OSError:
+                sock.close()
+        return None
+    
+    def _calibration_key(self) -> Dict[str, str]:
+        """Datos del sistema que invalidan una calibración guardada"""
+        return {'os': self.os_type, 'release': _system_info()[1]}
+    
+    def _load_calibration(self) -> Optional[Dict[str, str]]:
+        """Lee la calibración guardada si corresponde a este sistema"""
+        data = {}
+        try:
+            with open(CALIBRATION_FILE) as f:
+                for line in f:
+                    key, sep, value = line.rstrip('\n').partition('=')
+                    if sep:
+                        data[key] = value
+        except (OSError, UnicodeDecodeError):
+            return None
+        
+        for key, value in self._calibration_key().items():
+            if data.get(key) != value:
+                return None
+        return data
+    
+    def _save_calibration(self, backend: str, results: Dict[str, Dict]) -> None:
+        """Guarda el backend elegido y las mediciones (una línea clave=valor)"""
+        data = dict(self._calibration_key(), backend=backend,
+                    calibrated_at=f"{time.time():.0f}")
+        for name, stats in results.items():
+            data[f"{name}.mean_ms"] = f"{stats['mean_ms']:.3f}"
+            data[f"{name}.count"] = str(stats['count'])
+            data[f"{name}.matches"] = str(int(stats['matches']))
+        try:
+            os.makedirs(os.path.dirname(CALIBRATION_FILE), exist_ok=True)
+            tmp_path = f"{CALIBRATION_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.writelines(f"{key}={value}\n" for key, value in data.items())
+            os.replace(tmp_path, CALIBRATION_FILE)
+        except OSError as e:
+            print(f"[WARN] No se pudo guardar la calibración: {e}")
+    
+    def _get_processes_lsof(self, ports: PortSet,
+                            resolve: frozenset = RESOLVABLE_FIELDS) -> Iterable[ListenerRecord]:
+        """Obtiene procesos usando lsof (macOS y Linux)"""
+        return self._scan_command('lsof', ports, resolve)
+    
+    def _get_processes_ss(self, ports: PortSet,
+                          resolve: frozenset = RESOLVABLE_FIELDS) -> Iterable[ListenerRecord]:
+        """Obtiene procesos en Linux usando ss, filtrando los puertos en ss"""
+        return self._scan_command('ss', ports, resolve)
+    
+    def _get_processes_netstat(self, ports: PortSet,
+                               resolve: frozenset = RESOLVABLE_FIELDS) -> Iterable[ListenerRecord]:
+        """Obtiene procesos en Linux usando netstat"""
+        return self._scan_command('netstat', ports, resolve)
+    
+    def _scan_command(self, backend: str, ports: PortSet,
+                      resolve: frozenset = RESOLVABLE_FIELDS) -> Iterable[ListenerRecord]:
+        """
+        Ejecuta la herramienta de un backend (lsof, ss, netstat) y extrae los
+        procesos de su salida con el parser registrado.
+        """
+        import subprocess
+        
+        spec = SCANNER_BACKENDS[backend]
+        # Los backends de comando se registran siempre con su argv y su parser
+        assert spec.argv is not None and spec.parser is not None
+        try:
+            # La salida ya trae los PIDs: enumerar incluye ejecutar y parsear
+            with METRICS.timer(SCAN_PHASE_METRIC, backend=backend, phase='enumerate'):
+                argv = getattr(self, spec.argv)(ports)
+                count_subprocess(argv)
+                result = subprocess.run(argv, capture_output=True, text=True)
+                entries, names = getattr(self, spec.parser)(result.stdout, ports)
+        except Exception as e:
+            print(f"Error obteniendo procesos con {backend}: {e}")
+            return []
+        
+        # Los nombres que falten se resuelven en bloques al iterar
+        return self.build_records(entries, resolve, names, backend=backend)
+    
+    def _lsof_argv(self, ports: PortSet) -> List[str]:
+        """Comando lsof para los puertos TCP seleccionados en LISTEN"""
+        return ['lsof', f"-iTCP:{format_ranges(ports.filter_ranges())}",
+                '-sTCP:LISTEN', '-n', '-P']
+    
+    def _ss_argv(self, ports: PortSet) -> List[str]:
+        """Comando ss con la selección de puertos como filtro"""
+        conditions = ' or '.join(
+            f"sport = :{start}" if start == end else f"( sport >= :{start} and sport <= :{end} )"
+            for start, end in ports.filter_ranges())
+        return ['ss', '-tlnp', f"( {conditions} )"]
+    
+    def _netstat_argv(self, ports: PortSet) -> List[str]:
+        """Comando netstat (sin filtro: se aplica el bitmap al parsear)"""
+        return ['netstat', '-tlnp']
+    
+    def _parse_lsof(self, output: str, ports: PortSet) -> tuple:
+        """
+        Extrae los listeners de la salida de lsof.
+        
+        Returns:
+            ({(puerto, pid): usuario}, {pid: nombre})
+        """
+        # Usar diccionario para evitar duplicados (mismo puerto + PID)
+        entries: Dict[tuple, str] = {}
+        names: Dict[int, str] = {}
+        bitmap = ports.bitmap
+        
+        for line in output.split('\n')[1:]:  # Saltar header
+            if not line.strip():
+                continue
+                
+            parts = line.split()
+            if len(parts) >= 9:
+                try:
+                    # Extraer puerto de la columna NAME (ej: *:3000)
+                    port_info = parts[8]
+                    if ':' in port_info:
+                        port = int(port_info.split(':')[-1])
+                        
+                        # Filtrar por la selección de puertos
+                        if bitmap[port]:
+                            pid = int(parts[1])
+                            # Usar (puerto, pid) como clave única para evitar duplicados
+                            entries.setdefault((port, pid), parts[2])
+                            names.setdefault(pid, parts[0])
+                except (ValueError, IndexError):
                     continue
-                    
-                parts = line.split()
-                if len(parts) >= 9:
-                    try:
-                        # Extraer puerto de la columna NAME (ej: *:3000)
-                        port_info = parts[8]
-                        if ':' in port_info:
-                            port = int(port_info.split(':')[-1])
+        
+        return entries, names
+    
+    def _parse_socket_table(self, output: str, ports: PortSet) -> tuple:
+        """
+        Extrae los listeners de la tabla de sockets de ss o netstat.
+        
+        Returns:
+            ({(puerto, pid): ''}, {}) - los nombres se resuelven aparte
+        """
+        # (puerto, pid) -> usuario; el diccionario evita duplicados
+        entries: Dict[tuple, str] = {}
+        bitmap = ports.bitmap
+        
+        for line in output.split('\n')[1:]:
+            if not line.strip():
+                continue
+                
+            parts = line.split()
+            if len(parts) >= 4:
+                try:
+                    # Extraer puerto de la columna Local Address (ej: 0.0.0.0:3000)
+                    local_addr = parts[3]
+                    if ':' in local_addr:
+                        port = int(local_addr.split(':')[-1])
+                        
+                        # Filtrar por la selección de puertos
+                        if bitmap[port]:
+                            # Extraer PID del formato users:(("proceso",pid=1234,fd=3))
+                            pid_info = parts[-1] if len(parts) >= 6 else ''
+                            pid = self._extract_pid_linux(pid_info)
                             
-                            # Filtrar por rango
-                            if self.start_port <= port <= self.end_port:
-                                pid = int(parts[1])
+                            if pid:
                                 # Usar (puerto, pid) como clave única para evitar duplicados
-                                key = (port, pid)
-                                
-                                if key not in processes_dict:
-                                    processes_dict[key] = {
-                                        'name': parts[0],
-                                        'pid': pid,
-                                        'port': port,
-                                        'user': parts[2]
-                                    }
-                    except (ValueError, IndexError):
-                        continue
-                        
+                                entries.setdefault((port, pid), '')
+                except (ValueError, IndexError):
+                    continue
+        
+        return entries, {}
+    
+    def _get_processes_proc(self, ports: PortSet,
+                            resolve: frozenset = RESOLVABLE_FIELDS) -> Iterable[ListenerRecord]:
+        """
+        Obtiene procesos en Linux leyendo /proc/net/tcp y /proc/net/tcp6.
+        
+        No lanza subprocesos para enumerar: filtra las filas LISTEN y los
+        puertos seleccionados en una sola pasada y luego resuelve el PID dueño de cada
+        socket a partir de su inodo.
+        """
+        try:
+            with METRICS.timer(SCAN_PHASE_METRIC, backend='proc', phase='enumerate'):
+                listeners = self.read_proc_listeners(ports)
+            return self._resolve_listeners(listeners, resolve, 'proc')
         except Exception as e:
-            print(f"Error obteniendo procesos en macOS: {e}")
-            
-        return list(processes_dict.values())
+            print(f"Error obteniendo procesos desde /proc: {e}")
+            return []
     
-    def _get_processes_linux(self) -> List[Dict]:
-        """Obtiene procesos en Linux usando ss o netstat"""
-        # Usar diccionario para evitar duplicados (mismo puerto + PID)
-        processes_dict = {}
+    def _get_processes_netlink(self, ports: PortSet,
+                               resolve: frozenset = RESOLVABLE_FIELDS) -> Iterable[ListenerRecord]:
+        """
+        Obtiene procesos en Linux con una consulta NETLINK_SOCK_DIAG.
         
+        Los rangos de puertos viajan como filtro bytecode, de modo que el
+        kernel solo devuelve los sockets que interesan.
+        """
         try:
-            # Intentar con ss primero (más moderno)
-            cmd = "ss -tlnp"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                # Fallback a netstat
-                cmd = "netstat -tlnp"
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            for line in result.stdout.split('\n')[1:]:
-                if not line.strip():
-                    continue
-                    
-                parts = line.split()
-                if len(parts) >= 4:
-                    try:
-                        # Extraer puerto de la columna Local Address (ej: 0.0.0.0:3000)
-                        local_addr = parts[3]
-                        if ':' in local_addr:
-                            port = int(local_addr.split(':')[-1])
-                            
-                            # Filtrar por rango
-                            if self.start_port <= port <= self.end_port:
-                                # Extraer PID del formato users:(("proceso",pid=1234,fd=3))
-                                pid_info = parts[-1] if len(parts) >= 6 else ''
-                                pid = self._extract_pid_linux(pid_info)
-                                
-                                if pid:
-                                    # Usar (puerto, pid) como clave única para evitar duplicados
-                                    key = (port, pid)
-                                    
-                                    if key not in processes_dict:
-                                        process_name = self._get_process_name(pid)
-                                        processes_dict[key] = {
-                                            'name': process_name,
-                                            'pid': pid,
-                                            'port': port,
-                                            'user': ''
-                                        }
-                    except (ValueError, IndexError):
-                        continue
-                        
+            with METRICS.timer(SCAN_PHASE_METRIC, backend='netlink', phase='enumerate'):
+                listeners = self._query_netlink(ports)
+            return self._resolve_listeners(listeners, resolve, 'netlink')
         except Exception as e:
-            print(f"Error obteniendo procesos en Linux: {e}")
+            print(f"Error obteniendo procesos por netlink: {e}")
+            return []
+    
+    def _resolve_listeners(self, listeners: List[tuple], resolve: frozenset = RESOLVABLE_FIELDS,
+                           backend: Optional[str] = None) -> Iterable[ListenerRecord]:
+        """
+        Convierte (puerto, inodo, uid) en procesos, resolviendo el PID con el
+        índice de sockets y los nombres en bloque.
+        """
+        if not listeners:
+            return []
+        with METRICS.timer(SCAN_PHASE_METRIC, backend=backend or '?', phase='resolve_pids'):
+            entries = self.listener_entries(listeners)
+        return self.build_records(entries, resolve, backend=backend)
+    
+    def listener_entries(self, listeners: List[tuple]) -> Dict[tuple, int]:
+        """{(puerto, pid): uid} de los (puerto, inodo, uid) con PID conocido"""
+        inode_to_pid = self._inode_index.lookup({inode for _, inode, _ in listeners})
+        
+        # El diccionario evita duplicados
+        entries = {}
+        for port, inode, uid in listeners:
+            pid = inode_to_pid.get(inode)
+            if pid and (port, pid) not in entries:
+                entries[(port, pid)] = uid
+        return entries
+    
+    def _query_netlink(self, ports: PortSet) -> List[tuple]:
+        """
+        (puerto, inodo, uid) de los listeners de la selección por netlink.
+        
+        Si la selección tiene más rangos de los que caben en el filtro del
+        kernel, este devuelve de más y el bitmap descarta el resto.
+        """
+        import port_destroyer_netlink
+        
+        filter_ranges = ports.filter_ranges()
+        listeners = port_destroyer_netlink.query_listeners(filter_ranges)
+        if filter_ranges is not ports.ranges:
+            bitmap = ports.bitmap
+            listeners = [listener for listener in listeners if bitmap[listener[0]]]
+        return listeners
+    
+    def read_proc_listeners(self, ports: PortSet,
+                            files: Iterable[str] = PROC_NET_TCP_FILES) -> List[tuple]:
+        """
+        Lee las tablas TCP del kernel y devuelve (puerto, inodo, uid) de los
+        sockets en estado LISTEN dentro de la selección de puertos.
+        
+        `files` permite leer las tablas de otro namespace de red a través de
+        /proc/<pid>/net/tcp*.
+        """
+        listeners = []
+        bitmap = ports.bitmap
+        
+        for path in files:
+            try:
+                with open(path) as f:
+                    next(f, None)  # Saltar header
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) < 10 or parts[3] != TCP_LISTEN_STATE:
+                            continue
+                        
+                        # local_address tiene formato IP_HEX:PUERTO_HEX
+                        local_addr = parts[1]
+                        port = int(local_addr[local_addr.rindex(':') + 1:], 16)
+                        if not bitmap[port]:
+                            continue
+                        
+                        inode = int(parts[9])
+                        if inode:
+                            listeners.append((port, inode, int(parts[7])))
+            except (OSError, ValueError):
+                # tcp6 no existe si IPv6 está deshabilitado
+                continue
+        
+        return listeners
+    
+    def _get_user_name(self, uid: int) -> str:
+        """Obtiene el nombre de usuario dado su UID (cacheado por UID)"""
+        name = self._user_names.get(uid)
+        if name is None:
+            try:
+                import pwd
+                name = pwd.getpwuid(uid).pw_name
+            except (ImportError, KeyError):
+                name = str(uid)
+            self._user_names[uid] = name
+        return name
+    
+    def benchmark_backends(self, rounds: int = 5) -> Dict[str, Dict]:
+        """
+        Mide el tiempo medio de escaneo de cada backend disponible.
+        
+        En cada ronda se ejecutan todos los backends seguidos y se comparan
+        sus pares (puerto, PID) con la unión de la ronda: un backend es
+        correcto si en todas las rondas encontró todo lo que vieron los demás.
+        
+        Returns:
+            Diccionario backend -> {'mean_ms', 'count', 'matches'}
+        """
+        backends = self.available_backends()
+        timings: Dict[str, List[float]] = {name: [] for name in backends}
+        counts: Dict[str, int] = {name: 0 for name in backends}
+        matches: Dict[str, bool] = {name: True for name in backends}
+        
+        for _ in range(max(1, rounds)):
+            round_keys = {}
+            for name in backends:
+                t0 = time.perf_counter()
+                processes = self._scan(name, self.ports)
+                timings[name].append(time.perf_counter() - t0)
+                round_keys[name] = {p.key for p in processes}
+                counts[name] = len(round_keys[name])
             
-        return list(processes_dict.values())
+            reference = set().union(*round_keys.values()) if round_keys else set()
+            for name, keys in round_keys.items():
+                if keys != reference:
+                    matches[name] = False
+        
+        return {
+            name: {
+                'mean_ms': sum(timings[name]) / len(timings[name]) * 1000,
+                'count': counts[name],
+                'matches': matches[name]
+            }
+            for name in backends
+        }
     
     def _extract_pid_linux(self, pid_info: str) -> Optional[int]:
         """Extrae el PID del formato de ss/netstat"""
@@ -155,6 +1057,9 @@ class PortDestroyer:
             if 'pid=' in pid_info:
                 pid_str = pid_info.split('pid=')[1].split(',')[0]
                 return int(pid_str)
+            if '/' in pid_info:
+                # netstat usa el formato 1234/proceso
+                return int(pid_info.split('/')[0])
         except:
             pass
         return None
@@ -162,69 +1067,568 @@ class PortDestroyer:
     def _get_process_name(self, pid: int) -> str:
         """Obtiene el nombre del proceso dado su PID"""
         try:
-            cmd = f"ps -p {pid} -o comm="
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            return result.stdout.strip() or f"PID-{pid}"
-        except:
+            return self.name_cache.get(pid) or f"PID-{pid}"
+        except Exception:
             return f"PID-{pid}"
     
+    def build_records(self, entries: Mapping[tuple, Union[int, str]],
+                      resolve: frozenset = RESOLVABLE_FIELDS,
+                      names: Optional[Dict[int, str]] = None,
+                      backend: Optional[str] = None) -> Iterator[ListenerRecord]:
+        """
+        Genera los registros de {(puerto, pid): usuario o uid} a medida que se
+        resuelven, con los nombres que no estén ya en `names` pedidos a la
+        caché en bloques de NAME_BATCH_SIZE PIDs. Los campos fuera de
+        `resolve` quedan vacíos. Cada bloque se mide como fase
+        'resolve_names' de `backend`.
+        """
+        want_name = 'name' in resolve
+        want_user = 'user' in resolve
+        known = names or {}
+        items = list(entries.items())
+        
+        for offset in range(0, len(items), NAME_BATCH_SIZE):
+            batch = items[offset:offset + NAME_BATCH_SIZE]
+            missing = ({pid for (_, pid), _ in batch if pid not in known}
+                       if want_name else None)
+            resolved = {}
+            if missing:
+                with METRICS.timer(SCAN_PHASE_METRIC, backend=backend or '?',
+                                   phase='resolve_names'):
+                    resolved = self.name_cache.resolve_many(missing)
+            for (port, pid), user in batch:
+                name = (known.get(pid) or resolved.get(pid) or f"PID-{pid}") if want_name else ''
+                if not isinstance(user, str):
+                    user = self._get_user_name(user) if want_user else ''
+                yield ListenerRecord(port, pid, name, user)
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Contadores de las cachés internas (nombres e índice de sockets)"""
+        return {
+            'names': self.name_cache.stats(),
+            'sockets': dict(self._inode_index.stats)
+        }
+    
     def kill_process(self, pid: int) -> bool:
         """Mata un proceso dado su PID"""
+        result = self.kill_processes([pid]).get(pid)
+        return bool(result and result.success)
+    
+    def kill_processes(self, pids: Iterable[int]) -> Dict:
+        """
+        Mata varios procesos en paralelo: SIGTERM a todos, espera concurrente
+        durante el periodo de gracia y SIGKILL solo para los que sigan vivos.
+        
+        Returns:
+            Diccionario pid -> KillResult con el resultado y el tiempo de cada uno
+        """
+        if self.os_type not in ["Darwin", "Linux"]:
+            return {}
+        
         try:
-            if self.os_type in ["Darwin", "Linux"]:
-                # Usar kill -9 para forzar el cierre
-                subprocess.run(f"kill -9 {pid}", shell=True, check=True)
-                return True
-            return False
-        except subprocess.CalledProcessError:
-            return False
+            from port_destroyer_kill import KillEngine
+            results = KillEngine(grace_period=self.grace_period).terminate(pids)
         except Exception as e:
-            print(f"Error matando proceso {pid}: {e}")
-            return False
+            self._say(f"Error matando procesos: {e}")
+            return {}
+        record_kills(results.values())
+        return results
+    
+    def kill_process_trees(self, processes: Iterable[ListenerRecord]) -> Dict:
+        """
+        Mata los procesos de los listeners y todos sus descendientes en una
+        sola tanda, con los hijos antes que sus padres. Los descendientes que
+        protege la política se añaden a last_protected.
+        
+        El árbol se obtiene de una única pasada por /proc/*/stat.
+        """
+        try:
+            targets, protected = self.tree_targets(
+                processes, protected_pids={proc.pid for proc, _ in self.last_protected})
+        except Exception as e:
+            self._say(f"Error obteniendo el árbol de procesos: {e}")
+            return {}
+        
+        self.report_protected(protected, descendants=True)
+        self.last_protected = self.last_protected + protected
+        return self.kill_processes(targets)
+    
+    def tree_targets(self, processes: Iterable[ListenerRecord],
+                     children: Optional[Dict[int, List[int]]] = None,
+                     protected_pids: Iterable[int] = ()) -> tuple:
+        """
+        PIDs que señala --tree: los de los listeners y sus descendientes, los
+        más profundos primero. Cada descendiente pasa por la política con el
+        puerto y el netns del listener del que cuelga; ni los protegidos ni
+        los que cuelgan de ellos (o de `protected_pids`) se señalan.
+        
+        Returns:
+            (PIDs a matar, [(descendiente protegido, motivo)])
+        """
+        from port_destroyer_kill import build_children_index, expand_process_tree
+        if children is None:
+            children = build_children_index()
+        roots: Dict[int, ListenerRecord] = {}
+        for proc in processes:
+            roots.setdefault(proc.pid, proc)
+        targets = expand_process_tree(roots, children)
+        if self.policy is None and not protected_pids:
+            return targets, []
+        
+        # El orden inverso recorre los padres antes que sus hijos
+        records = dict(roots)
+        for pid in reversed(targets):
+            owner = records[pid]
+            for child in children.get(pid, ()):
+                if child not in records:
+                    records[child] = ListenerRecord(owner.port, child, '', '', owner.netns)
+        skipped = set(protected_pids) - roots.keys()
+        _, protected = self.apply_policy(records[pid] for pid in targets
+                                         if pid not in roots and pid not in skipped)
+        skipped.update(record.pid for record, _ in protected)
+        wanted = set(targets)
+        for pid in reversed(targets):
+            if pid not in skipped:
+                continue
+            for child in children.get(pid, ()):
+                if child in wanted and child not in skipped and child not in roots:
+                    skipped.add(child)
+                    protected.append((records[child], f"descendiente del PID protegido {pid}"))
+        return [pid for pid in targets if pid not in skipped], protected
+    
+    def apply_policy(self, processes: Iterable[ListenerRecord]) -> tuple:
+        """
+        Separa los listeners protegidos por la política antes de enviar
+        ninguna señal.
+        
+        Returns:
+            (listeners a matar, [(listener protegido, motivo)])
+        """
+        if self.policy is None:
+            return list(processes), []
+        from port_destroyer_policy import ProcessFacts
+        allowed, protected = self.policy.split(
+            processes, ProcessFacts(self.name_cache.resolve_many, user_name=self._get_user_name))
+        return allowed, protected
+    
+    def _say(self, message: str) -> None:
+        """Mensaje de un kill: a stdout o, si se están recogiendo, a kill_messages"""
+        if self.kill_messages is None:
+            print(message)
+        else:
+            self.kill_messages.append(message)
+    
+    def report_protected(self, protected: Iterable[tuple], descendants: bool = False) -> None:
+        """Muestra los procesos que la política ha dejado fuera del kill"""
+        for proc, reason in protected:
+            if descendants:
+                self._say(f"[INFO] Protegido por la política ({reason}): PID {proc.pid}, "
+                          f"descendiente del listener del puerto {proc.port}")
+            else:
+                self._say(f"[INFO] Protegido por la política ({reason}): "
+                          f"PID {proc.pid} en puerto {proc.port}")
+    
+    def _kill_listeners(self, processes: Iterable[ListenerRecord]) -> int:
+        """Mata los procesos de una lista de listeners y cuenta los eliminados"""
+        processes, protected = self.apply_policy(processes)
+        self.last_protected = protected
+        self.report_protected(protected)
+        
+        # Los nombres que la política no necesitó se resuelven solo para los que se matan
+        missing = {proc.pid for proc in processes if not proc.name}
+        if missing:
+            names = self.name_cache.resolve_many(missing)
+            processes = [proc if proc.name
+                         else proc._replace(name=names.get(proc.pid) or f"PID-{proc.pid}")
+                         for proc in processes]
+        for proc in processes:
+            self._say(f"Matando proceso {proc.name} (PID: {proc.pid}) en puerto {proc.port}")
+        
+        pids = list(dict.fromkeys(proc.pid for proc in processes))
+        if self.kill_tree:
+            results = self.kill_process_trees(processes)
+            extra = len(results) - len(set(pids))
+            if extra > 0:
+                self._say(f"Matando {extra} proceso(s) descendiente(s)")
+        else:
+            results = self.kill_processes(pids)
+        self.last_results = results
+        for result in results.values():
+            if not result.success:
+                self._say(f"[WARN] PID {result.pid}: {result.outcome}")
+        
+        return sum(1 for result in results.values() if result.success)
     
     def kill_port(self, port: int) -> int:
         """Mata todos los procesos en un puerto específico"""
-        killed_count = 0
-        processes = self.get_processes_on_ports()
+        processes = [proc for proc in self.find_port_listeners(port) if proc.port == port]
+        return self._kill_listeners(processes)
+    
+    def listener_fingerprint(self) -> Optional[int]:
+        """
+        Huella barata de la tabla de listeners del rango, calculada antes de
+        resolver PIDs o nombres: cambia cuando aparece, desaparece o se
+        recrea un socket en LISTEN.
         
-        for proc in processes:
-            if proc['port'] == port:
-                print(f"Matando proceso {proc['name']} (PID: {proc['pid']}) en puerto {port}")
-                if self.kill_process(proc['pid']):
-                    killed_count += 1
-                    
-        return killed_count
+        Returns:
+            Hash de los pares (puerto, inodo), o None si el sistema no permite
+            obtenerla sin un escaneo completo
+        """
+        if self.os_type != "Linux":
+            return None
+        try:
+            if self.resolve_backend() == 'netlink':
+                listeners = self._query_netlink(self.ports)
+            elif os.path.exists(PROC_NET_TCP_FILES[0]):
+                listeners = self.read_proc_listeners(self.ports)
+            else:
+                return None
+            if self.all_netns:
+                listeners = list(listeners)
+                for _, foreign in self.read_namespace_listeners(self.ports):
+                    listeners.extend(foreign)
+        except OSError:
+            return None
+        return hash(frozenset((port, inode) for port, inode, _ in listeners))
+    
+    def listening_ports(self, ports: Optional[PortSet] = None) -> Set[int]:
+        """
+        Puertos de la selección con algún socket en LISTEN en el namespace de
+        red propio, de cualquier usuario, sin resolver PIDs ni nombres cuando el sistema permite
+        consultar la tabla de sockets directamente.
+        """
+        ports = self.ports if ports is None else ports
+        backend = self.resolve_backend()
+        if self.os_type == "Linux":
+            try:
+                if backend == 'netlink':
+                    return {port for port, _, _ in self._query_netlink(ports)}
+                if os.path.exists(PROC_NET_TCP_FILES[0]):
+                    return {port for port, _, _ in self.read_proc_listeners(ports)}
+            except OSError:
+                pass
+        if backend is None:
+            return set()
+        return {record.port for record in self._iter_scan(backend, ports, frozenset())}
+    
+    def port_in_use(self, port: int) -> bool:
+        """Comprueba si hay algún socket en LISTEN en el puerto"""
+        return bool(self.listening_ports(PortSet.from_range(port, port)))
+    
+    def find_free_ports(self, n: int = 1, port_range=None, reserve_ttl: float = 0.0,
+                        reservations_path: Optional[str] = None) -> List[int]:
+        """
+        Devuelve los `n` primeros puertos libres (sin socket en LISTEN) de la
+        selección a partir de un único escaneo, sin intentar bind() en cada uno.
+        
+        Los puertos reservados por otras llamadas y aún vigentes se saltan.
+        
+        Args:
+            n: Número de puertos
+            port_range: Tupla (inicio, fin), PortSet o especificación
+                '3000-3010,5432'. None = la selección del PortDestroyer
+            reserve_ttl: Si es > 0, reservar los puertos devueltos durante
+                esos segundos para que otros procesos no los reciban
+            reservations_path: Fichero de reservas (default: por usuario en
+                $XDG_RUNTIME_DIR o /tmp/port-destroyer-<uid>/)
+        
+        Returns:
+            Lista ordenada de `n` puertos, o más corta si no hay suficientes
+            libres (en ese caso no se reserva ninguno)
+        """
+        from port_destroyer_reserve import PortReservations
+        
+        ports = self.ports if port_range is None else PortSet.coerce(port_range)
+        # El fichero queda bloqueado mientras se eligen los puertos: dos
+        # lanzadores concurrentes no pueden recibir el mismo
+        with PortReservations(reservations_path, create=reserve_ttl > 0) as reservations:
+            free = bytearray(ports.bitmap)
+            for port in self.listening_ports(ports):
+                free[port] = 0
+            for port in reservations.active:
+                free[port] = 0
+            
+            found: List[int] = []
+            port = free.find(1)
+            while port >= 0 and len(found) < n:
+                found.append(port)
+                port = free.find(1, port + 1)
+            
+            if reserve_ttl > 0 and len(found) == n:
+                reservations.reserve(found, reserve_ttl)
+        return found
+    
+    def wait_port_free(self, port: int, timeout: float = 10.0) -> Optional[float]:
+        """
+        Espera a que el puerto quede libre, comprobándolo con backoff
+        exponencial (5 ms a 200 ms).
+        
+        Returns:
+            Segundos que tardó en liberarse, o None si se agotó el timeout
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        interval = 0.005
+        
+        while True:
+            if not self.port_in_use(port):
+                return time.perf_counter() - start
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 0.2)
+    
+    def kill_port_and_wait(self, port: int, timeout: float = 10.0) -> tuple:
+        """
+        Mata los procesos del puerto y espera a que el kernel lo libere.
+        
+        El motor de kill ya espera la salida de cada proceso por pidfd; después
+        solo se comprueba el puerto, sin volver a escanear el rango.
+        
+        Returns:
+            (procesos eliminados, segundos hasta quedar libre o None si se
+            agotó el timeout)
+        """
+        start = time.perf_counter()
+        killed = self.kill_port(port)
+        remaining = max(0.0, timeout - (time.perf_counter() - start))
+        
+        if self.wait_port_free(port, remaining) is None:
+            return killed, None
+        return killed, time.perf_counter() - start
     
     def kill_all(self) -> int:
-        """Mata todos los procesos en el rango de puertos"""
-        killed_count = 0
-        processes = self.get_processes_on_ports()
+        """
+        Mata todos los procesos en el rango de puertos que permita la política.
         
-        for proc in processes:
-            print(f"Matando proceso {proc['name']} (PID: {proc['pid']}) en puerto {proc['port']}")
-            if self.kill_process(proc['pid']):
-                killed_count += 1
-                
-        return killed_count
+        Con política, el escaneo no resuelve nombres: los listeners protegidos
+        solo por su puerto o usuario se descartan sin resolver el suyo.
+        """
+        if self.policy is None:
+            return self._kill_listeners(self.get_processes_on_ports())
+        
+        backend = self.resolve_backend()
+        if backend is None:
+            print(f"Sistema operativo no soportado: {self.os_type}")
+            return 0
+        return self._kill_listeners(self._iter_scan(backend, self.ports, frozenset(('user',))))
     
     def list_processes(self) -> None:
         """Lista todos los procesos en el rango de puertos"""
-        processes = self.get_processes_on_ports()
+        self.print_processes(self.snapshot())
+    
+    def print_processes(self, processes: Iterable[ListenerRecord],
+                        fields: Iterable[str] = DEFAULT_FIELDS) -> None:
+        """Imprime la tabla de procesos con las columnas de `fields`"""
+        from port_destroyer_format import write_records
         
+        processes = sorted(processes)
         if not processes:
-            print(f"\n[OK] No hay procesos en el rango de puertos {self.start_port}-{self.end_port}")
+            print(f"\n[OK] No hay procesos en los puertos {self.ports}")
             return
         
-        print(f"\nProcesos encontrados en rango {self.start_port}-{self.end_port}:\n")
-        print(f"{'Puerto':<10} {'PID':<10} {'Proceso':<30} {'Usuario':<15}")
-        print("-" * 70)
+        print(f"\nProcesos encontrados en los puertos {self.ports}:\n")
+        write_records(processes, sys.stdout, 'table', fields)
+
+
+def stream_watch(destroyer: PortDestroyer, interval: float) -> None:
+    """
+    Escribe cada evento de PortDestroyer.watch() como una línea JSON y vacía
+    el buffer enseguida, hasta Ctrl+C o hasta que el lector cierre la tubería.
+    """
+    import json
+    
+    out = sys.stdout
+    try:
+        for event in destroyer.watch(interval):
+            out.write(json.dumps(event.to_dict(), separators=(',', ':')) + '\n')
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        _discard_stdout()
+
+
+def stream_list(records: Iterable[ListenerRecord], fmt: str, fields: Iterable[str]) -> None:
+    """
+    Escribe los registros en stdout en el formato indicado a medida que
+    llegan del escáner, hasta que el lector cierre la tubería.
+    """
+    from port_destroyer_format import write_records
+    
+    try:
+        write_records(records, sys.stdout, fmt, fields)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        _discard_stdout()
+
+
+# Texto de cada evento en la tabla de --history
+HISTORY_LABELS = {'opened': 'abierto', 'closed': 'cerrado', 'changed': 'cambiado'}
+
+
+def print_history(port: int, since: Optional[float], fmt: str = 'table') -> bool:
+    """
+    Muestra los eventos del puerto guardados por la bandeja o el daemon desde
+    `since` (epoch; None = todo el historial). En la tabla, los listeners que
+    ya escuchaban al empezar el periodo aparecen primero como 'activo'.
+    
+    Returns:
+        False si no hay fichero de historial
+    """
+    from port_destroyer_history import HistoryLog
+    
+    try:
+        history = HistoryLog(readonly=True)
+        history.open()
+    except (OSError, ValueError) as e:
+        print(f"[INFO] No hay historial disponible ({e})")
+        return False
+    
+    with history:
+        events = history.query(port, since or 0.0)
+        holders = history.holders_at(port, since) if since is not None else []
+    
+    try:
+        if fmt != 'table':
+            import json
+            rows = [event.to_dict() for event in events]
+            if fmt == 'ndjson':
+                sys.stdout.writelines(json.dumps(row, separators=(',', ':')) + '\n' for row in rows)
+            elif fmt == 'json':
+                json.dump(rows, sys.stdout, indent=1)
+                sys.stdout.write('\n')
+            else:
+                import csv
+                writer = csv.writer(sys.stdout, lineterminator='\n')
+                writer.writerow(('ts', 'event', 'port', 'pid', 'name', 'user', 'netns'))
+                writer.writerows((round(event.timestamp, 6), event.event) + tuple(event.record)
+                                 for event in events)
+            sys.stdout.flush()
+            return True
+        
+        if not events and not holders:
+            print(f"\n[INFO] Sin eventos en el puerto {port}")
+            return True
         
-        for proc in sorted(processes, key=lambda x: x['port']):
-            print(f"{proc['port']:<10} {proc['pid']:<10} {proc['name']:<30} {proc['user']:<15}")
+        print(f"\nHistorial del puerto {port}:\n")
+        print(f"{'Fecha':<20} {'Evento':<10} {'PID':<10} {'Proceso':<30} {'Usuario'}")
+        print("-" * 86)
+        labelled = [('activo', event) for event in holders]
+        labelled += [(HISTORY_LABELS.get(event.event, event.event), event) for event in events]
+        for label, event in labelled:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.timestamp))
+            record = event.record
+            user = f"{record.user} [{record.netns}]" if record.netns else record.user
+            print(f"{when:<20} {label:<10} {record.pid:<10} {record.name:<30} {user}".rstrip())
+        sys.stdout.flush()
+    except BrokenPipeError:
+        _discard_stdout()
+    return True
 
 
-def main():
-    """Función principal para uso por línea de comandos"""
+def _discard_stdout() -> None:
+    """El lector se fue (p. ej. `| head`): evitar otro error al cerrar stdout"""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+
+def _cli_options() -> tuple:
+    """
+    Opciones de la línea de comandos como (flag, argumentos de add_argument).
+    
+    Las usan tanto argparse como el parser rápido de las invocaciones
+    habituales, así que no pueden divergir.
+    """
+    return (
+        ('--start', dict(type=int, default=3000,
+                         help='Puerto inicial del rango (default: 3000)')),
+        ('--end', dict(type=int, default=9000,
+                       help='Puerto final del rango (default: 9000)')),
+        ('--ports', dict(metavar='SPEC',
+                         help="Puertos y rangos a vigilar en lugar de --start/--end, "
+                              "p. ej. '3000-3010,5432,8000-8100,!8080' (! excluye)")),
+        ('--exclude', dict(metavar='SPEC',
+                           help='Puertos o rangos a excluir de la selección, '
+                                'p. ej. 8080,9000-9100')),
+        ('--find-free', dict(type=int, metavar='N',
+                             help='Imprimir N puertos libres de la selección, uno por línea')),
+        ('--reserve', dict(type=float, default=0.0, metavar='SECONDS',
+                           help='Con --find-free, reservar los puertos durante SECONDS para '
+                                'que otros lanzadores no los reciban')),
+        ('--history', dict(type=int, metavar='PORT',
+                           help='Mostrar qué procesos abrieron y cerraron el puerto, según '
+                                'el historial que guardan la bandeja y el daemon')),
+        ('--since', dict(metavar='WHEN',
+                         help="Con --history, desde cuándo: 30m, 1h, 2d o '2025-01-20 14:02'")),
+        ('--no-history', dict(action='store_true',
+                              help='Con --daemon, no guardar el historial de eventos')),
+        ('--list', dict(action='store_true',
+                        help='Listar procesos en el rango de puertos')),
+        ('--kill', dict(type=int, metavar='PORT',
+                        help='Matar proceso en puerto específico (puede estar fuera del rango)')),
+        ('--kill-all', dict(action='store_true',
+                            help='Matar todos los procesos en el rango')),
+        ('--wait-free', dict(action='store_true',
+                             help='Con --kill, esperar hasta que el puerto quede libre')),
+        ('--timeout', dict(type=float, default=10.0, metavar='SECONDS',
+                           help='Tiempo máximo de espera de --wait-free (default: 10)')),
+        ('--tree', dict(action='store_true',
+                        help='Matar también los procesos descendientes')),
+        ('--all-netns', dict(action='store_true',
+                             help='Escanear también los namespaces de red de contenedores '
+                                  'y de `ip netns` (requiere root)')),
+        ('--policy', dict(metavar='PATH',
+                          help='Fichero de reglas allow/deny que protegen procesos de --kill '
+                               'y --kill-all (default: ~/.config/port-destroyer/policy)')),
+        ('--no-policy', dict(action='store_true',
+                             help='Ignorar la política de protección')),
+        ('--grace', dict(type=float, default=2.0, metavar='SECONDS',
+                         help='Segundos de espera tras SIGTERM antes de SIGKILL '
+                              '(default: 2, 0 = SIGKILL)')),
+        ('--backend', dict(choices=('auto',) + tuple(SCANNER_BACKENDS), default='auto',
+                           help='Backend de escaneo (default: auto, elegido por calibración)')),
+        ('--benchmark', dict(action='store_true',
+                             help='Comparar el tiempo de escaneo de los backends disponibles')),
+        ('--calibrate', dict(action='store_true',
+                             help='Medir los backends y guardar el más rápido '
+                                  'como predeterminado')),
+        ('--daemon', dict(action='store_true',
+                          help='Ejecutar el daemon de snapshot en primer plano')),
+        ('--format', dict(choices=('table', 'json', 'ndjson', 'csv'), default='table',
+                          help='Formato de salida de --list (default: table)')),
+        ('--fields', dict(metavar='LIST',
+                          help='Campos de --list separados por comas: port,pid,name,user,netns '
+                               '(los que no se piden no se resuelven)')),
+        ('--sort', dict(action='store_true',
+                        help='Con --format json/ndjson/csv, ordenar por puerto y PID '
+                             '(por defecto se escribe en orden de escaneo)')),
+        ('--watch', dict(action='store_true',
+                         help='Emitir en stdout los cambios de listeners como NDJSON, '
+                              'en continuo')),
+        ('--interval', dict(type=float, metavar='SECONDS',
+                            help='Intervalo de refresco del daemon (default: 1) '
+                                 'o de sondeo de --watch (default: 0.25)')),
+        ('--socket', dict(metavar='PATH',
+                          help='Socket Unix del daemon (default: '
+                               '$XDG_RUNTIME_DIR/port-destroyer.sock '
+                               'o /tmp/port-destroyer-<uid>/, privado)')),
+        ('--no-daemon', dict(action='store_true',
+                             help='No consultar al daemon, escanear siempre directamente')),
+        ('--profile', dict(action='store_true',
+                           help='Escanear sin daemon e imprimir en stderr el tiempo de cada '
+                                'fase por backend, de los kills y los subprocesos lanzados')),
+        ('--metrics', dict(action='store_true',
+                           help='Imprimir las métricas del daemon en formato Prometheus')),
+        ('--metrics-port', dict(type=int, metavar='PORT',
+                                help='Con --daemon, servir métricas Prometheus en '
+                                     'http://127.0.0.1:PORT/metrics')),
+    )
+
+
+def _build_parser():
+    """Parser argparse completo: ayuda, abreviaturas y mensajes de error"""
     import argparse
     
     parser = argparse.ArgumentParser(
@@ -241,47 +1645,356 @@ Ejemplos:
   # Matar todos los procesos en el rango
   python3 port_destroyer.py --kill-all
   
+  # Matar y esperar a que el puerto quede libre (útil en CI)
+  python3 port_destroyer.py --kill 3000 --wait-free --timeout 5
+  
+  # Matar el proceso y todo su árbol (workers de npm/webpack, etc.)
+  python3 port_destroyer.py --kill 3000 --tree
+  
+  # Forzar SIGKILL inmediato, sin esperar a un cierre ordenado
+  python3 port_destroyer.py --kill 3000 --grace 0
+  
+  # Elegir dos puertos libres para un servidor de desarrollo y reservarlos 30 s
+  python3 port_destroyer.py --find-free 2 --ports 3000-3100 --reserve 30
+  
+  # Salida para scripts: solo puerto y PID, sin resolver nombres
+  python3 port_destroyer.py --list --format ndjson --fields port,pid
+  
   # Usar rango personalizado
   python3 port_destroyer.py --list --start 5000 --end 8000
+  
+  # Varios rangos y puertos sueltos en una sola instancia, con exclusiones
+  python3 port_destroyer.py --list --ports 3000-3010,5432,6379,8000-8100 --exclude 8080
+  
+  # Incluir los listeners de contenedores y namespaces de `ip netns`
+  sudo python3 port_destroyer.py --list --all-netns
+  
+  # Qué procesos tuvieron el puerto 8080 en la última hora
+  python3 port_destroyer.py --history 8080 --since 1h
+  
+  # Matar todo el rango salvo lo que proteja la política (bases de datos, root...)
+  python3 port_destroyer.py --kill-all --policy ~/.config/port-destroyer/policy
+  
+  # Medir los backends y guardar el más rápido
+  python3 port_destroyer.py --calibrate
+  
+  # Forzar un backend concreto (ss, netstat, lsof, proc, netlink)
+  python3 port_destroyer.py --list --backend netlink
+  
+  # Mantener el snapshot en segundo plano; --list y --kill lo usarán
+  python3 port_destroyer.py --daemon
+  
+  # Seguir en continuo los listeners que aparecen y desaparecen (NDJSON)
+  python3 port_destroyer.py --watch --interval 0.1
+  
+  # Dónde se va el tiempo de un escaneo: enumerar, resolver PIDs y nombres
+  python3 port_destroyer.py --list --profile --backend proc
+  
+  # Daemon con métricas para Prometheus en 127.0.0.1:9464
+  python3 port_destroyer.py --daemon --metrics-port 9464
         """
     )
     
-    parser.add_argument('--start', type=int, default=3000, 
-                       help='Puerto inicial del rango (default: 3000)')
-    parser.add_argument('--end', type=int, default=9000, 
-                       help='Puerto final del rango (default: 9000)')
-    parser.add_argument('--list', action='store_true', 
-                       help='Listar procesos en el rango de puertos')
-    parser.add_argument('--kill', type=int, metavar='PORT', 
-                       help='Matar proceso en puerto específico')
-    parser.add_argument('--kill-all', action='store_true', 
-                       help='Matar todos los procesos en el rango')
+    for flag, kwargs in _cli_options():
+        parser.add_argument(flag, **kwargs)
+    return parser
+
+
+def _parse_args_fast(argv: List[str]):
+    """
+    Parser mínimo para las invocaciones habituales (--list, --kill PORT...).
+    
+    Evita importar argparse (y re, gettext...) en cada llamada. Devuelve None
+    ante cualquier cosa que no entienda (--help, abreviaturas, valores
+    inválidos) para que argparse la procese con sus mensajes de siempre.
+    """
+    from types import SimpleNamespace
+    
+    options = {}
+    args = {}
+    for flag, kwargs in _cli_options():
+        dest = flag[2:].replace('-', '_')
+        options[flag] = (dest, kwargs)
+        args[dest] = False if kwargs.get('action') == 'store_true' else kwargs.get('default')
     
-    args = parser.parse_args()
+    tokens = iter(argv)
+    for token in tokens:
+        flag, sep, value = token.partition('=')
+        if flag not in options:
+            return None
+        dest, kwargs = options[flag]
+        
+        if kwargs.get('action') == 'store_true':
+            if sep:
+                return None
+            args[dest] = True
+            continue
+        
+        if not sep:
+            following = next(tokens, None)
+            if following is None or following.startswith('--'):
+                return None
+            value = following
+        try:
+            value = kwargs.get('type', str)(value)
+        except ValueError:
+            return None
+        if 'choices' in kwargs and value not in kwargs['choices']:
+            return None
+        args[dest] = value
+    
+    return SimpleNamespace(**args)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Función principal para uso por línea de comandos"""
+    argv = sys.argv[1:] if argv is None else argv
+    args = _parse_args_fast(argv)
+    if args is None:
+        args = _build_parser().parse_args(argv)
     
     # Validar rango
-    if args.start >= args.end:
+    if args.ports is None and args.start >= args.end:
         print("[ERROR] El puerto inicial debe ser menor que el puerto final")
         sys.exit(1)
     
-    destroyer = PortDestroyer(port_range=(args.start, args.end))
+    try:
+        ports = PortSet.parse(args.ports if args.ports is not None
+                              else f"{args.start}-{args.end}", args.exclude)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    
+    if args.since is not None and args.history is None:
+        print("[ERROR] --since solo tiene efecto con --history PORT")
+        sys.exit(1)
+    
+    since = None
+    if args.since is not None:
+        from port_destroyer_history import parse_since
+        try:
+            since = parse_since(args.since)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+    
+    if args.history is not None and not 0 < args.history < 65536:
+        print("[ERROR] El puerto debe estar entre 1 y 65535")
+        sys.exit(1)
+    
+    if args.kill is not None and not 0 < args.kill < 65536:
+        print("[ERROR] El puerto debe estar entre 1 y 65535")
+        sys.exit(1)
+    
+    if args.grace < 0:
+        print("[ERROR] El periodo de gracia no puede ser negativo")
+        sys.exit(1)
+    
+    if args.find_free is not None and args.find_free <= 0:
+        print("[ERROR] --find-free necesita un número de puertos mayor que 0")
+        sys.exit(1)
+    
+    if args.reserve < 0:
+        print("[ERROR] El tiempo de reserva no puede ser negativo")
+        sys.exit(1)
+    
+    if args.interval is not None and args.interval <= 0:
+        print("[ERROR] El intervalo debe ser mayor que 0")
+        sys.exit(1)
+    
+    if args.metrics_port is not None and not 0 < args.metrics_port < 65536:
+        print("[ERROR] El puerto de métricas debe estar entre 1 y 65535")
+        sys.exit(1)
     
-    if args.list:
-        destroyer.list_processes()
-    elif args.kill:
-        count = destroyer.kill_port(args.kill)
+    if args.profile:
+        # El desglose se imprime al salir, también tras un sys.exit()
+        import atexit
+        from port_destroyer_metrics import write_profile
+        atexit.register(write_profile, sys.stderr)
+    
+    # Con --all-netns la columna del namespace se muestra por defecto
+    fields = DEFAULT_FIELDS + ('netns',) if args.all_netns else DEFAULT_FIELDS
+    if args.fields is not None:
+        from port_destroyer_format import parse_fields
+        try:
+            fields = parse_fields(args.fields)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+    
+    # La política solo se carga (y compila) para las órdenes que matan
+    policy = None
+    if (args.kill is not None or args.kill_all or args.daemon) and not args.no_policy:
+        from port_destroyer_policy import load_policy
+        try:
+            policy = load_policy(args.policy)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Política: {e}")
+            sys.exit(1)
+    
+    destroyer = PortDestroyer(port_range=ports, backend=args.backend,
+                              grace_period=args.grace, kill_tree=args.tree,
+                              all_netns=args.all_netns, policy=policy)
+    
+    # Con un backend explícito el usuario quiere un escaneo directo; con
+    # --policy, el daemon no conoce ese fichero; con --profile hay que medir
+    # el escaneo en este proceso
+    use_daemon = (not args.no_daemon and not args.daemon and args.backend == 'auto'
+                  and args.policy is None and not args.profile)
+    
+    def daemon_request(request: Dict, timeout: Optional[float] = None) -> Optional[Dict]:
+        if not use_daemon:
+            return None
+        from port_destroyer_daemon import query_daemon, CLIENT_TIMEOUT
+        request.update(range=[ports.start, ports.end], ports=str(ports),
+                       grace=args.grace, tree=args.tree, all_netns=args.all_netns)
+        if args.no_policy:
+            request['policy'] = False
+        try:
+            response = query_daemon(request, args.socket, timeout or CLIENT_TIMEOUT)
+        except PermissionError as e:
+            # A stderr: --list puede estar escribiendo JSON en stdout
+            print(f"[WARN] {e}; se escanea directamente", file=sys.stderr)
+            return None
+        return response if response and response.get('ok') else None
+    
+    def kill_report(response: Optional[Dict]) -> int:
+        # El daemon devuelve los mensajes que este proceso habría impreso al matar
+        for message in response.get('messages', ()) if response else ():
+            print(message)
+        count = response.get('protected', 0) if response else len(destroyer.last_protected)
+        if count:
+            print(f"[INFO] {count} listener(s) protegido(s) por la política")
+        return count
+    
+    if args.daemon:
+        from port_destroyer_daemon import SnapshotDaemon
+        history = None
+        if not args.no_history:
+            from port_destroyer_history import HistoryLog
+            try:
+                history = HistoryLog()
+                history.open()
+                if not history.writer:
+                    print("[INFO] Otro proceso escribe el historial; se relevará cuando termine")
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Historial desactivado: {e}")
+                history = None
+        if args.metrics_port:
+            from port_destroyer_metrics import serve_metrics
+            try:
+                serve_metrics(args.metrics_port)
+                print(f"[INFO] Métricas en http://127.0.0.1:{args.metrics_port}/metrics")
+            except OSError as e:
+                print(f"[ERROR] Métricas: {e}")
+                sys.exit(1)
+        try:
+            SnapshotDaemon(destroyer, args.socket, refresh_interval=args.interval or 1.0,
+                           history=history).serve_forever()
+        except (RuntimeError, OSError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+    elif args.metrics:
+        if args.no_daemon:
+            print("[ERROR] --metrics consulta al daemon")
+            sys.exit(1)
+        from port_destroyer_daemon import query_daemon
+        try:
+            response = query_daemon({'op': 'metrics'}, args.socket)
+        except PermissionError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        if not response or not response.get('ok'):
+            print("[ERROR] No hay un daemon en ejecución (inícialo con --daemon o la bandeja)")
+            sys.exit(1)
+        sys.stdout.write(response['text'])
+    elif args.history is not None:
+        if not print_history(args.history, since, args.format):
+            sys.exit(1)
+    elif args.calibrate:
+        backend = destroyer.calibrate()
+        if backend:
+            print(f"[OK] Backend seleccionado: {backend} (guardado en {CALIBRATION_FILE})")
+        else:
+            print(f"[ERROR] No hay backends disponibles en {destroyer.os_type}")
+            sys.exit(1)
+    elif args.benchmark:
+        results = destroyer.benchmark_backends()
+        if not results:
+            print(f"[INFO] No hay backends para comparar en {destroyer.os_type}")
+            return
+        
+        print(f"\n{'Backend':<10} {'Media (ms)':<12} {'Procesos':<10} {'Coincide':<10}")
+        print("-" * 45)
+        for backend, stats in results.items():
+            matches = 'si' if stats['matches'] else 'NO'
+            print(f"{backend:<10} {stats['mean_ms']:<12.2f} {stats['count']:<10} {matches:<10}")
+    elif args.find_free is not None:
+        try:
+            free = destroyer.find_free_ports(args.find_free, reserve_ttl=args.reserve)
+        except PermissionError as e:
+            print(f"[ERROR] Reservas: {e}")
+            sys.exit(1)
+        if len(free) < args.find_free:
+            print(f"[ERROR] Solo hay {len(free)} puerto(s) libre(s) en {ports}")
+            sys.exit(1)
+        print('\n'.join(map(str, free)))
+    elif args.watch:
+        stream_watch(destroyer, args.interval or 0.25)
+    elif args.list:
+        records: Iterable[ListenerRecord]
+        response = daemon_request({'op': 'list'})
+        daemon_ports = (PortSet.coerce(response.get('ports') or response['range'])
+                        if response else None)
+        if (response and daemon_ports and ports.issubset(daemon_ports)
+                and (response.get('all_netns') or not args.all_netns)):
+            # El snapshot del daemon cubre los puertos (y namespaces) pedidos
+            records = Snapshot.from_dicts(response['processes']).in_ports(ports)
+            if not args.all_netns:
+                records = [record for record in records if not record.netns]
+        else:
+            # Generador: los registros se escriben según se resuelven
+            records = destroyer.iter_processes(fields)
+        
+        if args.format == 'table':
+            destroyer.print_processes(records, fields)
+        else:
+            stream_list(sorted(records) if args.sort else records, args.format, fields)
+    elif args.kill is not None and args.wait_free:
+        kill_timeout = args.grace + args.timeout + 5
+        response = daemon_request({'op': 'kill', 'port': args.kill, 'wait': True,
+                                   'timeout': args.timeout}, kill_timeout)
+        if response:
+            count, elapsed = response['killed'], response['elapsed']
+        else:
+            count, elapsed = destroyer.kill_port_and_wait(args.kill, args.timeout)
+        protected = kill_report(response)
         if count > 0:
             print(f"\n[OK] Se eliminaron {count} proceso(s) en puerto {args.kill}")
-        else:
+        elif not protected:
+            print(f"\n[INFO] No se encontraron procesos en puerto {args.kill}")
+        if elapsed is None:
+            print(f"[ERROR] El puerto {args.kill} sigue ocupado tras {args.timeout:g}s")
+            sys.exit(1)
+        print(f"[OK] Puerto {args.kill} libre en {elapsed * 1000:.0f} ms")
+    elif args.kill is not None:
+        response = daemon_request({'op': 'kill', 'port': args.kill}, args.grace + 5)
+        count = response['killed'] if response else destroyer.kill_port(args.kill)
+        protected = kill_report(response)
+        if count > 0:
+            print(f"\n[OK] Se eliminaron {count} proceso(s) en puerto {args.kill}")
+        elif not protected:
             print(f"\n[INFO] No se encontraron procesos en puerto {args.kill}")
     elif args.kill_all:
-        count = destroyer.kill_all()
+        response = daemon_request({'op': 'kill_all'}, args.grace + 5)
+        count = response['killed'] if response else destroyer.kill_all()
+        protected = kill_report(response)
         if count > 0:
             print(f"\n[OK] Se eliminaron {count} proceso(s) en total")
-        else:
+        elif not protected:
             print(f"\n[INFO] No se encontraron procesos para eliminar")
     else:
-        parser.print_help()
+        _build_parser().print_help()
 
 
 if __name__ == '__main__':
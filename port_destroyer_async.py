@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Async - asyncio front end for scanning and killing
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    AsyncPortDestroyer exposes the PortDestroyer API as coroutines for
+    asyncio services. External tools (ss, netstat, lsof, ps) run as asyncio
+    subprocesses, netlink dumps are read from a non-blocking socket and
+    kills wait for process exit on pidfds registered with the event loop,
+    so many scans and restarts can run concurrently from one loop. The
+    loop's default executor is used only for blocking /proc file reads
+    (socket tables, the socket inode index, the process tree, policy facts;
+    the latter two fall back to a short `ps` call where /proc is missing).
+    Signals, exit waits and scanner subprocesses never leave the loop, so a
+    restart does not go through the thread pool. Commands,
+    parsers, caches and kill semantics are shared with the synchronous
+    PortDestroyer through its public helpers.
+
+Usage:
+    destroyer = AsyncPortDestroyer(port_range='3000-3010,8000')
+    await asyncio.gather(*(destroyer.kill_port_and_wait(port) for port in (3000, 8000)))
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import asyncio
+import os
+import signal
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from port_destroyer import (
+    PROC_NET_TCP_FILES, RESOLVABLE_FIELDS, SCAN_PHASE_METRIC, SCANNER_BACKENDS, PortDestroyer
+)
+from port_destroyer_kill import (
+    KILL_TIMEOUT, OUTCOME_KILLED, OUTCOME_NOT_FOUND, OUTCOME_SURVIVED, OUTCOME_TERMINATED,
+    POLL_INTERVAL_MAX, POLL_INTERVAL_MIN, PS_TREE_ARGV, KillEngine, KillResult, is_alive,
+    open_pidfd, build_children_index, parse_ps_children
+)
+from port_destroyer_metrics import METRICS, count_subprocess, record_kills
+from port_destroyer_ports import PortSet
+from port_destroyer_snapshot import ListenerEvent, ListenerRecord, Snapshot, diff_events
+
+
+async def run_command(argv: List[str]) -> str:
+    """Ejecuta un comando como subproceso de asyncio y devuelve su stdout"""
+    count_subprocess(argv)
+    process = await asyncio.create_subprocess_exec(
+        *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    stdout, _ = await process.communicate()
+    return stdout.decode(errors='replace')
+
+
+class AsyncPortDestroyer:
+    """
+    Versión asyncio de PortDestroyer.
+
+    Envuelve un PortDestroyer (el indicado o uno nuevo) y comparte con él la
+    selección de puertos, el backend, el índice de sockets y las cachés. Los
+    métodos de kill no imprimen nada: devuelven los resultados y dejan en
+    `last_protected` los procesos que la política excluyó.
+
+    Con backend 'auto' y sin calibración guardada, la primera llamada calibra
+    de forma síncrona; un servicio puede evitarlo llamando a
+    `destroyer.calibrate()` al arrancar o usando un backend explícito.
+    """
+
+    def __init__(self, port_range=(3000, 9000), backend: str = 'auto',
+                 grace_period: float = 2.0, kill_tree: bool = False,
+                 all_netns: bool = False, policy=None,
+                 destroyer: Optional[PortDestroyer] = None,
+                 kill_timeout: float = KILL_TIMEOUT):
+        self.destroyer = destroyer or PortDestroyer(port_range=port_range, backend=backend,
+                                                    grace_period=grace_period,
+                                                    kill_tree=kill_tree,
+                                                    all_netns=all_netns, policy=policy)
+        # Tiempo máximo de espera tras SIGKILL
+        self.kill_timeout = kill_timeout
+
+    @property
+    def ports(self) -> PortSet:
+        """Selección de puertos del PortDestroyer envuelto"""
+        return self.destroyer.ports
+
+    @property
+    def last_protected(self) -> List[tuple]:
+        """(listener, motivo) que la política excluyó del último kill"""
+        return self.destroyer.last_protected
+
+    async def get_processes_on_ports(self, fields: Optional[Iterable[str]] = None
+                                     ) -> List[ListenerRecord]:
+        """
+        Procesos de la selección de puertos, sin ordenar.
+
+        Args:
+            fields: Campos que se van a usar. 'name' y 'user' solo se resuelven
+                si están incluidos; si no, quedan vacíos. None = todos.
+        """
+        backend = self.destroyer.resolve_backend()
+        if backend is None:
+            print(f"Sistema operativo no soportado: {self.destroyer.os_type}")
+            return []
+
+        resolve = RESOLVABLE_FIELDS if fields is None else RESOLVABLE_FIELDS.intersection(fields)
+        return await self._scan(backend, self.ports, resolve)
+
+    async def snapshot(self) -> Snapshot:
+        """Escanea la selección y devuelve un Snapshot inmutable"""
+        return Snapshot(await self.get_processes_on_ports())
+
+    async def find_port_listeners(self, port: int) -> List[ListenerRecord]:
+        """Procesos que escuchan en un único puerto (puede estar fuera de la selección)"""
+        backend = self.destroyer.resolve_backend()
+        if backend is None:
+            print(f"Sistema operativo no soportado: {self.destroyer.os_type}")
+            return []
+
+        return await self._scan(backend, PortSet.from_range(port, port))
+
+    async def _scan(self, backend: str, ports: PortSet,
+                    resolve: frozenset = RESOLVABLE_FIELDS) -> List[ListenerRecord]:
+        """Ejecuta un backend sin bloquear el bucle de eventos"""
+        with METRICS.timer('port_destroyer_scan_seconds', backend=backend):
+            records = await self._scan_backend(backend, ports, resolve)
+        METRICS.inc('port_destroyer_listeners_scanned_total', len(records), backend=backend)
+        return records
+
+    async def _scan_backend(self, backend: str, ports: PortSet,
+                            resolve: frozenset) -> List[ListenerRecord]:
+        destroyer = self.destroyer
+        spec = SCANNER_BACKENDS[backend]
+        names: Dict[int, str] = {}
+
+        try:
+            if spec.argv and spec.parser:
+                with METRICS.timer(SCAN_PHASE_METRIC, backend=backend, phase='enumerate'):
+                    output = await run_command(getattr(destroyer, spec.argv)(ports))
+                    entries, names = getattr(destroyer, spec.parser)(output, ports)
+            elif backend in ('netlink', 'proc'):
+                with METRICS.timer(SCAN_PHASE_METRIC, backend=backend, phase='enumerate'):
+                    listeners = await self._read_listeners(backend, ports)
+                # El índice de sockets recorre /proc/*/fd: fuera del bucle de eventos
+                with METRICS.timer(SCAN_PHASE_METRIC, backend=backend, phase='resolve_pids'):
+                    entries = (await asyncio.get_running_loop().run_in_executor(
+                        None, destroyer.listener_entries, listeners) if listeners else {})
+            else:
+                # Backend registrado por terceros sin comando: se ejecuta tal cual
+                return list(getattr(destroyer, spec.method)(ports, resolve))
+        except Exception as e:
+            print(f"Error obteniendo procesos con {backend}: {e}")
+            return []
+
+        if 'name' in resolve:
+            missing = {pid for _, pid in entries if pid not in names}
+            if missing:
+                with METRICS.timer(SCAN_PHASE_METRIC, backend=backend, phase='resolve_names'):
+                    names = {**names, **await self.resolve_names(missing)}
+        records = list(destroyer.build_records(entries, resolve, names, backend=backend))
+        if destroyer.all_netns and destroyer.os_type == "Linux":
+            # Lecturas de /proc en el pool de hilos de los namespaces
+            loop = asyncio.get_running_loop()
+            records += await loop.run_in_executor(
+                None, list, destroyer.scan_namespaces(ports, resolve))
+        return records
+
+    async def _read_listeners(self, backend: Optional[str], ports: PortSet) -> List[tuple]:
+        """
+        (puerto, inodo, uid) leídos del kernel sin lanzar procesos: por
+        netlink en el bucle de eventos o de /proc/net/tcp* en un hilo.
+        """
+        if backend != 'netlink':
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.destroyer.read_proc_listeners, ports)
+
+        import port_destroyer_netlink
+
+        filter_ranges = ports.filter_ranges()
+        listeners = await port_destroyer_netlink.query_listeners_async(filter_ranges)
+        if filter_ranges is not ports.ranges:
+            bitmap = ports.bitmap
+            listeners = [listener for listener in listeners if bitmap[listener[0]]]
+        return listeners
+
+    async def resolve_names(self, pids: Iterable[int]) -> Dict[int, str]:
+        """
+        {pid: nombre} desde la caché y /proc; los PIDs restantes se piden a
+        `ps` en un subproceso de asyncio.
+        """
+        cache = self.destroyer.name_cache
+        names, pending = cache.resolve_local(pids)
+        if pending:
+            try:
+                output = await run_command(cache.ps_argv(pending))
+            except OSError:
+                output = ''
+            names.update(cache.parse_ps(output, pending))
+        return names
+
+    async def listening_ports(self, ports: Optional[PortSet] = None) -> Set[int]:
+        """Puertos de la selección con algún socket en LISTEN, de cualquier usuario"""
+        ports = self.ports if ports is None else ports
+        destroyer = self.destroyer
+        backend = destroyer.resolve_backend()
+        if destroyer.os_type == "Linux":
+            try:
+                if backend == 'netlink' or os.path.exists(PROC_NET_TCP_FILES[0]):
+                    listeners = await self._read_listeners(backend, ports)
+                    return {port for port, _, _ in listeners}
+            except OSError:
+                pass
+        if backend is None:
+            return set()
+        return {record.port for record in await self._scan(backend, ports, frozenset())}
+
+    async def port_in_use(self, port: int) -> bool:
+        """Comprueba si hay algún socket en LISTEN en el puerto"""
+        return bool(await self.listening_ports(PortSet.from_range(port, port)))
+
+    async def listener_fingerprint(self) -> Optional[int]:
+        """Huella de la tabla de listeners (ver PortDestroyer.listener_fingerprint)"""
+        destroyer = self.destroyer
+        if destroyer.os_type != "Linux":
+            return None
+        backend = destroyer.resolve_backend()
+        if backend != 'netlink' and not os.path.exists(PROC_NET_TCP_FILES[0]):
+            return None
+        try:
+            listeners = await self._read_listeners(backend, self.ports)
+            if destroyer.all_netns:
+                loop = asyncio.get_running_loop()
+                for _, foreign in await loop.run_in_executor(
+                        None, destroyer.read_namespace_listeners, self.ports):
+                    listeners = listeners + foreign
+        except OSError:
+            return None
+        return hash(frozenset((port, inode) for port, inode, _ in listeners))
+
+    async def watch(self, interval: float = 0.25, stop_event: Optional[asyncio.Event] = None,
+                    include_initial: bool = True, full_refresh_interval: float = 30.0
+                    ) -> AsyncIterator[ListenerEvent]:
+        """
+        Iterador asíncrono de ListenerEvent (ver PortDestroyer.watch).
+
+        Args:
+            interval: Segundos entre sondeos
+            stop_event: asyncio.Event opcional para terminar la iteración
+            include_initial: Emitir 'opened' para los listeners ya presentes
+            full_refresh_interval: Segundos máximos entre escaneos completos
+        """
+        loop = asyncio.get_running_loop()
+        previous = None
+        first_seen: Dict[tuple, float] = {}
+        last_fingerprint = None
+        last_full_scan = 0.0
+
+        while stop_event is None or not stop_event.is_set():
+            fingerprint = await self.listener_fingerprint()
+            now = loop.time()
+
+            if (previous is None or fingerprint is None or fingerprint != last_fingerprint
+                    or now - last_full_scan >= full_refresh_interval):
+                snapshot = await self.snapshot()
+                last_fingerprint = fingerprint
+                last_full_scan = now
+
+                if previous is None and not include_initial:
+                    diff = None
+                    first_seen = {record.key: snapshot.taken_at for record in snapshot}
+                else:
+                    diff = snapshot.diff(previous)
+                previous = snapshot
+
+                if diff:
+                    for event in diff_events(diff, snapshot.taken_at, first_seen):
+                        yield event
+
+            if stop_event is None:
+                await asyncio.sleep(interval)
+            else:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def kill_processes(self, pids: Iterable[int]) -> Dict[int, KillResult]:
+        """
+        Mata varios procesos a la vez con la semántica de KillEngine: SIGTERM
+        a todos, espera concurrente durante el periodo de gracia y SIGKILL
+        solo para los que sigan vivos. Termina cuando todos han salido.
+
+        Returns:
+            Diccionario pid -> KillResult
+        """
+        if self.destroyer.os_type not in ["Darwin", "Linux"]:
+            return {}
+
+        start = time.perf_counter()
+        # Cada tarea envía su señal antes de su primer await, en el orden de `pids`
+        results = await asyncio.gather(*(self._terminate(pid, start)
+                                          for pid in dict.fromkeys(pids)))
+        record_kills(results)
+        return {result.pid: result for result in results}
+
+    async def _terminate(self, pid: int, start: float) -> KillResult:
+        """Termina un proceso, escalando de SIGTERM a SIGKILL"""
+        first_signal = signal.SIGTERM if self.destroyer.grace_period > 0 else signal.SIGKILL
+        # El pidfd se abre antes de la señal para no confundir un PID reutilizado
+        pidfd = open_pidfd(pid)
+        try:
+            outcome = KillEngine.send(pid, pidfd, first_signal)
+            if outcome:
+                return KillResult(pid, outcome, None, time.perf_counter() - start)
+
+            if first_signal == signal.SIGTERM:
+                if await self._wait_exit(pid, pidfd, self.destroyer.grace_period):
+                    return KillResult(pid, OUTCOME_TERMINATED, signal.SIGTERM,
+                                      time.perf_counter() - start)
+                outcome = KillEngine.send(pid, pidfd, signal.SIGKILL)
+                if outcome:
+                    # Salió justo entre el final de la espera y SIGKILL
+                    if outcome == OUTCOME_NOT_FOUND:
+                        outcome = OUTCOME_TERMINATED
+                    return KillResult(pid, outcome, first_signal, time.perf_counter() - start)
+
+            if await self._wait_exit(pid, pidfd, self.kill_timeout):
+                return KillResult(pid, OUTCOME_KILLED, signal.SIGKILL, time.perf_counter() - start)
+            return KillResult(pid, OUTCOME_SURVIVED, signal.SIGKILL, time.perf_counter() - start)
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+
+    async def _wait_exit(self, pid: int, pidfd: Optional[int], timeout: float) -> bool:
+        """
+        Espera a que el proceso salga. Con pidfd el bucle de eventos lo vigila
+        como un descriptor más; si no, se sondea con backoff.
+
+        Returns:
+            False si se agotó el timeout
+        """
+        loop = asyncio.get_running_loop()
+
+        if pidfd is not None:
+            exited = loop.create_future()
+
+            def on_exit():
+                if not exited.done():
+                    exited.set_result(True)
+
+            try:
+                loop.add_reader(pidfd, on_exit)
+            except NotImplementedError:
+                # Bucles sin add_reader (Proactor): sondear
+                pass
+            else:
+                try:
+                    await asyncio.wait_for(exited, timeout)
+                    return True
+                except asyncio.TimeoutError:
+                    return False
+                finally:
+                    loop.remove_reader(pidfd)
+
+        deadline = loop.time() + timeout
+        interval = POLL_INTERVAL_MIN
+        while is_alive(pid):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, POLL_INTERVAL_MAX)
+        return True
+
+    async def kill_process_trees(self,
+                                 processes: Iterable[ListenerRecord]) -> Dict[int, KillResult]:
+        """
+        Mata los procesos de los listeners y todos sus descendientes, con los
+        hijos primero; los descendientes protegidos por la política se añaden
+        a last_protected del PortDestroyer
+        """
+        destroyer = self.destroyer
+        processes = list(processes)
+        loop = asyncio.get_running_loop()
+        try:
+            if os.path.exists('/proc/self/stat'):
+                children = await loop.run_in_executor(None, build_children_index)
+            else:
+                children = parse_ps_children(await run_command(PS_TREE_ARGV))
+            # La política de los descendientes lee /proc o lanza ps
+            targets, protected = await loop.run_in_executor(
+                None, destroyer.tree_targets, processes, children,
+                {proc.pid for proc, _ in destroyer.last_protected})
+        except Exception as e:
+            print(f"Error obteniendo el árbol de procesos: {e}")
+            return {}
+
+        destroyer.last_protected = destroyer.last_protected + protected
+        return await self.kill_processes(targets)
+
+    async def _kill_listeners(self, processes: Iterable[ListenerRecord]) -> int:
+        """
+        Mata los procesos de una lista de listeners que permita la política y
+        cuenta los eliminados
+        """
+        protected = []
+        if self.destroyer.policy is not None:
+            # La política puede leer /proc o lanzar ps: fuera del bucle de eventos
+            loop = asyncio.get_running_loop()
+            processes, protected = await loop.run_in_executor(
+                None, self.destroyer.apply_policy, list(processes))
+        self.destroyer.last_protected = protected
+        pids = list(dict.fromkeys(proc.pid for proc in processes))
+        if self.destroyer.kill_tree:
+            results = await self.kill_process_trees(processes)
+        else:
+            results = await self.kill_processes(pids)
+        return sum(1 for result in results.values() if result.success)
+
+    async def kill_port(self, port: int) -> int:
+        """Mata todos los procesos en un puerto y espera a que salgan"""
+        processes = [proc for proc in await self.find_port_listeners(port) if proc.port == port]
+        return await self._kill_listeners(processes)
+
+    async def kill_all(self) -> int:
+        """Mata todos los procesos de la selección de puertos"""
+        # Las reglas de usuario de la política se evalúan sin resolver nombres
+        fields = ('port', 'user') if self.destroyer.policy is not None else ('port',)
+        return await self._kill_listeners(await self.get_processes_on_ports(fields=fields))
+
+    async def wait_port_free(self, port: int, timeout: float = 10.0) -> Optional[float]:
+        """
+        Espera a que el puerto quede libre, comprobándolo con backoff
+        exponencial (5 ms a 200 ms).
+
+        Returns:
+            Segundos que tardó en liberarse, o None si se agotó el timeout
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        interval = 0.005
+
+        while True:
+            if not await self.port_in_use(port):
+                return time.perf_counter() - start
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, 0.2)
+
+    async def kill_port_and_wait(self, port: int, timeout: float = 10.0) -> tuple:
+        """
+        Mata los procesos del puerto y espera a que el kernel lo libere.
+
+        Returns:
+            (procesos eliminados, segundos hasta quedar libre o None si se
+            agotó el timeout)
+        """
+        start = time.perf_counter()
+        killed = await self.kill_port(port)
+        remaining = max(0.0, timeout - (time.perf_counter() - start))
+
+        if await self.wait_port_free(port, remaining) is None:
+            return killed, None
+        return killed, time.perf_counter() - start
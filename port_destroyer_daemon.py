@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Daemon - Persistent port snapshot served over a Unix socket
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Keeps the listener snapshot current in a long-lived process (standalone
+    or embedded in the system tray) and answers list/kill requests from the
+    CLI over a local Unix domain socket, so each CLI call costs a round trip
+    instead of a full scan.
+
+Protocol:
+    Every message is a 4-byte big-endian length followed by a UTF-8 JSON
+    object. Requests carry an "op" field ("ping", "list", "kill",
+    "kill_all", "metrics"); responses always carry "ok". Kill responses
+    also carry the outcome of each PID, the PIDs the policy protected and
+    the messages the CLI prints, since the kill runs in the daemon.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import os
+import stat
+import struct
+import threading
+import time
+
+from port_destroyer_ports import PortSet
+from port_destroyer_snapshot import Snapshot
+
+# El cliente se importa en cada invocación del CLI: json, socket y
+# socketserver se cargan solo cuando hay un daemon al que hablar o que servir
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import socket
+    from typing import Dict, List, Optional
+
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Tiempo máximo que espera el cliente antes de recurrir al escaneo directo
+CLIENT_TIMEOUT = 0.5
+
+
+def private_runtime_dir() -> str:
+    """
+    Directorio solo accesible por el usuario: $XDG_RUNTIME_DIR o, sin él,
+    /tmp/port-destroyer-<uid> creado con permisos 0700.
+
+    Raises:
+        PermissionError: si el directorio de /tmp existe y no es un
+            directorio privado del usuario (otro usuario se adelantó)
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return runtime_dir
+
+    path = f"/tmp/port-destroyer-{os.getuid()}"
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or info.st_mode & 0o077):
+        raise PermissionError(f"{path} no es un directorio privado del usuario actual")
+    return path
+
+
+def default_socket_path() -> str:
+    """Ruta del socket en el directorio privado del usuario"""
+    return os.path.join(private_runtime_dir(), 'port-destroyer.sock')
+
+
+def check_socket_owner(path: str) -> bool:
+    """
+    Comprueba que `path` es un socket del usuario actual.
+
+    Returns:
+        False si no existe
+
+    Raises:
+        PermissionError: si existe pero no es un socket o pertenece a otro
+            usuario (podría servir listados y kills falsos)
+    """
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} no es un socket del usuario actual: no se usa")
+    return True
+
+
+def send_frame(sock: socket.socket, message: Dict) -> None:
+    """Envía un mensaje con su cabecera de longitud"""
+    import json
+
+    payload = json.dumps(message, separators=(',', ':')).encode()
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Dict]:
+    """Recibe un mensaje completo; None si el otro extremo cerró"""
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"Mensaje demasiado grande: {size} bytes")
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        return None
+    import json
+
+    message: Dict = json.loads(payload)
+    return message
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Lee exactamente `size` bytes del socket"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            return None
+        received += count
+    return bytes(buffer)
+
+
+def query_daemon(request: Dict, socket_path: Optional[str] = None,
+                 timeout: Optional[float] = CLIENT_TIMEOUT) -> Optional[Dict]:
+    """
+    Envía una petición al daemon.
+
+    Returns:
+        La respuesta, o None si no hay daemon escuchando (el llamador debe
+        hacer el escaneo directo)
+
+    Raises:
+        PermissionError: si el socket (o su directorio) es de otro usuario
+    """
+    path = socket_path or default_socket_path()
+    if not check_socket_owner(path):
+        return None
+
+    import socket
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            send_frame(sock, request)
+            return recv_frame(sock)
+    except (OSError, ValueError):
+        return None
+
+
+_server_class = None
+
+
+def _get_server_class():
+    """Servidor Unix con un hilo por conexión (importa socketserver al arrancar)"""
+    global _server_class
+    if _server_class is not None:
+        return _server_class
+
+    import socketserver
+
+    class _RequestHandler(socketserver.BaseRequestHandler):
+        """Atiende las peticiones de una conexión"""
+
+        def handle(self):
+            daemon = self.server.daemon_ref
+            while True:
+                try:
+                    request = recv_frame(self.request)
+                except (OSError, ValueError):
+                    return
+                if request is None:
+                    return
+                try:
+                    response = daemon.handle_request(request)
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                send_frame(self.request, response)
+
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, socket_path: str):
+            super().__init__(socket_path, _RequestHandler)
+
+    _server_class = _UnixServer
+    return _server_class
+
+
+class SnapshotDaemon:
+    """
+    Mantiene el snapshot de listeners y lo sirve por un socket Unix.
+
+    En modo independiente refresca el snapshot en su propio hilo. Embebido en
+    la bandeja (refresh_interval=None) recibe los snapshots con publish().
+    """
+
+    def __init__(self, destroyer, socket_path: Optional[str] = None,
+                 refresh_interval: Optional[float] = 1.0, history=None):
+        self.destroyer = destroyer
+        # HistoryLog abierto donde guardar los cambios de cada refresco
+        self.history = history
+        # Sin ruta, se elige al arrancar (el directorio privado puede fallar)
+        self.socket_path = socket_path
+        self.refresh_interval = refresh_interval
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._snapshot = Snapshot()
+        self._updated_at = 0.0
+        self._stale = True
+        self._server = None
+        self._threads: List[threading.Thread] = []
+
+    def publish(self, snapshot: Snapshot) -> None:
+        """Actualiza el snapshot servido y guarda sus cambios en el historial"""
+        with self._lock:
+            if self.history is not None:
+                # Sin bloqueo de escritor (la bandeja ya escribe) no se guarda nada
+                self.history.update(snapshot, self._snapshot if self._updated_at else None,
+                                    self.destroyer.ports, self.destroyer.all_netns)
+            self._snapshot = snapshot
+            self._updated_at = time.time()
+            self._stale = False
+
+    def refresh(self) -> Snapshot:
+        """Escanea de nuevo y publica el resultado"""
+        snapshot: Snapshot = self.destroyer.snapshot()
+        self.publish(snapshot)
+        return snapshot
+
+    def snapshot(self) -> tuple:
+        """Devuelve (snapshot, segundos de antigüedad), refrescando si hace falta"""
+        with self._lock:
+            stale = self._stale
+        if stale:
+            self.refresh()
+        with self._lock:
+            return self._snapshot, time.time() - self._updated_at
+
+    def handle_request(self, request: Dict) -> Dict:
+        """Procesa una petición del protocolo"""
+        op = request.get('op')
+        destroyer = self.destroyer
+
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+
+        if op == 'list':
+            snapshot, age = self.snapshot()
+            return {
+                'ok': True,
+                'range': [destroyer.start_port, destroyer.end_port],
+                'ports': str(destroyer.ports),
+                'all_netns': destroyer.all_netns,
+                'age': age,
+                'processes': snapshot.to_dicts()
+            }
+
+        if op == 'kill':
+            port = int(request['port'])
+            scoped = self._scoped(request)
+            if request.get('wait'):
+                killed, elapsed = scoped.kill_port_and_wait(
+                    port, float(request.get('timeout', 10.0)))
+            else:
+                killed, elapsed = scoped.kill_port(port), None
+            self._mark_stale()
+            return {'ok': True, 'killed': killed, 'elapsed': elapsed, **self._kill_outcome(scoped)}
+
+        if op == 'kill_all':
+            scoped = self._scoped(request)
+            killed = scoped.kill_all()
+            self._mark_stale()
+            return {'ok': True, 'killed': killed, **self._kill_outcome(scoped)}
+
+        if op == 'metrics':
+            from port_destroyer_metrics import METRICS
+            return {'ok': True, 'text': METRICS.render()}
+
+        return {'ok': False, 'error': f"Operación desconocida: {op}"}
+
+    def _scoped(self, request: Dict):
+        """
+        Copia del PortDestroyer con las opciones de la petición (puertos,
+        gracia, árbol, namespaces, sin política). Comparte el índice de
+        sockets y la caché de nombres.
+        """
+        import copy
+
+        scoped = copy.copy(self.destroyer)
+        if 'ports' in request or 'range' in request:
+            # 'range' es el formato de los clientes anteriores a 'ports'
+            scoped.ports = PortSet.coerce(request.get('ports') or request['range'])
+        if 'grace' in request:
+            scoped.grace_period = max(0.0, float(request['grace']))
+        if 'tree' in request:
+            scoped.kill_tree = bool(request['tree'])
+        if 'all_netns' in request:
+            scoped.all_netns = bool(request['all_netns'])
+        if request.get('policy') is False:
+            scoped.policy = None
+        # Los mensajes del kill vuelven al cliente en lugar de a la salida del daemon
+        scoped.kill_messages = []
+        scoped.last_results = {}
+        return scoped
+
+    @staticmethod
+    def _kill_outcome(scoped) -> Dict:
+        """Resultado de un kill por PID, listeners protegidos y mensajes para el cliente"""
+        return {
+            'outcomes': {str(pid): result.outcome for pid, result in scoped.last_results.items()},
+            'protected': len(scoped.last_protected),
+            'protected_pids': [proc.pid for proc, _ in scoped.last_protected],
+            'messages': scoped.kill_messages,
+        }
+
+    def _mark_stale(self) -> None:
+        with self._lock:
+            self._stale = True
+
+    def start(self) -> None:
+        """
+        Abre el socket y arranca los hilos del servidor y de refresco.
+
+        Raises:
+            RuntimeError: si ya hay un daemon escuchando
+            OSError: si el socket no se puede crear o es de otro usuario
+        """
+        if self.socket_path is None:
+            self.socket_path = default_socket_path()
+        if query_daemon({'op': 'ping'}, self.socket_path) is not None:
+            raise RuntimeError(f"Ya hay un daemon escuchando en {self.socket_path}")
+        if check_socket_owner(self.socket_path):
+            # Socket huérfano (nuestro) de una ejecución anterior
+            os.unlink(self.socket_path)
+
+        old_umask = os.umask(0o177)
+        try:
+            server = self._server = _get_server_class()(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        server.daemon_ref = self
+
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        self._threads.append(server_thread)
+
+        if self.refresh_interval:
+            refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            refresh_thread.start()
+            self._threads.append(refresh_thread)
+
+    def _refresh_loop(self) -> None:
+        """Refresca el snapshot periódicamente (modo independiente)"""
+        while not self.stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[ERROR] Actualizando snapshot: {e}")
+            self.stop_event.wait(self.refresh_interval)
+
+    def stop(self) -> None:
+        """Detiene el servidor y borra el socket"""
+        self.stop_event.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def serve_forever(self) -> None:
+        """Ejecuta el daemon en primer plano hasta Ctrl+C"""
+        import signal
+
+        self.start()
+        print(f"[INFO] Daemon escuchando en {self.socket_path}")
+        signal.signal(signal.SIGTERM, lambda sig, frame: self.stop_event.set())
+        try:
+            while not self.stop_event.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Format - Streaming table/JSON/NDJSON/CSV writers for listeners
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Writes ListenerRecords to a stream one row at a time as they come out of
+    the scanner, so machine-readable output (`--format json|ndjson|csv`)
+    never waits for the whole list nor sorts it unless asked to. Only the
+    selected fields are written (`--fields port,pid`).
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+from port_destroyer_snapshot import DEFAULT_FIELDS, RECORD_FIELDS
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Iterable, TextIO
+    from port_destroyer_snapshot import ListenerRecord
+
+OUTPUT_FORMATS = ('table', 'json', 'ndjson', 'csv')
+
+# Cabecera y ancho de cada columna de la tabla
+TABLE_COLUMNS = {
+    'port': ('Puerto', 10),
+    'pid': ('PID', 10),
+    'name': ('Proceso', 30),
+    'user': ('Usuario', 15),
+    'netns': ('Namespace', 24),
+}
+
+
+def parse_fields(value: str) -> tuple:
+    """
+    Convierte 'port,pid' en ('port', 'pid').
+
+    Raises:
+        ValueError: si hay un campo desconocido o la lista está vacía
+    """
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in RECORD_FIELDS]
+    if unknown:
+        raise ValueError(f"Campo desconocido: {', '.join(unknown)} "
+                         f"(disponibles: {', '.join(RECORD_FIELDS)})")
+    if not fields:
+        raise ValueError(f"No se indicó ningún campo (disponibles: {', '.join(RECORD_FIELDS)})")
+    return fields
+
+
+def write_records(records: Iterable[ListenerRecord], out: TextIO, fmt: str = 'json',
+                  fields: Iterable[str] = DEFAULT_FIELDS) -> int:
+    """
+    Escribe los registros en `out` a medida que llegan.
+
+    Returns:
+        Número de registros escritos
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato desconocido: {fmt}")
+    return _WRITERS[fmt](records, out, tuple(fields))
+
+
+def _write_table(records, out, fields) -> int:
+    columns = [TABLE_COLUMNS[field] for field in fields]
+    out.write(' '.join(f"{title:<{width}}" for title, width in columns).rstrip() + '\n')
+    out.write('-' * (sum(width + 1 for _, width in columns) - 1) + '\n')
+    count = 0
+    for record in records:
+        out.write(' '.join(f"{getattr(record, field)!s:<{width}}"
+                           for field, (_, width) in zip(fields, columns)).rstrip() + '\n')
+        count += 1
+    return count
+
+
+def _write_json(records, out, fields) -> int:
+    import json
+
+    count = 0
+    out.write('[')
+    for record in records:
+        out.write(',\n ' if count else '\n ')
+        out.write(json.dumps({field: getattr(record, field) for field in fields},
+                             separators=(',', ':')))
+        count += 1
+    out.write('\n]\n' if count else ']\n')
+    return count
+
+
+def _write_ndjson(records, out, fields) -> int:
+    import json
+
+    count = 0
+    for record in records:
+        out.write(json.dumps({field: getattr(record, field) for field in fields},
+                             separators=(',', ':')) + '\n')
+        # Cada línea es un documento completo: el lector puede procesarla ya
+        out.flush()
+        count += 1
+    return count
+
+
+def _write_csv(records, out, fields) -> int:
+    import csv
+
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(fields)
+    count = 0
+    for record in records:
+        writer.writerow([getattr(record, field) for field in fields])
+        count += 1
+    return count
+
+
+_WRITERS = {
+    'table': _write_table,
+    'json': _write_json,
+    'ndjson': _write_ndjson,
+    'csv': _write_csv,
+}
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer History - Memory-mapped ring log of listener open/close events
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Records the opened / closed / changed events of each snapshot diff (from
+    the tray loop or the standalone daemon) as fixed 80-byte records in a
+    memory-mapped file of bounded size that wraps around like a ring. A
+    per-port table in the header points at each port's newest record and
+    every record points at the previous one for the same port, so
+    `--history 8080 --since 1h` walks only that port's events, newest
+    first, and stops at the start of the window. Each record also keeps how
+    many PIDs held the port after it, so looking up the holders at a given
+    instant stops as soon as all of them have been found.
+
+    Only one process writes at a time: the tray and a standalone daemon
+    compete for an exclusive flock on `<log>.lock`; the loser maps the log
+    read-only and takes over (reconciling with its current snapshot) when
+    the writer exits.
+
+File layout:
+    header (64 bytes) | per-port heads (65536 x u64) | records (capacity x 80)
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import fcntl
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+from port_destroyer_snapshot import (
+    EVENT_CHANGED, EVENT_CLOSED, EVENT_OPENED, ListenerRecord, Snapshot, SnapshotDiff
+)
+from port_destroyer_ports import PortSet
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Iterator, List, Optional, Tuple
+
+# Registros del anillo por defecto: 65536 x 80 bytes = 5 MB (+512 KB de índice)
+HISTORY_CAPACITY = 65536
+
+HISTORY_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'port-destroyer', 'history.log'
+)
+
+_MAGIC = b'PDHIST\x00\x02'
+# Versión anterior, sin el número de PIDs en cada registro: se reinicia
+_MAGIC_V1 = b'PDHIST\x00\x01'
+# magic, capacidad, registros escritos desde la creación
+_HEADER = struct.Struct('<8sIxxxxQ')
+_HEADER_SIZE = 64
+# Por puerto: número de secuencia + 1 de su último registro (0 = ninguno)
+_HEADS = struct.Struct('<Q')
+_HEADS_SIZE = 65536 * _HEADS.size
+# timestamp, secuencia + 1 del registro anterior del mismo puerto, pid,
+# puerto, evento, PIDs en el puerto tras el evento, name, user, netns
+_RECORD = struct.Struct('<dQIHBB24s16s16s')
+_RECORDS_OFFSET = _HEADER_SIZE + _HEADS_SIZE
+# Posición del número de PIDs dentro del registro
+_HOLDERS_OFFSET = 23
+# Tope del contador: a partir de aquí hay que recorrer la cadena entera
+_HOLDERS_UNKNOWN = 255
+
+_EVENT_CODES = {EVENT_OPENED: 1, EVENT_CLOSED: 2, EVENT_CHANGED: 3}
+_EVENT_NAMES = {code: event for event, code in _EVENT_CODES.items()}
+
+# Sufijos de --since: 30s, 15m, 1h, 2d
+_SINCE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class HistoryEvent(namedtuple('HistoryEvent', 'timestamp event record')):
+    """Evento guardado en el historial: hora (epoch), tipo y ListenerRecord"""
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        """Diccionario serializable (una línea de NDJSON)"""
+        data = {'event': self.event, 'ts': round(self.timestamp, 6)}
+        data.update(self.record.to_dict())
+        return data
+
+
+def parse_since(value: str, now: Optional[float] = None) -> float:
+    """
+    Convierte '1h', '30m', '2d', '45s', segundos sueltos o una fecha ISO
+    ('2025-01-20 14:02') en un instante epoch.
+
+    Raises:
+        ValueError: si el valor no tiene ninguno de esos formatos
+    """
+    now = time.time() if now is None else now
+    value = value.strip()
+    unit = _SINCE_UNITS.get(value[-1:].lower())
+    try:
+        if unit:
+            return now - float(value[:-1]) * unit
+        return now - float(value)
+    except ValueError:
+        pass
+
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Instante inválido: {value!r} (usa 30m, 1h, 2d o "
+                         f"'AAAA-MM-DD HH:MM')") from None
+
+
+def _pack_text(text: str, size: int) -> bytes:
+    # Un recorte en medio de un carácter multibyte se descarta al leer
+    return text.encode('utf-8')[:size]
+
+
+def _unpack_text(data: bytes) -> str:
+    return data.rstrip(b'\x00').decode('utf-8', 'ignore')
+
+
+class HistoryLog:
+    """
+    Historial de eventos de listeners en un anillo de registros fijos mapeado
+    en memoria.
+
+    Escribir un evento es un struct.pack_into sobre el mapa y la actualización
+    de dos enteros, bajo un flock que solo se toma si el diff trae cambios: un
+    sondeo sin cambios no cuesta nada. Al llenarse el anillo, los registros
+    más antiguos se sobrescriben.
+
+    Sin `readonly`, el log intenta ser el único escritor (flock exclusivo
+    sobre `<path>.lock`); si otro proceso ya lo es, queda en solo lectura
+    hasta que update() consiga el bloqueo.
+
+        with HistoryLog() as history:
+            history.update(snapshot, previous, ports=destroyer.ports)
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = HISTORY_CAPACITY,
+                 readonly: bool = False):
+        self.path = path or HISTORY_FILE
+        self.capacity = capacity
+        self.readonly = readonly
+        # Este proceso tiene el bloqueo de escritor
+        self.writer = False
+        self._fd: Optional[int] = None
+        self._lock_fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        # La primera escritura de un escritor reconcilia con el snapshot
+        self._reconciled = False
+
+    def __enter__(self) -> 'HistoryLog':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """
+        Abre (o crea, salvo en solo lectura) el fichero y lo mapea.
+
+        Raises:
+            FileNotFoundError: en solo lectura, si aún no hay historial
+            ValueError: si el fichero no es un historial válido
+        """
+        if self.readonly:
+            fd = os.open(self.path, os.O_RDONLY)
+        else:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._fd = fd
+        try:
+            if not self.readonly:
+                self._acquire_writer()
+            try:
+                self._map_file()
+            except ValueError:
+                # El escritor aún no lo ha inicializado: se mapea al relevarlo
+                if self.readonly or self.writer:
+                    raise
+        except BaseException:
+            self.close()
+            raise
+
+    def _map_file(self) -> None:
+        """Mapea el fichero abierto, inicializándolo si este proceso es el escritor"""
+        fd = self._fd
+        assert fd is not None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        fcntl.flock(fd, fcntl.LOCK_EX if self.writer else fcntl.LOCK_SH)
+        try:
+            size = os.fstat(fd).st_size
+            if self.writer and size >= _HEADER.size and os.pread(fd, 8, 0) == _MAGIC_V1:
+                # Formato anterior: se empieza un historial nuevo
+                os.ftruncate(fd, 0)
+                size = 0
+            if size == 0 and self.writer:
+                # Fichero disperso: el disco solo se ocupa al escribir
+                size = _RECORDS_OFFSET + self.capacity * _RECORD.size
+                os.ftruncate(fd, size)
+                os.pwrite(fd, _HEADER.pack(_MAGIC, self.capacity, 0), 0)
+            if size < _RECORDS_OFFSET:
+                raise ValueError(f"Historial inválido: {self.path}")
+            access = mmap.ACCESS_WRITE if self.writer else mmap.ACCESS_READ
+            view = self._map = mmap.mmap(fd, size, access=access)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+        magic, capacity, _ = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or size < _RECORDS_OFFSET + capacity * _RECORD.size:
+            raise ValueError(f"Historial inválido: {self.path}")
+        # El fichero existente manda sobre la capacidad pedida
+        self.capacity = capacity
+
+    def close(self) -> None:
+        """Desmapea y cierra el fichero y suelta el bloqueo de escritor"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._release_writer()
+
+    def _acquire_writer(self) -> bool:
+        """Intenta (sin esperar) ser el único proceso que escribe el historial"""
+        if self.writer:
+            return True
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.writer = True
+        self._reconciled = False
+        return True
+
+    def _release_writer(self) -> None:
+        if self._lock_fd is not None:
+            # Cerrar el descriptor suelta el flock
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.writer = False
+
+    def _take_over(self) -> bool:
+        """Pasa a escritor si el anterior terminó, remapeando el log con escritura"""
+        if self.readonly or not self._acquire_writer():
+            return False
+        self._map_file()
+        return True
+
+    def _require_open(self) -> Tuple[int, mmap.mmap]:
+        """Descriptor y mapa del historial, que debe estar abierto y mapeado"""
+        if self._fd is None or self._map is None:
+            raise ValueError(f"Historial no abierto: {self.path}")
+        return self._fd, self._map
+
+    @property
+    def written(self) -> int:
+        """Registros escritos desde la creación del fichero (incluidos los ya rotados)"""
+        return int(_HEADER.unpack_from(self._require_open()[1], 0)[2])
+
+    def append(self, events: List[HistoryEvent]) -> None:
+        """
+        Añade eventos al anillo en una sola sección bajo el bloqueo.
+
+        Raises:
+            PermissionError: si otro proceso es el escritor del historial
+        """
+        if not events:
+            return
+        if not self.writer:
+            raise PermissionError(f"Otro proceso escribe el historial {self.path}")
+        fd, view = self._require_open()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            written = _HEADER.unpack_from(view, 0)[2]
+            for timestamp, event, record in events:
+                head_offset = _HEADER_SIZE + record.port * _HEADS.size
+                previous = _HEADS.unpack_from(view, head_offset)[0]
+                holders = self._holders_after(record.port, previous, written, event)
+                _RECORD.pack_into(view, _RECORDS_OFFSET + (written % self.capacity) * _RECORD.size,
+                                  timestamp, previous, record.pid, record.port,
+                                  _EVENT_CODES[event], holders, _pack_text(record.name, 24),
+                                  _pack_text(record.user, 16), _pack_text(record.netns, 16))
+                written += 1
+                _HEADS.pack_into(view, head_offset, written)
+                # Los recorridos de la cadena leen el contador de la cabecera
+                _HEADER.pack_into(view, 0, _MAGIC, self.capacity, written)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _holders_after(self, port: int, previous: int, written: int, event: str) -> int:
+        """PIDs en el puerto tras el evento, a partir del registro anterior del puerto"""
+        count = 0
+        if previous and previous - 1 >= written - self.capacity:
+            view = self._require_open()[1]
+            count = view[_RECORDS_OFFSET + ((previous - 1) % self.capacity) * _RECORD.size
+                         + _HOLDERS_OFFSET]
+            if count == _HOLDERS_UNKNOWN:
+                count = len(self.holders_at(port, float('inf')))
+        if event == EVENT_OPENED:
+            count += 1
+        elif event == EVENT_CLOSED:
+            count = max(count - 1, 0)
+        return min(count, _HOLDERS_UNKNOWN)
+
+    def update(self, snapshot: Snapshot, previous: Optional[Snapshot] = None,
+               ports: Optional[PortSet] = None, all_netns: bool = True) -> int:
+        """
+        Guarda los cambios de un nuevo snapshot si este proceso es (o puede
+        pasar a ser) el escritor: el diff con `previous` o, en la primera
+        escritura, una reconciliación completa con record_initial().
+
+        Returns:
+            Número de eventos guardados (0 si otro proceso escribe)
+        """
+        if not self.writer and not self._take_over():
+            return 0
+        if previous is None or not self._reconciled:
+            self._reconciled = True
+            return self.record_initial(snapshot, ports, all_netns)
+        return self.record(snapshot.diff(previous), snapshot.taken_at)
+
+    def record(self, diff: SnapshotDiff, timestamp: float) -> int:
+        """
+        Guarda los eventos de un diff de snapshots (closed, changed y opened).
+
+        Returns:
+            Número de eventos guardados
+        """
+        if not diff:
+            return 0
+        events = [HistoryEvent(timestamp, EVENT_CLOSED, record) for record in diff.removed]
+        events += [HistoryEvent(timestamp, EVENT_CHANGED, record) for record in diff.changed]
+        events += [HistoryEvent(timestamp, EVENT_OPENED, record) for record in diff.added]
+        self.append(events)
+        return len(events)
+
+    def record_initial(self, snapshot: Snapshot, ports: Optional[PortSet] = None,
+                       all_netns: bool = True) -> int:
+        """
+        Reconcilia el historial con el primer snapshot de un escritor (p. ej.
+        tras reiniciar la bandeja): 'opened' para los listeners que el
+        historial no tenga abiertos y 'closed', con la hora del snapshot,
+        para los que seguía dando por abiertos y ya no están.
+
+        Args:
+            ports, all_netns: Alcance del escaneo que produjo el snapshot;
+                solo se cierran los listeners que ese escaneo habría visto
+        """
+        current = {record.key for record in snapshot}
+        by_port: Dict[int, List[ListenerRecord]] = {}
+        for record in snapshot:
+            by_port.setdefault(record.port, []).append(record)
+
+        heads = array('Q')
+        heads.frombytes(self._require_open()[1][_HEADER_SIZE:_RECORDS_OFFSET])
+        if sys.byteorder != 'little':
+            heads.byteswap()
+        candidates = {port for port, head in enumerate(heads)
+                      if head and (ports is None or port in ports)}
+
+        events = []
+        for port in sorted(candidates | by_port.keys()):
+            open_pids = set()
+            for entry in self.holders_at(port, float('inf')):
+                open_pids.add(entry.record.pid)
+                record = entry.record
+                if (record.key not in current and port in candidates
+                        and (all_netns or not record.netns)):
+                    events.append(HistoryEvent(snapshot.taken_at, EVENT_CLOSED, record))
+            for record in by_port.get(port, ()):
+                if record.pid not in open_pids:
+                    events.append(HistoryEvent(snapshot.taken_at, EVENT_OPENED, record))
+        self.append(events)
+        return len(events)
+
+    def port_events(self, port: int) -> Iterator[HistoryEvent]:
+        """
+        Eventos de un puerto del más reciente al más antiguo, siguiendo la
+        cadena de registros del puerto: no se lee ningún otro registro.
+        """
+        for entry, _ in self._chain(port):
+            yield entry
+
+    def _chain(self, port: int) -> Iterator[Tuple[HistoryEvent, int]]:
+        """(evento, PIDs en el puerto tras él) del más reciente al más antiguo"""
+        view = self._require_open()[1]
+        capacity = self.capacity
+        oldest = self.written - capacity
+        sequence = _HEADS.unpack_from(view, _HEADER_SIZE + port * _HEADS.size)[0]
+        # Los números de secuencia van +1 (0 = fin de la cadena)
+        while sequence and sequence - 1 >= oldest:
+            (timestamp, previous, pid, record_port, code, holders,
+             name, user, netns) = _RECORD.unpack_from(
+                view, _RECORDS_OFFSET + ((sequence - 1) % capacity) * _RECORD.size)
+            if record_port != port:
+                # Registro sobrescrito entre la lectura del contador y esta
+                return
+            yield (HistoryEvent(timestamp, _EVENT_NAMES.get(code, '?'),
+                                ListenerRecord(port, pid, _unpack_text(name), _unpack_text(user),
+                                               _unpack_text(netns))),
+                   holders)
+            sequence = previous
+
+    def query(self, port: int, since: float = 0.0,
+              until: Optional[float] = None) -> List[HistoryEvent]:
+        """Eventos de un puerto entre `since` y `until`, del más antiguo al más reciente"""
+        events = []
+        for entry in self.port_events(port):
+            if entry.timestamp < since:
+                break
+            if until is None or entry.timestamp <= until:
+                events.append(entry)
+        events.reverse()
+        return events
+
+    def holders_at(self, port: int, when: float) -> List[HistoryEvent]:
+        """
+        Últimos eventos 'opened' o 'changed' anteriores a `when` de cada PID
+        que seguía escuchando en el puerto en ese instante.
+
+        El primer registro anterior a `when` dice cuántos PIDs había: el
+        recorrido termina en cuanto se han encontrado todos.
+        """
+        seen = set()
+        holders = []
+        expected = None
+        for entry, count in self._chain(port):
+            if entry.timestamp > when:
+                continue
+            if expected is None:
+                expected = count
+            if entry.record.pid not in seen:
+                seen.add(entry.record.pid)
+                if entry.event != EVENT_CLOSED:
+                    holders.append(entry)
+            if expected != _HOLDERS_UNKNOWN and len(holders) >= expected:
+                break
+        holders.reverse()
+        return holders
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Icons - Pre-rendered, disk-cached tray icon variants
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Renders every tray icon variant (size x status) from assets/icon.svg
+    once and stores the PNGs in a cache directory keyed by the SVG content
+    hash. Later launches load the PNGs directly; cairosvg and PIL are only
+    imported on a cache miss.
+"""
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import hashlib
+import os
+from typing import Dict
+
+SVG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'icon.svg')
+
+ICON_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'port-destroyer', 'icons'
+)
+
+# Bump when the badge drawing changes so old cached variants are ignored
+ICON_RENDER_VERSION = 1
+
+# Icon states: False = no processes (green), True = with processes (red)
+ICON_STATES = (False, True)
+
+
+def _svg_digest(svg_path: str) -> str:
+    """Content hash of the SVG plus the render version"""
+    with open(svg_path, 'rb') as f:
+        digest = hashlib.sha256(f.read())
+    digest.update(f"v{ICON_RENDER_VERSION}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _variant_paths(key: str, size: int) -> Dict[bool, str]:
+    """PNG path of every status variant for a cache key and size"""
+    cache_dir = os.path.join(ICON_CACHE_DIR, key)
+    return {state: os.path.join(cache_dir, f"icon_{size}_{'red' if state else 'green'}.png")
+            for state in ICON_STATES}
+
+
+def icon_paths(size: int, svg_path: str = SVG_PATH) -> Dict[bool, str]:
+    """
+    Return {has_processes: png_path} for the given size, rendering both
+    variants on a cache miss.
+    """
+    key = _svg_digest(svg_path) if os.path.exists(svg_path) else 'fallback'
+    paths = _variant_paths(key, size)
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    from PIL import Image
+
+    base_img = _rasterize_svg(svg_path, size)
+    if base_img is None:
+        # Fallback: simple icon with badge. Not stored under the SVG hash so
+        # the real icon is rendered once cairosvg works.
+        paths = _variant_paths('fallback', size)
+        base_img = Image.new('RGBA', (size, size), (100, 100, 100, 255))
+
+    os.makedirs(os.path.dirname(paths[False]), exist_ok=True)
+    for state, path in paths.items():
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        add_status_badge(base_img, state).save(tmp_path, 'PNG')
+        os.replace(tmp_path, path)
+    print(f"[INFO] Icons created ({size}x{size}) with status badges")
+    return paths
+
+
+def _rasterize_svg(svg_path: str, size: int):
+    """Convert the SVG to a PIL image, or None if it cannot be rendered"""
+    if not os.path.exists(svg_path):
+        return None
+    try:
+        from io import BytesIO
+        from PIL import Image
+        import cairosvg
+        png_data = cairosvg.svg2png(url=svg_path, output_width=size, output_height=size)
+        return Image.open(BytesIO(png_data))
+    except Exception as e:
+        print(f"[ERROR] Rendering icon: {e}")
+        return None
+
+
+def add_status_badge(image, has_processes=False):
+    """Add status badge to icon"""
+    from PIL import ImageDraw
+
+    img_with_badge = image.copy()
+    draw = ImageDraw.Draw(img_with_badge)
+
+    # Calculate badge position (top-right corner)
+    width, height = img_with_badge.size
+    badge_size = max(8, width // 8)
+    badge_x = width - badge_size - 2
+    badge_y = 2
+
+    # Badge color based on process status
+    badge_color = (220, 53, 69) if has_processes else (40, 167, 69)
+
+    # Draw badge circle
+    draw.ellipse([badge_x, badge_y, badge_x + badge_size, badge_y + badge_size],
+                 fill=badge_color, outline=(255, 255, 255), width=1)
+
+    return img_with_badge
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Kill - Parallel graceful process termination
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Signals every target process at once, waits for all of them concurrently
+    (pidfd + poll on Linux, signal-0 probing elsewhere) and escalates from
+    SIGTERM to SIGKILL only for the processes still alive after the grace
+    period.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import os
+import select
+import signal
+import time
+from collections import deque, namedtuple
+
+from port_destroyer_metrics import count_subprocess
+
+# typing se evita en tiempo de ejecución para no alargar el arranque del CLI
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional
+
+# Resultados posibles de terminar un proceso
+OUTCOME_TERMINATED = 'terminated'   # salió tras SIGTERM
+OUTCOME_KILLED = 'killed'           # hizo falta SIGKILL
+OUTCOME_NOT_FOUND = 'not_found'     # ya no existía
+OUTCOME_DENIED = 'denied'           # sin permisos para enviar la señal
+OUTCOME_SURVIVED = 'survived'       # sigue vivo tras SIGKILL y el timeout
+
+SUCCESS_OUTCOMES = (OUTCOME_TERMINATED, OUTCOME_KILLED)
+
+# Tiempo máximo de espera tras SIGKILL
+KILL_TIMEOUT = 2.0
+
+# Intervalos de sondeo cuando no hay pidfd (macOS, kernels antiguos)
+POLL_INTERVAL_MIN = 0.005
+POLL_INTERVAL_MAX = 0.1
+
+# Relación pid -> ppid de todos los procesos donde no hay /proc
+PS_TREE_ARGV = ['ps', '-A', '-o', 'pid=,ppid=']
+
+
+class KillResult(namedtuple('KillResult', 'pid outcome signal elapsed')):
+    """Resultado de terminar un proceso: pid, outcome, signal (o None) y elapsed"""
+    __slots__ = ()
+
+    @property
+    def success(self) -> bool:
+        return self.outcome in SUCCESS_OUTCOMES
+
+
+def open_pidfd(pid: int) -> Optional[int]:
+    """Abre un pidfd si el sistema lo permite (Linux >= 5.3, Python >= 3.9)"""
+    if not hasattr(os, 'pidfd_open'):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None
+
+
+def is_alive(pid: int) -> bool:
+    """Indica si el proceso sigue vivo (un zombi cuenta como terminado)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            data = f.read()
+        return data[data.rindex(b')') + 2:data.rindex(b')') + 3] != b'Z'
+    except (OSError, ValueError):
+        return True
+
+
+class KillEngine:
+    """
+    Termina varios procesos en paralelo.
+
+    Todas las señales se envían de una vez y las esperas son concurrentes, así
+    que terminar N procesos cuesta como mucho un periodo de gracia más el
+    timeout de SIGKILL, independientemente de N.
+    """
+
+    def __init__(self, grace_period: float = 2.0, kill_timeout: float = KILL_TIMEOUT):
+        self.grace_period = grace_period
+        self.kill_timeout = kill_timeout
+
+    def terminate(self, pids: Iterable[int]) -> Dict[int, KillResult]:
+        """
+        Envía SIGTERM (o SIGKILL si el periodo de gracia es 0) a todos los
+        PIDs, espera a que salgan y escala a SIGKILL con los que sigan vivos.
+
+        Returns:
+            Diccionario pid -> KillResult
+        """
+        start = time.perf_counter()
+        results: Dict[int, KillResult] = {}
+        # pid -> pidfd (o None si hay que sondear)
+        pending: Dict[int, Optional[int]] = {}
+
+        first_signal = signal.SIGTERM if self.grace_period > 0 else signal.SIGKILL
+
+        try:
+            for pid in dict.fromkeys(pids):
+                # El pidfd se abre antes de la señal para no confundir un PID reutilizado
+                pidfd = open_pidfd(pid)
+                outcome = self.send(pid, pidfd, first_signal)
+                if outcome:
+                    results[pid] = KillResult(pid, outcome, None, time.perf_counter() - start)
+                    if pidfd is not None:
+                        os.close(pidfd)
+                else:
+                    pending[pid] = pidfd
+
+            if first_signal == signal.SIGTERM and pending:
+                self._wait(pending, self.grace_period, OUTCOME_TERMINATED,
+                           signal.SIGTERM, start, results)
+
+            if pending:
+                for pid, pidfd in list(pending.items()):
+                    outcome = self.send(pid, pidfd, signal.SIGKILL)
+                    if outcome:
+                        # Salió justo entre el final de la espera y SIGKILL
+                        if outcome == OUTCOME_NOT_FOUND:
+                            outcome = OUTCOME_TERMINATED
+                        results[pid] = KillResult(pid, outcome, first_signal,
+                                                  time.perf_counter() - start)
+                        self._release(pending, pid)
+
+            if pending:
+                self._wait(pending, self.kill_timeout, OUTCOME_KILLED,
+                           signal.SIGKILL, start, results)
+
+            for pid in list(pending):
+                results[pid] = KillResult(pid, OUTCOME_SURVIVED, signal.SIGKILL,
+                                          time.perf_counter() - start)
+                self._release(pending, pid)
+        finally:
+            for pid in list(pending):
+                self._release(pending, pid)
+
+        return results
+
+    @staticmethod
+    def send(pid: int, pidfd: Optional[int], sig: int) -> Optional[str]:
+        """Envía una señal; devuelve un resultado final si no se pudo enviar"""
+        try:
+            if pidfd is not None and hasattr(signal, 'pidfd_send_signal'):
+                signal.pidfd_send_signal(pidfd, sig)
+            else:
+                os.kill(pid, sig)
+        except ProcessLookupError:
+            return OUTCOME_NOT_FOUND
+        except PermissionError:
+            return OUTCOME_DENIED
+        return None
+
+    def _wait(self, pending: Dict[int, Optional[int]], timeout: float, outcome: str,
+              sig: int, start: float, results: Dict[int, KillResult]) -> None:
+        """Espera concurrentemente a que salgan los procesos pendientes"""
+        deadline = time.perf_counter() + timeout
+        poller = None
+        fd_to_pid = {pidfd: pid for pid, pidfd in pending.items() if pidfd is not None}
+
+        if fd_to_pid:
+            poller = select.poll()
+            for pidfd in fd_to_pid:
+                poller.register(pidfd, select.POLLIN)
+
+        interval = POLL_INTERVAL_MIN
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            polled = [pid for pid, pidfd in pending.items() if pidfd is None]
+            wait = remaining if not polled else min(remaining, interval)
+
+            if poller is not None and fd_to_pid:
+                for pidfd, _ in poller.poll(wait * 1000):
+                    pid = fd_to_pid.pop(pidfd)
+                    poller.unregister(pidfd)
+                    results[pid] = KillResult(pid, outcome, sig, time.perf_counter() - start)
+                    self._release(pending, pid)
+            elif polled:
+                time.sleep(wait)
+
+            for pid in polled:
+                if not is_alive(pid):
+                    results[pid] = KillResult(pid, outcome, sig, time.perf_counter() - start)
+                    self._release(pending, pid)
+            interval = min(interval * 2, POLL_INTERVAL_MAX)
+
+    @staticmethod
+    def _release(pending: Dict[int, Optional[int]], pid: int) -> None:
+        """Saca un PID de la lista de pendientes y cierra su pidfd"""
+        pidfd = pending.pop(pid, None)
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def build_children_index(proc_root: str = '/proc') -> Dict[int, List[int]]:
+    """
+    Construye el índice padre -> hijos en una sola pasada.
+
+    En Linux lee /proc/<pid>/stat de cada proceso; en otros sistemas hace
+    una única llamada a `ps`.
+    """
+    children: Dict[int, List[int]] = {}
+
+    if os.path.isdir(proc_root) and os.path.exists(f'{proc_root}/self/stat'):
+        for entry in os.listdir(proc_root):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'{proc_root}/{entry}/stat', 'rb') as f:
+                    data = f.read()
+                # Campos tras el nombre: estado, ppid, ...
+                ppid = int(data[data.rindex(b')') + 2:].split(None, 2)[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+        return children
+
+    import subprocess
+
+    count_subprocess(PS_TREE_ARGV)
+    try:
+        result = subprocess.run(PS_TREE_ARGV, capture_output=True, text=True)
+    except OSError:
+        return children
+    return parse_ps_children(result.stdout)
+
+
+def parse_ps_children(output: str) -> Dict[int, List[int]]:
+    """Índice padre -> hijos a partir de la salida de PS_TREE_ARGV"""
+    children: Dict[int, List[int]] = {}
+    for line in output.splitlines():
+        parts = line.split()
+        try:
+            if len(parts) == 2:
+                children.setdefault(int(parts[1]), []).append(int(parts[0]))
+        except ValueError:
+            continue
+    return children
+
+
+def expand_process_tree(pids: Iterable[int],
+                        children: Optional[Dict[int, List[int]]] = None) -> List[int]:
+    """
+    Devuelve los PIDs indicados junto con todos sus descendientes, con los
+    más profundos primero para que los hijos reciban la señal antes que sus
+    padres. Nunca incluye init, el proceso actual ni sus ancestros (la
+    shell o el terminal que lanzó el CLI pueden ser dueños del puerto).
+    """
+    if children is None:
+        children = build_children_index()
+
+    excluded = {0, 1} | own_ancestors(children)
+    order: List[int] = []
+    seen = set()
+    queue = deque(pid for pid in pids if pid not in excluded)
+
+    while queue:
+        pid = queue.popleft()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        order.append(pid)
+        queue.extend(child for child in children.get(pid, ()) if child not in excluded)
+
+    order.reverse()
+    return order
+
+
+def own_ancestors(children: Dict[int, List[int]]) -> set:
+    """El proceso actual y su cadena de padres según el índice padre -> hijos"""
+    parents = {child: parent for parent, kids in children.items() for child in kids}
+    pid = os.getpid()
+    ancestors = {pid}
+    # getppid() cubre el caso de un índice sin el proceso actual
+    parent = parents.get(pid, os.getppid())
+    while parent > 1 and parent not in ancestors:
+        ancestors.add(parent)
+        parent = parents.get(parent, 0)
+    return ancestors
+
+
+def summarize(results: Dict[int, KillResult]) -> List[str]:
+    """Líneas legibles con el resultado y la duración de cada proceso"""
+    return [f"PID {r.pid}: {r.outcome} ({r.elapsed * 1000:.0f} ms)"
+            for r in sorted(results.values(), key=lambda r: r.pid)]
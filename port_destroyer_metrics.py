@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Metrics - Latency histograms, counters and a Prometheus endpoint
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Process-wide registry of counters and fixed-bucket latency histograms
+    filled by the scanner (per backend and per phase: enumerate, resolve
+    PIDs, resolve names), the kill engine, the tray loop and every spawned
+    subprocess. Recording is a dictionary lookup and a few additions under
+    a lock. The registry renders as Prometheus text, served over HTTP on
+    127.0.0.1 by the tray and the daemon (`--metrics-port`) or printed as a
+    per-phase breakdown by `--profile`.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import threading
+import time
+from bisect import bisect_left
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+# Límites superiores (segundos) de los buckets de latencia
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Descripción (# HELP) de cada métrica
+METRIC_HELP = {
+    'port_destroyer_scan_seconds': 'Duración de un escaneo completo de listeners',
+    'port_destroyer_scan_phase_seconds': 'Duración de cada fase de un escaneo',
+    'port_destroyer_listeners_scanned_total': 'Listeners devueltos por los escaneos',
+    'port_destroyer_subprocesses_total': 'Subprocesos lanzados, por comando',
+    'port_destroyer_kill_seconds': 'Tiempo hasta la salida de cada proceso eliminado',
+    'port_destroyer_kills_total': 'Procesos a los que se envió una señal, por resultado',
+    'port_destroyer_tray_poll_seconds': 'Duración de cada sondeo de la bandeja',
+    'port_destroyer_tray_polls_total': 'Sondeos de la bandeja, por resultado',
+    'port_destroyer_tray_redraws_total': 'Actualizaciones del menú de la bandeja',
+    'port_destroyer_tray_redraw_seconds':
+        'Duración de cada actualización del menú de la bandeja',
+}
+
+# Fases de un escaneo, en el orden en que se ejecutan
+SCAN_PHASES = ('enumerate', 'resolve_pids', 'resolve_names')
+
+
+class Histogram:
+    """Histograma de buckets fijos con suma y número de observaciones"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Un contador por bucket más el de +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Contadores e histogramas indexados por (nombre, etiquetas)"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[tuple, float] = {}
+        self._histograms: Dict[tuple, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Suma `value` al contador"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Añade una observación (en segundos) al histograma"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels) -> 'Timer':
+        """Gestor de contexto que observa la duración del bloque"""
+        return Timer(self, name, labels)
+
+    def reset(self) -> None:
+        """Borra todas las métricas"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def counters(self, name: str) -> List[Tuple[dict, float]]:
+        """[(etiquetas, valor)] de un contador"""
+        with self._lock:
+            return [(dict(labels), value) for (metric, labels), value
+                    in sorted(self._counters.items()) if metric == name]
+
+    def histograms(self, name: str) -> List[Tuple[dict, Histogram]]:
+        """[(etiquetas, histograma)] de un histograma"""
+        with self._lock:
+            return [(dict(labels), histogram) for (metric, labels), histogram
+                    in sorted(self._histograms.items(), key=lambda item: item[0])
+                    if metric == name]
+
+    def render(self) -> str:
+        """Métricas en el formato de texto de Prometheus (versión 0.0.4)"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(((key, (list(h.counts), h.sum, h.count, h.buckets))
+                                 for key, h in self._histograms.items()), key=lambda item: item[0])
+
+        lines = []
+        current = None
+        for (name, labels), value in counters:
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.9g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+class Timer:
+    """Mide un bloque `with` y lo observa en el histograma al salir"""
+
+    __slots__ = ('registry', 'name', 'labels', 'start', 'elapsed')
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> 'Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.elapsed = time.perf_counter() - self.start
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+# Registro del proceso: lo comparten el escáner, el kill, la bandeja y el daemon
+METRICS = MetricsRegistry()
+
+
+def count_subprocess(argv: Sequence[str]) -> None:
+    """Cuenta un subproceso lanzado, etiquetado con su ejecutable"""
+    METRICS.inc('port_destroyer_subprocesses_total', command=argv[0] if argv else '?')
+
+
+def record_kills(results: Iterable) -> None:
+    """Registra el resultado y el tiempo hasta la salida de cada KillResult"""
+    for result in results:
+        METRICS.inc('port_destroyer_kills_total', outcome=result.outcome)
+        METRICS.observe('port_destroyer_kill_seconds', result.elapsed, outcome=result.outcome)
+
+
+def write_profile(out: TextIO, registry: Optional[MetricsRegistry] = None) -> None:
+    """
+    Escribe el desglose de `--profile`: escaneos y fases por backend, kills
+    y subprocesos lanzados.
+    """
+    registry = registry or METRICS
+    rows = []
+    for labels, histogram in registry.histograms('port_destroyer_scan_seconds'):
+        rows.append((f"escaneo [{labels.get('backend', '?')}]", histogram))
+    for labels, histogram in sorted(
+            registry.histograms('port_destroyer_scan_phase_seconds'),
+            key=lambda item: (item[0].get('backend', ''),
+                              SCAN_PHASES.index(item[0]['phase'])
+                              if item[0].get('phase') in SCAN_PHASES else len(SCAN_PHASES))):
+        rows.append((f"  {labels.get('phase', '?')} [{labels.get('backend', '?')}]", histogram))
+    for labels, histogram in registry.histograms('port_destroyer_kill_seconds'):
+        rows.append((f"kill [{labels.get('outcome', '?')}]", histogram))
+
+    out.write(f"\n{'Fase':<32} {'Veces':>6} {'Total (ms)':>11} {'Media (ms)':>11}\n")
+    out.write('-' * 63 + '\n')
+    for label, histogram in rows:
+        mean = histogram.sum / histogram.count if histogram.count else 0.0
+        out.write(f"{label:<32} {histogram.count:>6} {histogram.sum * 1000:>11.2f} "
+                  f"{mean * 1000:>11.2f}\n")
+    if not rows:
+        out.write("(sin escaneos ni kills)\n")
+
+    subprocesses = registry.counters('port_destroyer_subprocesses_total')
+    total = sum(value for _, value in subprocesses)
+    detail = ', '.join(f"{labels.get('command', '?')}={value:g}" for labels, value in subprocesses)
+    out.write(f"Subprocesos: {total:g}" + (f" ({detail})" if detail else '') + '\n')
+
+
+def serve_metrics(port: int, host: str = '127.0.0.1',
+                  registry: Optional[MetricsRegistry] = None):
+    """
+    Sirve GET /metrics en texto de Prometheus desde un hilo en segundo plano.
+
+    Returns:
+        El servidor HTTP (para llamar a shutdown() al terminar)
+
+    Raises:
+        OSError: si no se puede abrir el puerto
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or METRICS
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Sin una línea en stdout por cada scrape
+            pass
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Netlink - sock_diag (INET_DIAG) listener query for Linux
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Queries the kernel for listening TCP sockets through NETLINK_SOCK_DIAG
+    using only the standard library. The port ranges are sent as an INET_DIAG
+    bytecode filter, so the kernel only returns sockets inside them.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import os
+import socket
+import struct
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import List, Sequence, Tuple
+
+# Constantes de linux/netlink.h, linux/sock_diag.h y linux/inet_diag.h
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+
+INET_DIAG_REQ_BYTECODE = 1
+INET_DIAG_BC_JMP = 1
+INET_DIAG_BC_S_GE = 2
+INET_DIAG_BC_S_LE = 3
+
+TCP_LISTEN = 10
+
+# struct nlmsghdr
+NLMSGHDR = struct.Struct('=LHHLL')
+# struct inet_diag_req_v2 (sin inet_diag_sockid, que se envía a ceros)
+INET_DIAG_REQ_V2 = struct.Struct('=BBBxL')
+INET_DIAG_SOCKID_SIZE = 48
+# struct rtattr
+RTATTR = struct.Struct('=HH')
+# struct inet_diag_bc_op
+BC_OP = struct.Struct('=BBH')
+
+# Offsets dentro de struct inet_diag_msg
+DIAG_MSG_SPORT = struct.Struct('>H')
+DIAG_MSG_SPORT_OFFSET = 4
+DIAG_MSG_UID_INODE = struct.Struct('=LL')
+DIAG_MSG_UID_OFFSET = 64
+DIAG_MSG_SIZE = 72
+
+RECV_BUFFER_SIZE = 64 * 1024
+
+
+def is_available() -> bool:
+    """Indica si el kernel acepta sockets NETLINK_SOCK_DIAG"""
+    if not hasattr(socket, 'AF_NETLINK'):
+        return False
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG)
+    except OSError:
+        return False
+    sock.close()
+    return True
+
+
+def build_port_filter(ranges: Sequence[Tuple[int, int]]) -> bytes:
+    """
+    Compila `sport` dentro de alguno de los rangos (inicio, fin) en bytecode
+    INET_DIAG.
+
+    Cada comparación ocupa dos operaciones: la condición y un operando cuyo
+    campo `no` lleva el puerto. Si una comparación falla se salta al rango
+    siguiente; si las dos de un rango se cumplen, un JMP lleva al final del
+    programa, que acepta el socket. Fallar en el último rango salta a
+    `len + 4`, que lo rechaza. El kernel audita el programa siguiendo los
+    saltos `yes`, así que estos avanzan siempre a la operación siguiente.
+    """
+    op_size = BC_OP.size * 2
+    block_sizes = [op_size * 2 + BC_OP.size] * (len(ranges) - 1) + [op_size * 2]
+    total = sum(block_sizes)
+
+    bytecode = bytearray()
+    for (start_port, end_port), block_size in zip(ranges, block_sizes):
+        block_end = len(bytecode) + block_size
+        for code, port in ((INET_DIAG_BC_S_GE, start_port), (INET_DIAG_BC_S_LE, end_port)):
+            if block_end < total:
+                fail = block_end - len(bytecode)
+            else:
+                fail = total - len(bytecode) + 4
+            bytecode += BC_OP.pack(code, op_size, fail)
+            bytecode += BC_OP.pack(0, 0, port)
+        if block_end < total:
+            bytecode += BC_OP.pack(INET_DIAG_BC_JMP, BC_OP.size, total - len(bytecode))
+    return bytes(bytecode)
+
+
+def build_request(family: int, ranges: Sequence[Tuple[int, int]], seq: int = 1) -> bytes:
+    """Construye el mensaje SOCK_DIAG_BY_FAMILY para sockets TCP en LISTEN"""
+    bytecode = build_port_filter(ranges)
+    attr = RTATTR.pack(RTATTR.size + len(bytecode), INET_DIAG_REQ_BYTECODE) + bytecode
+
+    payload = (INET_DIAG_REQ_V2.pack(family, socket.IPPROTO_TCP, 0, 1 << TCP_LISTEN)
+               + bytes(INET_DIAG_SOCKID_SIZE) + attr)
+    header = NLMSGHDR.pack(NLMSGHDR.size + len(payload), SOCK_DIAG_BY_FAMILY,
+                           NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+    return header + payload
+
+
+def parse_messages(view: memoryview, listeners: List[Tuple[int, int, int]]) -> bool:
+    """
+    Recorre las respuestas netlink de un datagrama sin copiar datos.
+
+    Añade (puerto, inodo, uid) a `listeners` y devuelve True al llegar a
+    NLMSG_DONE. Lanza OSError si el kernel responde con NLMSG_ERROR.
+    """
+    offset = 0
+    size = len(view)
+
+    while offset + NLMSGHDR.size <= size:
+        msg_len, msg_type, _, _, _ = NLMSGHDR.unpack_from(view, offset)
+        if msg_len < NLMSGHDR.size:
+            break
+
+        if msg_type == NLMSG_DONE:
+            return True
+        if msg_type == NLMSG_ERROR:
+            errno = -struct.unpack_from('=i', view, offset + NLMSGHDR.size)[0]
+            if errno:
+                raise OSError(errno, os.strerror(errno))
+            return True
+
+        body = offset + NLMSGHDR.size
+        if msg_type == SOCK_DIAG_BY_FAMILY and msg_len - NLMSGHDR.size >= DIAG_MSG_SIZE:
+            port = DIAG_MSG_SPORT.unpack_from(view, body + DIAG_MSG_SPORT_OFFSET)[0]
+            uid, inode = DIAG_MSG_UID_INODE.unpack_from(view, body + DIAG_MSG_UID_OFFSET)
+            if inode:
+                listeners.append((port, inode, uid))
+
+        # Los mensajes netlink están alineados a 4 bytes
+        offset += (msg_len + 3) & ~3
+
+    return False
+
+
+def query_listeners(ranges: Sequence[Tuple[int, int]],
+                    families: Tuple[int, ...] = (socket.AF_INET, socket.AF_INET6)
+                    ) -> List[Tuple[int, int, int]]:
+    """
+    Devuelve (puerto, inodo, uid) de los sockets TCP en LISTEN dentro de
+    alguno de los rangos (inicio, fin).
+
+    El filtro de puertos se evalúa en el kernel, así que el coste no depende
+    del número total de sockets del sistema.
+    """
+    listeners: List[Tuple[int, int, int]] = []
+    buffer = bytearray(RECV_BUFFER_SIZE)
+    view = memoryview(buffer)
+
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG) as sock:
+        for seq, family in enumerate(families, start=1):
+            sock.send(build_request(family, ranges, seq))
+            done = False
+            while not done:
+                received = sock.recv_into(buffer)
+                if not received:
+                    break
+                done = parse_messages(view[:received], listeners)
+
+    return listeners
+
+
+async def query_listeners_async(ranges: Sequence[Tuple[int, int]],
+                                families: Tuple[int, ...] = (socket.AF_INET, socket.AF_INET6)
+                                ) -> List[Tuple[int, int, int]]:
+    """
+    Igual que query_listeners() pero con el socket en modo no bloqueante y
+    las respuestas esperadas en el bucle de eventos de asyncio.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    listeners: List[Tuple[int, int, int]] = []
+    buffer = bytearray(RECV_BUFFER_SIZE)
+    view = memoryview(buffer)
+
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG) as sock:
+        sock.setblocking(False)
+        for seq, family in enumerate(families, start=1):
+            await loop.sock_sendall(sock, build_request(family, ranges, seq))
+            done = False
+            while not done:
+                received = await loop.sock_recv_into(sock, buffer)
+                if not received:
+                    break
+                done = parse_messages(view[:received], listeners)
+
+    return listeners
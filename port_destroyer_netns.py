@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer NetNS - Network namespace discovery for container-aware scans
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Finds the network namespaces other than our own (dev containers,
+    `ip netns` sandboxes) by the inode of /proc/<pid>/ns/net, keeps one
+    representative PID per namespace and labels each one with its
+    `ip netns` name or container ID. Each namespace's listener table is
+    read through the representative's /proc/<pid>/net/tcp*, several
+    namespaces at a time in a bounded thread pool.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import os
+import threading
+from collections import namedtuple
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Dict, List, Optional, Tuple
+
+# Hilos máximos leyendo tablas de namespaces a la vez
+NETNS_MAX_WORKERS = 8
+
+# Directorios donde `ip netns` monta los namespaces con nombre
+NAMED_NETNS_DIRS = ('/run/netns', '/var/run/netns')
+
+# Prefijos del scope de cgroup de cada runtime de contenedores
+CONTAINER_RUNTIMES = (
+    ('docker-', 'docker'), ('docker/', 'docker'), ('libpod-', 'podman'),
+    ('cri-containerd-', 'containerd'), ('crio-', 'crio'), ('lxc.payload.', 'lxc'),
+)
+
+
+class NetNamespace(namedtuple('NetNamespace', 'inode pid label')):
+    """Namespace de red: inodo de ns/net, PID representativo y etiqueta legible"""
+    __slots__ = ()
+
+    @property
+    def tcp_files(self) -> Tuple[str, str]:
+        """Tablas TCP del namespace vistas a través de su PID representativo"""
+        return (f'/proc/{self.pid}/net/tcp', f'/proc/{self.pid}/net/tcp6')
+
+
+class NetNamespaceIndex:
+    """
+    Índice persistente PID -> inodo de namespace de red.
+
+    Entre llamadas solo se consultan los PIDs nuevos y se olvidan los
+    muertos. El PID representativo se comprueba de nuevo al leer su tabla,
+    así que un PID reutilizado no atribuye sockets al namespace equivocado.
+    """
+
+    def __init__(self, proc_root: str = '/proc'):
+        self.proc_root = proc_root
+        self._pid_ns: Dict[int, int] = {}
+        self._labels: Dict[int, str] = {}
+        # El daemon comparte el índice entre hilos
+        self._lock = threading.Lock()
+        self.own_inode = self._ns_inode('self')
+
+    def _ns_inode(self, pid) -> Optional[int]:
+        try:
+            return os.stat(f'{self.proc_root}/{pid}/ns/net').st_ino
+        except OSError:
+            return None
+
+    def namespaces(self) -> List[NetNamespace]:
+        """Namespaces de red distintos del propio, uno por inodo"""
+        try:
+            pids = {int(entry) for entry in os.listdir(self.proc_root) if entry.isdigit()}
+        except OSError:
+            return []
+
+        with self._lock:
+            return self._refresh(pids)
+
+    def _refresh(self, pids: set) -> List[NetNamespace]:
+        for pid in self._pid_ns.keys() - pids:
+            del self._pid_ns[pid]
+        for pid in pids - self._pid_ns.keys():
+            inode = self._ns_inode(pid)
+            # Sin permisos (procesos de otros usuarios) no se puede saber
+            self._pid_ns[pid] = inode if inode is not None else 0
+
+        representatives: Dict[int, int] = {}
+        for pid, inode in self._pid_ns.items():
+            if inode and inode != self.own_inode and inode not in representatives:
+                representatives[inode] = pid
+
+        named = None
+        found = []
+        for inode, pid in representatives.items():
+            label = self._labels.get(inode)
+            if label is None:
+                if named is None:
+                    named = self._named_namespaces()
+                label = named.get(inode) or self._container_label(pid) or f"net:[{inode}]"
+                self._labels[inode] = label
+            found.append(NetNamespace(inode, pid, label))
+        return found
+
+    def read_all(self, reader: Callable[[NetNamespace], list],
+                 max_workers: int = NETNS_MAX_WORKERS) -> List[Tuple[NetNamespace, list]]:
+        """
+        Aplica `reader` a cada namespace en paralelo y devuelve
+        [(namespace, resultado)], descartando los namespaces cuyo PID
+        representativo murió o cambió de namespace durante la lectura.
+        """
+        namespaces = self.namespaces()
+        if not namespaces:
+            return []
+
+        if len(namespaces) == 1 or max_workers <= 1:
+            results = [reader(namespace) for namespace in namespaces]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(namespaces))) as pool:
+                results = list(pool.map(reader, namespaces))
+
+        valid = []
+        for namespace, result in zip(namespaces, results):
+            if self._ns_inode(namespace.pid) == namespace.inode:
+                valid.append((namespace, result))
+            else:
+                # El PID se reutilizó o cambió de namespace: volver a consultarlo
+                with self._lock:
+                    self._pid_ns.pop(namespace.pid, None)
+        return valid
+
+    def _named_namespaces(self) -> Dict[int, str]:
+        """{inodo: nombre} de los namespaces creados con `ip netns add`"""
+        named: Dict[int, str] = {}
+        for directory in NAMED_NETNS_DIRS:
+            try:
+                entries = os.listdir(directory)
+            except OSError:
+                continue
+            for name in entries:
+                try:
+                    named.setdefault(os.stat(os.path.join(directory, name)).st_ino,
+                                     f"netns:{name}")
+                except OSError:
+                    continue
+        return named
+
+    def _container_label(self, pid: int) -> Optional[str]:
+        """'docker:abc123def456' a partir del cgroup del proceso, si es un contenedor"""
+        try:
+            with open(f'{self.proc_root}/{pid}/cgroup') as f:
+                cgroup = f.read()
+        except OSError:
+            return None
+
+        for prefix, runtime in CONTAINER_RUNTIMES:
+            start = cgroup.find(prefix)
+            if start < 0:
+                continue
+            start += len(prefix)
+            end = start
+            while end < len(cgroup) and cgroup[end] in '0123456789abcdef':
+                end += 1
+            if end - start >= 12:
+                return f"{runtime}:{cgroup[start:start + 12]}"
+            if runtime == 'lxc':
+                name = cgroup[start:].split('/', 1)[0].split('\n', 1)[0]
+                if name:
+                    return f"lxc:{name}"
+        return None
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Ports - Port sets compiled to a 65536-entry bitmap
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Parses port selections such as `3000-3010,5432,6379,8000-8100,!8080`
+    (ranges, single ports and `!` exclusions) into an immutable PortSet.
+    The set is compiled once into a bitmap with one byte per port, so the
+    scanners test membership with a single index, and into the minimal
+    list of disjoint ranges used to build kernel, ss and lsof filters.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+from bisect import bisect_right
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Iterable, Iterator, List, Optional, Tuple
+
+MIN_PORT = 1
+MAX_PORT = 65535
+
+# Rangos máximos de un filtro de netlink, ss o lsof. Con más, los huecos
+# más pequeños se rellenan y el bitmap descarta lo que sobra
+MAX_FILTER_RANGES = 32
+
+_ON = b'\x01'
+_OFF = b'\x00'
+
+
+def _parse_port(value: str) -> int:
+    try:
+        port = int(value)
+    except ValueError:
+        raise ValueError(f"Puerto inválido: {value!r}") from None
+    if not MIN_PORT <= port <= MAX_PORT:
+        raise ValueError(f"El puerto debe estar entre {MIN_PORT} y {MAX_PORT}: {port}")
+    return port
+
+
+def _parse_spec(spec: str) -> tuple:
+    """
+    Separa '3000-3010,5432,!3005' en rangos incluidos y excluidos.
+
+    Raises:
+        ValueError: si algún elemento no es un puerto o rango válido
+    """
+    include: List[Tuple[int, int]] = []
+    exclude: List[Tuple[int, int]] = []
+    for token in spec.replace(' ', ',').split(','):
+        if not token:
+            continue
+        target = include
+        if token[0] == '!':
+            target, token = exclude, token[1:]
+        lo_s, sep, hi_s = token.partition('-')
+        lo = _parse_port(lo_s)
+        hi = _parse_port(hi_s) if sep else lo
+        if lo > hi:
+            raise ValueError(f"Rango invertido: {token}")
+        target.append((lo, hi))
+    return include, exclude
+
+
+def format_ranges(ranges: Iterable[Tuple[int, int]]) -> str:
+    """Rangos en la notación de la CLI y de lsof: 3000-3010,5432"""
+    return ','.join(f"{start}-{end}" if start != end else str(start) for start, end in ranges)
+
+
+class PortSet:
+    """
+    Conjunto inmutable de puertos TCP.
+
+    `bitmap[port]` vale 1 si el puerto pertenece al conjunto (test O(1) en
+    los bucles de los escáneres) y `ranges` son los rangos disjuntos y
+    ordenados que lo forman, con las exclusiones ya aplicadas.
+    """
+
+    __slots__ = ('bitmap', 'ranges', '_starts')
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = (),
+                 exclude: Iterable[Tuple[int, int]] = ()) -> None:
+        bitmap = bytearray(MAX_PORT + 1)
+        for start, end in ranges:
+            bitmap[start:end + 1] = _ON * (end - start + 1)
+        for start, end in exclude:
+            bitmap[start:end + 1] = _OFF * (end - start + 1)
+        self.bitmap = bytes(bitmap)
+
+        # Recorrer el bitmap con find() deja el bucle en C
+        found: List[Tuple[int, int]] = []
+        end = 0
+        while True:
+            start = self.bitmap.find(_ON, end)
+            if start < 0:
+                break
+            end = self.bitmap.find(_OFF, start)
+            if end < 0:
+                end = MAX_PORT + 1
+            found.append((start, end - 1))
+        self.ranges: Tuple[Tuple[int, int], ...] = tuple(found)
+        self._starts = [start for start, _ in found]
+
+    @classmethod
+    def parse(cls, spec: str, exclude: Optional[str] = None) -> 'PortSet':
+        """
+        Crea un conjunto a partir de '3000-3010,5432,!3005'.
+
+        Los elementos con `!` (y los de `exclude`) se restan del resto. Si
+        solo hay exclusiones, se parte de todos los puertos.
+
+        Raises:
+            ValueError: si la especificación es inválida o no queda ningún puerto
+        """
+        include, excluded = _parse_spec(spec)
+        if exclude:
+            extra_include, extra_exclude = _parse_spec(exclude)
+            excluded += extra_include + extra_exclude
+        if not include:
+            if not excluded:
+                raise ValueError("No se indicó ningún puerto")
+            include = [(MIN_PORT, MAX_PORT)]
+
+        ports = cls(include, excluded)
+        if not ports:
+            raise ValueError(f"La selección no incluye ningún puerto: {spec}")
+        return ports
+
+    @classmethod
+    def from_range(cls, start_port: int, end_port: int) -> 'PortSet':
+        """Conjunto de un único rango contiguo"""
+        return cls(((start_port, end_port),))
+
+    @classmethod
+    def coerce(cls, value) -> 'PortSet':
+        """Acepta un PortSet, una especificación o una tupla (inicio, fin)"""
+        if isinstance(value, PortSet):
+            return value
+        if isinstance(value, str):
+            return cls.parse(value)
+        start_port, end_port = value
+        return cls.from_range(int(start_port), int(end_port))
+
+    @property
+    def start(self) -> int:
+        """Puerto más bajo del conjunto (0 si está vacío)"""
+        return self.ranges[0][0] if self.ranges else 0
+
+    @property
+    def end(self) -> int:
+        """Puerto más alto del conjunto (0 si está vacío)"""
+        return self.ranges[-1][1] if self.ranges else 0
+
+    def __contains__(self, port: int) -> bool:
+        return MIN_PORT <= port <= MAX_PORT and self.bitmap[port] == 1
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.ranges:
+            yield from range(start, end + 1)
+
+    def __reversed__(self) -> Iterator[int]:
+        for start, end in reversed(self.ranges):
+            yield from range(end, start - 1, -1)
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self.ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PortSet):
+            return NotImplemented
+        return self.ranges == other.ranges
+
+    def __hash__(self) -> int:
+        return hash(self.ranges)
+
+    def __str__(self) -> str:
+        return format_ranges(self.ranges)
+
+    def __repr__(self) -> str:
+        return f"PortSet({str(self)!r})"
+
+    def issubset(self, other: 'PortSet') -> bool:
+        """Indica si todos los puertos del conjunto están también en `other`"""
+        for start, end in self.ranges:
+            index = bisect_right(other._starts, start) - 1
+            if index < 0 or other.ranges[index][1] < end:
+                return False
+        return True
+
+    def filter_ranges(self, max_ranges: int = MAX_FILTER_RANGES) -> Tuple[Tuple[int, int], ...]:
+        """
+        Rangos para un filtro externo (kernel, ss, lsof), como mucho `max_ranges`.
+
+        Si el conjunto tiene más rangos se funden los separados por los
+        huecos más pequeños: el filtro puede dejar pasar puertos de más, que
+        el bitmap descarta después, pero nunca deja fuera ninguno.
+        """
+        ranges = self.ranges
+        if len(ranges) <= max_ranges:
+            return ranges
+
+        gaps = sorted(range(len(ranges) - 1), key=lambda i: ranges[i + 1][0] - ranges[i][1])
+        merged = set(gaps[:len(ranges) - max(1, max_ranges)])
+
+        covering = []
+        start = ranges[0][0]
+        for index, (_, end) in enumerate(ranges):
+            if index in merged:
+                continue
+            covering.append((start, end))
+            if index + 1 < len(ranges):
+                start = ranges[index + 1][0]
+        return tuple(covering)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Reserve - Short-lived port reservations shared between processes
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Keeps the ports handed out by `PortDestroyer.find_free_ports()` in a
+    small per-user text file with an expiry time. The file is held under an
+    exclusive flock while free ports are chosen, so launchers asking at the
+    same time never get the same port before either of them binds it.
+    Expired entries are dropped every time the file is opened.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import fcntl
+import os
+import stat
+import time
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import IO, Dict, Iterable, Optional
+
+
+def default_reservations_path() -> str:
+    """Ruta del fichero de reservas, junto al socket del daemon en el directorio privado"""
+    from port_destroyer_daemon import private_runtime_dir
+
+    return os.path.join(private_runtime_dir(), 'port-destroyer.reservations')
+
+
+class PortReservations:
+    """
+    Reservas activas {puerto: expira_en} bajo un bloqueo exclusivo.
+
+    Se usa como gestor de contexto: al entrar bloquea el fichero y carga las
+    reservas vigentes; al salir guarda los cambios y libera el bloqueo.
+
+        with PortReservations() as reservations:
+            reservations.reserve([3000], ttl=30)
+    """
+
+    def __init__(self, path: Optional[str] = None, create: bool = True):
+        self.path = path or default_reservations_path()
+        # Sin create, un fichero inexistente equivale a no tener reservas
+        self.create = create
+        self.active: Dict[int, float] = {}
+        self._file: Optional[IO[str]] = None
+        self._dirty = False
+
+    def __enter__(self) -> 'PortReservations':
+        """
+        Raises:
+            PermissionError: si el fichero es un enlace simbólico o pertenece
+                a otro usuario
+        """
+        # Sin seguir enlaces: nadie puede redirigir la escritura a otro fichero
+        flags = os.O_RDWR | os.O_NOFOLLOW | (os.O_CREAT if self.create else 0)
+        try:
+            fd = os.open(self.path, flags, 0o600)
+        except FileNotFoundError:
+            return self
+        except OSError as e:
+            if os.path.islink(self.path):
+                raise PermissionError(f"{self.path} es un enlace simbólico: no se usa") from e
+            raise
+        info = os.fstat(fd)
+        if not stat.S_ISREG(info.st_mode) or info.st_uid != os.getuid():
+            os.close(fd)
+            raise PermissionError(f"{self.path} no es un fichero del usuario actual: no se usa")
+        handle = self._file = os.fdopen(fd, 'r+')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+
+        now = time.time()
+        lines = 0
+        for line in handle:
+            lines += 1
+            try:
+                port_s, expires_s = line.split()
+                port, expires_at = int(port_s), float(expires_s)
+            except ValueError:
+                continue
+            if expires_at > now:
+                self.active[port] = expires_at
+        # Reescribir si había reservas caducadas o líneas corruptas
+        self._dirty = lines != len(self.active)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        handle = self._file
+        if handle is None:
+            return
+        try:
+            if self._dirty:
+                handle.seek(0)
+                handle.truncate()
+                handle.writelines(f"{port} {expires_at:.3f}\n"
+                                  for port, expires_at in sorted(self.active.items()))
+                handle.flush()
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+            self._file = None
+
+    def reserve(self, ports: Iterable[int], ttl: float) -> None:
+        """Reserva los puertos durante `ttl` segundos"""
+        expires_at = time.time() + ttl
+        for port in ports:
+            self.active[port] = expires_at
+        self._dirty = True
+
+    def release(self, ports: Iterable[int]) -> None:
+        """Libera las reservas de los puertos indicados"""
+        for port in ports:
+            if self.active.pop(port, None) is not None:
+                self._dirty = True
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+PortDestroyer Snapshot - Listener records and snapshot diffing
+
+Author: Jesus Posso
+License: MIT
+Version: 1.0.0
+Repository: https://github.com/JohanPosso/Port-Destroyer
+
+Description:
+    Compact immutable record for a process listening on a port and an
+    immutable snapshot of the listener table. `Snapshot.diff(prev)` returns
+    the listeners that were added, removed or changed (same port and PID,
+    different name or user); the comparison runs as set operations in C and
+    the Python work is proportional to the number of changes.
+"""
+
+from __future__ import annotations
+
+__author__ = "Jesus Posso"
+__version__ = "1.0.0"
+__license__ = "MIT"
+
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Los campos van como literal: mypy no admite otra forma en namedtuple()
+class ListenerRecord(namedtuple('ListenerRecord', ('port', 'pid', 'name', 'user', 'netns'),
+                                defaults=('',))):
+    """
+    Proceso escuchando en un puerto: port, pid, name, user y netns.
+
+    `netns` es la etiqueta del namespace de red o contenedor del socket
+    ('docker:abc123def456', 'netns:dev'); vacía en el namespace propio.
+
+    Es una tupla inmutable sin __dict__. Se ordena por (puerto, PID) y acepta
+    también el acceso por clave de los antiguos diccionarios (record['port']).
+    """
+    __slots__ = ()
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        """Identidad del listener: (puerto, pid)"""
+        return (self.port, self.pid)
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            try:
+                return getattr(self, item)
+            except AttributeError:
+                raise KeyError(item) from None
+        return tuple.__getitem__(self, item)
+
+    def to_dict(self) -> Dict:
+        """Diccionario serializable (formato del protocolo del daemon)"""
+        data = {'port': self.port, 'pid': self.pid, 'name': self.name, 'user': self.user}
+        if self.netns:
+            data['netns'] = self.netns
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ListenerRecord':
+        """Crea un registro a partir de su diccionario"""
+        return cls(int(data['port']), int(data['pid']), data.get('name') or '',
+                   data.get('user') or '', data.get('netns') or '')
+
+
+# Campos de un registro, en el orden del protocolo y de la salida de la CLI
+RECORD_FIELDS = ListenerRecord._fields
+
+# Campos que la CLI muestra si no se indica --fields
+DEFAULT_FIELDS = RECORD_FIELDS[:4]
+
+class SnapshotDiff(namedtuple('SnapshotDiff', 'added removed changed')):
+    """
+    Diferencias entre dos snapshots, cada una ordenada por (puerto, PID).
+
+    `changed` contiene los registros nuevos de los listeners que conservan
+    puerto y PID pero cambiaron de nombre o usuario. Es falso si no hay cambios.
+    """
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        """Resumen corto para los logs: +añadidos -eliminados ~cambiados"""
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.changed)}"
+
+
+EMPTY_DIFF = SnapshotDiff((), (), ())
+
+# Tipos de evento de ListenerEvent
+EVENT_OPENED = 'opened'     # apareció un listener (o ya estaba al empezar)
+EVENT_CLOSED = 'closed'     # el listener desapareció
+EVENT_CHANGED = 'changed'   # mismo puerto y PID, otro nombre o usuario
+
+
+class ListenerEvent(namedtuple('ListenerEvent', 'event record timestamp first_seen')):
+    """
+    Cambio de un listener entre dos snapshots.
+
+    `timestamp` es la hora del snapshot que detectó el cambio y `first_seen`
+    la del primero en el que apareció el listener (epoch en segundos).
+    """
+    __slots__ = ()
+
+    def to_dict(self) -> Dict:
+        """Diccionario serializable (una línea de NDJSON)"""
+        data = {'event': self.event, 'ts': round(self.timestamp, 6)}
+        data.update(self.record.to_dict())
+        data['first_seen'] = round(self.first_seen, 6)
+        if self.event == EVENT_CLOSED:
+            data['duration'] = round(self.timestamp - self.first_seen, 6)
+        return data
+
+
+def diff_events(diff: SnapshotDiff, timestamp: float,
+                first_seen: Dict[Tuple[int, int], float]) -> Iterator[ListenerEvent]:
+    """
+    Eventos de un diff (closed, changed y opened, en ese orden) detectados en
+    `timestamp`. Actualiza `first_seen`, {(puerto, pid): primera aparición}.
+    """
+    for record in diff.removed:
+        yield ListenerEvent(EVENT_CLOSED, record, timestamp,
+                            first_seen.pop(record.key, timestamp))
+    for record in diff.changed:
+        yield ListenerEvent(EVENT_CHANGED, record, timestamp,
+                            first_seen.get(record.key, timestamp))
+    for record in diff.added:
+        first_seen[record.key] = timestamp
+        yield ListenerEvent(EVENT_OPENED, record, timestamp, timestamp)
+
+
+class Snapshot:
+    """
+    Tabla de listeners en un instante, inmutable y ordenada por (puerto, PID).
+
+    Los registros con la misma clave (puerto, PID) se deduplican: gana el
+    último, como hacían los backends con sus diccionarios.
+    """
+
+    __slots__ = ('records', 'taken_at', '_index', '_set')
+
+    def __init__(self, records: Iterable[ListenerRecord] = (),
+                 taken_at: Optional[float] = None):
+        index = {record.key: record for record in records}
+        self.records: Tuple[ListenerRecord, ...] = tuple(sorted(index.values()))
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self._index = index
+        self._set = frozenset(self.records)
+
+    @classmethod
+    def from_dicts(cls, processes: Iterable[Dict],
+                   taken_at: Optional[float] = None) -> 'Snapshot':
+        """Crea un snapshot a partir de diccionarios del protocolo"""
+        return cls((ListenerRecord.from_dict(p) for p in processes), taken_at)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[ListenerRecord]:
+        return iter(self.records)
+
+    def __bool__(self) -> bool:
+        return bool(self.records)
+
+    def __contains__(self, item) -> bool:
+        if isinstance(item, ListenerRecord):
+            return item in self._set
+        return item in self._index
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Snapshot):
+            return NotImplemented
+        return self._set == other._set
+
+    def __repr__(self) -> str:
+        return f"Snapshot({len(self.records)} listeners)"
+
+    def get(self, key: Tuple[int, int]) -> Optional[ListenerRecord]:
+        """Registro de la clave (puerto, pid), si existe"""
+        return self._index.get(key)
+
+    def ports(self) -> List[int]:
+        """Puertos con algún listener, ordenados y sin repetir"""
+        return sorted({record.port for record in self.records})
+
+    def pids(self) -> List[int]:
+        """PIDs con algún listener, sin repetir, en orden de puerto"""
+        return list(dict.fromkeys(record.pid for record in self.records))
+
+    def position(self, key: Tuple[int, int]) -> int:
+        """Posición de la clave (puerto, pid) en el orden del snapshot"""
+        return bisect_left(self.records, key)
+
+    def in_range(self, start_port: int, end_port: int) -> 'Snapshot':
+        """Snapshot con solo los listeners del rango indicado"""
+        first = bisect_left(self.records, (start_port,))
+        last = bisect_left(self.records, (end_port + 1,))
+        if first == 0 and last == len(self.records):
+            return self
+        return Snapshot(self.records[first:last], self.taken_at)
+
+    def in_ports(self, ports) -> 'Snapshot':
+        """
+        Snapshot con solo los listeners de `ports`: cualquier contenedor de
+        puertos, p. ej. un PortSet, cuyo test de pertenencia es O(1).
+        """
+        records = tuple(record for record in self.records if record.port in ports)
+        if len(records) == len(self.records):
+            return self
+        return Snapshot(records, self.taken_at)
+
+    def to_dicts(self) -> List[Dict]:
+        """Lista de diccionarios serializable"""
+        return [record.to_dict() for record in self.records]
+
+    def diff(self, prev: Optional['Snapshot']) -> SnapshotDiff:
+        """
+        Cambios desde `prev` (None equivale a un snapshot vacío).
+
+        Las diferencias de conjuntos se calculan en C; en Python solo se
+        recorren los registros que difieren.
+        """
+        if prev is None:
+            return SnapshotDiff(self.records, (), ())
+        if prev is self or prev._set == self._set:
+            return EMPTY_DIFF
+
+        added = []
+        changed = []
+        for record in self._set - prev._set:
+            if record.key in prev._index:
+                changed.append(record)
+            else:
+                added.append(record)
+        removed = [record for record in prev._set - self._set
+                   if record.key not in self._index]
+
+        return SnapshotDiff(tuple(sorted(added)), tuple(sorted(removed)),
+                            tuple(sorted(changed)))
@@ -18,12 +18,14 @@ __license__ = "MIT"
 
 import sys
 import platform
-import os
-from threading import Thread, Event
+from threading import Thread, Event, Lock
 import time
 import signal
-from io import BytesIO
-from port_destroyer import PortDestroyer
+from port_destroyer import PortDestroyer, SCANNER_BACKENDS
+from port_destroyer_metrics import METRICS
+from port_destroyer_ports import PortSet
+from port_destroyer_snapshot import Snapshot
+from port_destroyer_icons import icon_paths
 
 # Detectar sistema operativo
 IS_LINUX = platform.system() == "Linux"
@@ -37,8 +39,6 @@ if IS_LINUX:
         gi.require_version('Gtk', '3.0')
         gi.require_version('AppIndicator3', '0.1')
         from gi.repository import Gtk, AppIndicator3, GLib
-        from PIL import Image, ImageDraw
-        import cairosvg
         HAS_DEPS = True
         print("[INFO] Backend: AppIndicator3 (Linux)")
     except (ImportError, ValueError) as e:
@@ -52,8 +52,6 @@ elif IS_MACOS:
     try:
         import pystray
         from pystray import MenuItem as item
-        from PIL import Image, ImageDraw, ImageFont
-        import cairosvg
         from Foundation import NSBundle
         import AppKit
         HAS_DEPS = True
@@ -75,17 +73,50 @@ else:
     sys.exit(1)
 
 
+# Posición de la primera entrada de proceso en el menú (tras título y separador)
+MENU_PROCESS_OFFSET = 2
+
+
 class PortDestroyerTray:
     """Aplicación de bandeja del sistema (unificada para macOS y Linux)"""
     
-    def __init__(self, start_port=3000, end_port=9000):
-        self.destroyer = PortDestroyer(port_range=(start_port, end_port))
-        self.start_port = start_port
-        self.end_port = end_port
-        self.processes = []
-        self.processes_dict = {}
-        self.update_interval = 1.5
+    def __init__(self, start_port=3000, end_port=9000, backend='auto', grace_period=2.0,
+                 kill_tree=False, serve=True, min_interval=0.5, max_interval=5.0, ports=None,
+                 all_netns=False, history=True, policy=None, metrics_port=None):
+        # `ports` (PortSet o '3000-3010,5432,!3005') sustituye a start_port/end_port
+        port_range = ports if ports is not None else (start_port, end_port)
+        self.destroyer = PortDestroyer(port_range=port_range, backend=backend,
+                                       grace_period=grace_period, kill_tree=kill_tree,
+                                       all_netns=all_netns, policy=policy)
+        self.ports = self.destroyer.ports
+        self.start_port = self.ports.start
+        self.end_port = self.ports.end
+        # Último snapshot escaneado y el que reflejan los menús
+        self.snapshot = Snapshot()
+        self._menu_snapshot = Snapshot()
+        # Sondeo adaptativo: rápido tras un cambio o un kill, más lento en reposo
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.update_interval = min_interval
+        self.backoff_factor = 1.5
+        # Escaneo completo forzado aunque la huella no cambie
+        self.full_refresh_interval = 30.0
         self.stop_event = Event()
+        self.wake_event = Event()
+        
+        # Historial de eventos para --history (se abre en run())
+        self.history = None
+        self._record_history = history
+        
+        # Endpoint Prometheus en 127.0.0.1 (se abre en run())
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        
+        # Daemon embebido: sirve el snapshot de la bandeja a la CLI
+        self.daemon = None
+        if serve:
+            from port_destroyer_daemon import SnapshotDaemon
+            self.daemon = SnapshotDaemon(self.destroyer, refresh_interval=None)
         
         if IS_LINUX:
             self._init_linux()
@@ -94,13 +125,7 @@ class PortDestroyerTray:
     
     def _init_linux(self):
         """Inicialización específica para Linux"""
-        # Crear directorio temporal para iconos
-        self.temp_dir = "/tmp/port-destroyer"
-        os.makedirs(self.temp_dir, exist_ok=True)
-        self.icon_path_green = os.path.join(self.temp_dir, "icon_green.png")
-        self.icon_path_red = os.path.join(self.temp_dir, "icon_red.png")
-        
-        # Generar iconos PNG desde SVG
+        # Iconos PNG pre-renderizados (solo se generan desde el SVG la primera vez)
         self._create_linux_icons()
         
         # Crear indicador AppIndicator3
@@ -114,121 +139,82 @@ class PortDestroyerTray:
         
         # Crear menú GTK
         self.menu = Gtk.Menu()
+        self._build_linux_menu()
         self.indicator.set_menu(self.menu)
+        self._icon_state = None
     
     def _init_macos(self):
         """Inicialización específica para macOS"""
         self.icon = None
-        self.base_icon = None
+        self._icon_state = None
+        # (puerto, pid) -> MenuItem / etiqueta, reutilizados entre actualizaciones
+        self._macos_items = {}
+        self._macos_labels = {}
+        # El hilo de sondeo aplica los diffs y el de pystray pinta el menú
+        self._macos_lock = Lock()
+        self._macos_static_items = None
+        self._macos_icons = {}
         self._load_macos_icon()
     
     def _create_linux_icons(self):
-        """Create Linux system tray icons with status badges"""
+        """Load Linux system tray icons with status badges from the icon cache"""
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            svg_path = os.path.join(script_dir, 'assets', 'icon.svg')
-            
-            if os.path.exists(svg_path):
-                # Convert SVG to PNG (64x64 for Linux) - no tinting
-                png_data = cairosvg.svg2png(url=svg_path, output_width=64, output_height=64)
-                base_img = Image.open(BytesIO(png_data))
-                
-                # Create icons with status badges
-                img_green = self._add_status_badge(base_img, False)  # Green = no processes
-                img_red = self._add_status_badge(base_img, True)     # Red = with processes
-                
-                img_green.save(self.icon_path_green, 'PNG')
-                img_red.save(self.icon_path_red, 'PNG')
-                print("[INFO] Icons created (64x64) with status badges")
-            else:
-                # Fallback: simple icons with badges
-                base_img = Image.new('RGBA', (64, 64), (100, 100, 100, 255))
-                img_green = self._add_status_badge(base_img, False)
-                img_red = self._add_status_badge(base_img, True)
-                img_green.save(self.icon_path_green, 'PNG')
-                img_red.save(self.icon_path_red, 'PNG')
+            paths = icon_paths(64)
         except Exception as e:
             print(f"[ERROR] Creating icons: {e}")
+            paths = {False: '', True: ''}
+        self.icon_path_green = paths[False]
+        self.icon_path_red = paths[True]
     
     def _load_macos_icon(self):
-        """Carga icono para macOS"""
+        """Carga las rutas de los iconos de macOS (128x128) desde la caché"""
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            svg_path = os.path.join(script_dir, 'assets', 'icon.svg')
-            
-            if os.path.exists(svg_path):
-                png_data = cairosvg.svg2png(url=svg_path, output_width=128, output_height=128)
-                self.base_icon = Image.open(BytesIO(png_data))
-                print("[INFO] Icono cargado (128x128)")
+            self.icon_paths = icon_paths(128)
         except Exception as e:
             print(f"[ERROR] Cargando icono: {e}")
-            self.base_icon = None
-    
-    def _add_status_badge(self, image, has_processes=False):
-        """Add status badge to icon"""
-        img_with_badge = image.copy()
-        draw = ImageDraw.Draw(img_with_badge)
-        
-        # Calculate badge position (top-right corner)
-        width, height = img_with_badge.size
-        badge_size = max(8, width // 8)
-        badge_x = width - badge_size - 2
-        badge_y = 2
-        
-        # Badge color based on process status
-        badge_color = (220, 53, 69) if has_processes else (40, 167, 69)
-        
-        # Draw badge circle
-        draw.ellipse([badge_x, badge_y, badge_x + badge_size, badge_y + badge_size], 
-                    fill=badge_color, outline=(255, 255, 255), width=1)
-        
-        return img_with_badge
+            self.icon_paths = {}
     
     def create_macos_icon(self, has_processes=False):
         """Create macOS icon with status badge"""
-        if self.base_icon:
-            return self._add_status_badge(self.base_icon, has_processes)
-        
-        # Fallback: simple icon with badge
-        width = 64
-        img = Image.new('RGBA', (width, width), (100, 100, 100, 255))
-        return self._add_status_badge(img, has_processes)
+        if has_processes not in self._macos_icons:
+            from PIL import Image
+            path = self.icon_paths.get(has_processes)
+            if path:
+                image = Image.open(path)
+                image.load()
+            else:
+                # Fallback: simple gray icon
+                image = Image.new('RGBA', (64, 64), (100, 100, 100, 255))
+            self._macos_icons[has_processes] = image
+        return self._macos_icons[has_processes]
     
     # ==================== LINUX (AppIndicator3) ====================
     
-    def update_linux_menu(self):
-        """Actualiza menú GTK (Linux)"""
-        for item in self.menu.get_children():
-            self.menu.remove(item)
-        
-        count = len(self.processes)
-        title = Gtk.MenuItem(label=f"{count} proceso{'s' if count != 1 else ''} activo{'s' if count != 1 else ''}")
-        title.set_sensitive(False)
-        self.menu.append(title)
+    def _build_linux_menu(self):
+        """Construye una sola vez las entradas fijas del menú GTK (Linux)"""
+        self.title_item = Gtk.MenuItem(label=self._status_label(0))
+        self.title_item.set_sensitive(False)
+        self.menu.append(self.title_item)
         self.menu.append(Gtk.SeparatorMenuItem())
         
-        if self.processes:
-            for proc in sorted(self.processes, key=lambda x: x['port']):
-                label = f"Puerto {proc['port']}: {proc['name']} (PID: {proc['pid']})"
-                item = Gtk.MenuItem(label=label)
-                item.connect('activate', lambda w, p=proc['port']: self.on_kill_port_linux(w, p))
-                self.menu.append(item)
-            
-            self.menu.append(Gtk.SeparatorMenuItem())
-            kill_all = Gtk.MenuItem(label="Eliminar Todos")
-            kill_all.connect('activate', self.on_kill_all_linux)
-            self.menu.append(kill_all)
-        else:
-            no_proc = Gtk.MenuItem(label="No hay procesos activos")
-            no_proc.set_sensitive(False)
-            self.menu.append(no_proc)
+        # Las entradas de procesos se insertan entre el título y este separador
+        self.process_items = {}
+        self.kill_all_separator = Gtk.SeparatorMenuItem()
+        self.menu.append(self.kill_all_separator)
+        self.kill_all_item = Gtk.MenuItem(label="Eliminar Todos")
+        self.kill_all_item.connect('activate', self.on_kill_all_linux)
+        self.menu.append(self.kill_all_item)
+        
+        self.no_proc_item = Gtk.MenuItem(label="No hay procesos activos")
+        self.no_proc_item.set_sensitive(False)
+        self.menu.append(self.no_proc_item)
         
         self.menu.append(Gtk.SeparatorMenuItem())
         list_item = Gtk.MenuItem(label="Listar en Consola")
         list_item.connect('activate', self.on_list_processes_linux)
         self.menu.append(list_item)
         
-        range_item = Gtk.MenuItem(label=f"Rango: {self.start_port}-{self.end_port}")
+        range_item = Gtk.MenuItem(label=f"Puertos: {self.ports}")
         range_item.set_sensitive(False)
         self.menu.append(range_item)
         
@@ -239,16 +225,52 @@ class PortDestroyerTray:
         
         self.menu.show_all()
     
+    def update_linux_menu(self, snapshot):
+        """
+        Actualiza menú GTK (Linux) aplicando el diff con el snapshot que
+        muestra: solo se añaden, eliminan o renombran esas entradas.
+        """
+        diff = snapshot.diff(self._menu_snapshot)
+        
+        for record in diff.removed:
+            widget = self.process_items.pop(record.key)
+            self.menu.remove(widget)
+            widget.destroy()
+        
+        for record in diff.changed:
+            self.process_items[record.key].set_label(self._menu_label(record))
+        
+        # Las entradas estables mantienen su orden relativo, así que basta con
+        # insertar las nuevas en orden en su posición final
+        for record in diff.added:
+            widget = Gtk.MenuItem(label=self._menu_label(record))
+            widget.connect('activate', lambda w, p=record.port: self.on_kill_port_linux(w, p))
+            self.menu.insert(widget, MENU_PROCESS_OFFSET + snapshot.position(record.key))
+            widget.show()
+            self.process_items[record.key] = widget
+        
+        self._menu_snapshot = snapshot
+        has_processes = bool(snapshot)
+        self.title_item.set_label(self._status_label(len(snapshot)))
+        self.kill_all_separator.set_visible(has_processes)
+        self.kill_all_item.set_visible(has_processes)
+        self.no_proc_item.set_visible(not has_processes)
+    
     def on_kill_port_linux(self, widget, port):
-        count = self.destroyer.kill_port(port)
-        if count > 0:
-            print(f"\n[OK] Proceso eliminado en puerto {port}")
-        GLib.idle_add(self._update_ui_linux)
+        def kill():
+            count = self.destroyer.kill_port(port)
+            if count > 0:
+                print(f"\n[OK] Proceso eliminado en puerto {port}")
+            self.request_refresh()
+        # La espera del periodo de gracia no debe bloquear el loop de GTK
+        Thread(target=kill, daemon=True).start()
     
     def on_kill_all_linux(self, widget):
-        count = self.destroyer.kill_all()
-        print(f"\n[OK] Se eliminaron {count} proceso(s)")
-        GLib.idle_add(self._update_ui_linux)
+        def kill():
+            count = self.destroyer.kill_all()
+            print(f"\n[OK] Se eliminaron {count} proceso(s)")
+            self.request_refresh()
+        Thread(target=kill, daemon=True).start()
     
     def on_list_processes_linux(self, widget):
         print("\n" + "="*80)
@@ -257,61 +279,99 @@ class PortDestroyerTray:
     
     def on_quit_linux(self, widget):
         print("\n[INFO] Cerrando PortDestroyer...")
-        self.stop_event.set()
+        self.stop()
         Gtk.main_quit()
     
-    def _update_ui_linux(self):
-        """Actualiza UI de Linux"""
-        has_processes = len(self.processes) > 0
-        icon_path = self.icon_path_red if has_processes else self.icon_path_green
-        self.indicator.set_icon_full(icon_path, "PortDestroyer")
-        self.update_linux_menu()
-        print(f"[DEBUG] UI actualizada: {len(self.processes)} procesos")
+    def _update_ui_linux(self, snapshot=None):
+        """Actualiza UI de Linux con el snapshot indicado (o el último)"""
+        if snapshot is None:
+            snapshot = self.snapshot
+        with METRICS.timer('port_destroyer_tray_redraw_seconds'):
+            has_processes = bool(snapshot)
+            if has_processes != self._icon_state:
+                icon_path = self.icon_path_red if has_processes else self.icon_path_green
+                self.indicator.set_icon_full(icon_path, "PortDestroyer")
+                self._icon_state = has_processes
+            self.update_linux_menu(snapshot)
+        METRICS.inc('port_destroyer_tray_redraws_total')
+        print(f"[DEBUG] UI actualizada: {len(snapshot)} procesos")
         return False
     
     # ==================== MACOS (pystray) ====================
     
     def create_macos_menu(self):
-        """Crea menú pystray (macOS)"""
+        """
+        Genera los items del menú pystray (macOS). Los items fijos y los de
+        cada proceso se crean una vez y se reutilizan; las etiquetas se leen
+        en el momento de pintar el menú.
+        """
         try:
-            menu_items = []
-            count = len(self.processes)
-            status = f'{count} proceso{"s" if count != 1 else ""} activo{"s" if count != 1 else ""}'
-            menu_items.append(item(status, lambda: None, enabled=False))
-            menu_items.append(item('-', lambda: None))
+            if self._macos_static_items is None:
+                self._macos_static_items = (
+                    (item(lambda i: self._status_label(len(self._macos_labels)),
+                          lambda: None, enabled=False),
+                     pystray.Menu.SEPARATOR),
+                    (pystray.Menu.SEPARATOR,
+                     item('Eliminar Todos', self.on_kill_all_macos)),
+                    (item('No hay procesos activos', lambda: None, enabled=False),),
+                    (pystray.Menu.SEPARATOR,
+                     item('Listar en Consola', self.on_list_processes_macos),
+                     item(f'Puertos: {self.ports}', lambda: None, enabled=False),
+                     pystray.Menu.SEPARATOR,
+                     item('Salir', self.on_quit_macos))
+                )
+            header, kill_all, empty, footer = self._macos_static_items
             
-            if self.processes:
-                for proc in sorted(self.processes, key=lambda x: x['port']):
-                    label = f"Puerto {proc['port']}: {proc['name']} (PID: {proc['pid']})"
-                    menu_items.append(item(label, self.on_kill_port_macos(proc['port'])))
-                menu_items.append(item('-', lambda: None))
-                menu_items.append(item('Eliminar Todos', self.on_kill_all_macos))
-            else:
-                menu_items.append(item('No hay procesos activos', lambda: None, enabled=False))
-            
-            menu_items.append(item('-', lambda: None))
-            menu_items.append(item('Listar en Consola', self.on_list_processes_macos))
-            menu_items.append(item(f'Rango: {self.start_port}-{self.end_port}', lambda: None, enabled=False))
-            menu_items.append(item('-', lambda: None))
-            menu_items.append(item('Salir', self.on_quit_macos))
-            
-            return tuple(menu_items)
+            with self._macos_lock:
+                process_items = tuple(self._macos_items[record.key]
+                                      for record in self._menu_snapshot)
+            middle = process_items + kill_all if process_items else empty
+            return header + middle + footer
         except Exception as e:
             print(f"[ERROR] Creando menú: {e}")
             return (item('Error', lambda: None, enabled=False), item('Salir', self.on_quit_macos))
     
+    def update_macos_menu(self, snapshot) -> bool:
+        """
+        Sincroniza los items de procesos (macOS) aplicando el diff con el
+        snapshot que muestra. Devuelve True si el menú cambió y hay que
+        repintarlo.
+        """
+        with self._macos_lock:
+            diff = snapshot.diff(self._menu_snapshot)
+            
+            for record in diff.removed:
+                del self._macos_items[record.key]
+                del self._macos_labels[record.key]
+            
+            for record in diff.changed:
+                self._macos_labels[record.key] = self._menu_label(record)
+            
+            for record in diff.added:
+                key = record.key
+                self._macos_items[key] = item(
+                    lambda i, key=key: self._macos_labels.get(key, ''),
+                    self.on_kill_port_macos(record.port))
+                self._macos_labels[key] = self._menu_label(record)
+            
+            self._menu_snapshot = snapshot
+        return bool(diff)
+    
     def on_kill_port_macos(self, port):
-        def kill(icon, item):
+        def kill():
             count = self.destroyer.kill_port(port)
             if count > 0:
                 print(f"\n[OK] Proceso eliminado en puerto {port}")
-            self._update_ui_macos()
-        return kill
+            self.request_refresh()
+        # La espera del periodo de gracia no debe bloquear el menú
+        return lambda icon, item: Thread(target=kill, daemon=True).start()
     
     def on_kill_all_macos(self, icon, item):
-        count = self.destroyer.kill_all()
-        print(f"\n[OK] Se eliminaron {count} proceso(s)")
-        self._update_ui_macos()
+        def kill():
+            count = self.destroyer.kill_all()
+            print(f"\n[OK] Se eliminaron {count} proceso(s)")
+            self.request_refresh()
+        Thread(target=kill, daemon=True).start()
     
     def on_list_processes_macos(self, icon, item):
         print("\n" + "="*80)
@@ -320,60 +380,160 @@ class PortDestroyerTray:
     
     def on_quit_macos(self, icon, item):
         print("\n[INFO] Cerrando PortDestroyer...")
-        self.stop_event.set()
+        self.stop()
         self.icon.stop()
     
-    def _update_ui_macos(self):
-        """Actualiza UI de macOS"""
-        self.processes = self.destroyer.get_processes_on_ports()
-        self.processes_dict = {(p['port'], p['pid']): p for p in self.processes}
-        if self.icon:
-            has_processes = len(self.processes) > 0
-            self.icon.icon = self.create_macos_icon(has_processes)
-            count = len(self.processes)
-            self.icon.title = f"PortDestroyer - {count} proceso{'s' if count != 1 else ''}"
-            self.icon.menu = pystray.Menu(self.create_macos_menu)
+    def _update_ui_macos(self, snapshot=None):
+        """Actualiza UI de macOS con el snapshot indicado (o el último)"""
+        if snapshot is None:
+            snapshot = self.snapshot
+        with METRICS.timer('port_destroyer_tray_redraw_seconds'):
+            menu_changed = self.update_macos_menu(snapshot)
+            if self.icon:
+                has_processes = bool(snapshot)
+                if has_processes != self._icon_state:
+                    self.icon.icon = self.create_macos_icon(has_processes)
+                    self._icon_state = has_processes
+                count = len(snapshot)
+                self.icon.title = f"PortDestroyer - {count} proceso{'s' if count != 1 else ''}"
+                if menu_changed:
+                    self.icon.update_menu()
+        METRICS.inc('port_destroyer_tray_redraws_total')
     
     # ==================== COMÚN ====================
     
+    def _status_label(self, count):
+        """Texto de la cabecera del menú"""
+        return f"{count} proceso{'s' if count != 1 else ''} activo{'s' if count != 1 else ''}"
+    
+    def _menu_label(self, record):
+        """Etiqueta de la entrada de un proceso"""
+        label = f"Puerto {record.port}: {record.name} (PID: {record.pid})"
+        return f"{label} [{record.netns}]" if record.netns else label
+    
+    def stop(self):
+        """Detiene el hilo de actualización y el daemon"""
+        self.stop_event.set()
+        self.wake_event.set()
+        self.stop_daemon()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server = None
+    
+    def stop_daemon(self):
+        """Detiene el daemon embebido y borra su socket"""
+        if self.daemon:
+            self.daemon.stop()
+            self.daemon = None
+    
+    def request_refresh(self):
+        """Vuelve al intervalo mínimo y despierta el hilo de actualización"""
+        self.update_interval = self.min_interval
+        self.wake_event.set()
+    
     def update_processes(self):
         """Thread de actualización (común para ambos OS)"""
+        last_fingerprint = None
+        last_full_scan = time.monotonic()
+        
         while not self.stop_event.is_set():
+            poll_start = time.perf_counter()
+            result = 'unchanged'
             try:
-                new_processes = self.destroyer.get_processes_on_ports()
-                new_dict = {(p['port'], p['pid']): p for p in new_processes}
+                # Huella de la tabla de listeners, sin resolver PIDs ni nombres
+                fingerprint = self.destroyer.listener_fingerprint()
+                now = time.monotonic()
+                changed = False
                 
-                if new_dict != self.processes_dict:
-                    self.processes = new_processes
-                    self.processes_dict = new_dict
-                    print(f"[DEBUG] Procesos actualizados: {len(self.processes)}")
+                if (fingerprint is None or fingerprint != last_fingerprint
+                        or now - last_full_scan >= self.full_refresh_interval):
+                    snapshot = self.destroyer.snapshot()
+                    diff = snapshot.diff(self.snapshot)
+                    last_fingerprint = fingerprint
+                    last_full_scan = now
+                    result = 'scanned'
+                    if self.history:
+                        # También sin cambios: así se releva a un escritor que terminó
+                        self.history.update(snapshot, self.snapshot, self.destroyer.ports,
+                                            self.destroyer.all_netns)
                     
-                    # Actualizar UI según el OS
-                    if IS_LINUX:
-                        GLib.idle_add(self._update_ui_linux)
-                    else:
-                        self._update_ui_macos()
+                    if diff:
+                        changed = True
+                        result = 'changed'
+                        self.snapshot = snapshot
+                        print(f"[DEBUG] Procesos actualizados: {len(snapshot)} ({diff.summary()})")
+                        
+                        # Actualizar UI según el OS
+                        if IS_LINUX:
+                            GLib.idle_add(self._update_ui_linux, snapshot)
+                        else:
+                            self._update_ui_macos(snapshot)
+                
+                if self.daemon:
+                    self.daemon.publish(self.snapshot)
+                
+                if changed:
+                    self.update_interval = self.min_interval
+                else:
+                    self.update_interval = min(self.update_interval * self.backoff_factor,
+                                               self.max_interval)
                         
             except Exception as e:
+                result = 'error'
                 print(f"[ERROR] Actualizando: {e}")
             
-            time.sleep(self.update_interval)
+            # Sondeos sin cambios (solo la huella), con escaneo y con cambios
+            METRICS.observe('port_destroyer_tray_poll_seconds', time.perf_counter() - poll_start,
+                            result=result)
+            METRICS.inc('port_destroyer_tray_polls_total', result=result)
+            
+            self.wake_event.wait(self.update_interval)
+            self.wake_event.clear()
     
     def run(self):
         """Ejecuta la aplicación según el OS"""
         # Cargar procesos iniciales
         print("[INFO] Cargando procesos iniciales...")
-        self.processes = self.destroyer.get_processes_on_ports()
-        self.processes_dict = {(p['port'], p['pid']): p for p in self.processes}
-        print(f"[INFO] {len(self.processes)} proceso(s) encontrado(s)")
+        self.snapshot = self.destroyer.snapshot()
+        print(f"[INFO] {len(self.snapshot)} proceso(s) encontrado(s)")
+        
+        if self._record_history:
+            from port_destroyer_history import HistoryLog
+            try:
+                self.history = HistoryLog()
+                self.history.open()
+                self.history.update(self.snapshot, None, self.destroyer.ports,
+                                    self.destroyer.all_netns)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Historial desactivado: {e}")
+                self.history = None
+        
+        if self.metrics_port:
+            from port_destroyer_metrics import serve_metrics
+            try:
+                self.metrics_server = serve_metrics(self.metrics_port)
+                print(f"[INFO] Métricas en http://127.0.0.1:{self.metrics_port}/metrics")
+            except OSError as e:
+                print(f"[WARN] Métricas desactivadas: {e}")
+        
+        if self.daemon:
+            self.daemon.publish(self.snapshot)
+            try:
+                self.daemon.start()
+                print(f"[INFO] Daemon escuchando en {self.daemon.socket_path}")
+            except (RuntimeError, OSError) as e:
+                print(f"[WARN] Daemon desactivado: {e}")
+                self.daemon = None
         
         # Mostrar banner
+        interval_text = (f"Actualización: adaptativa "
+                         f"({self.min_interval:g}s-{self.max_interval:g}s)")
         print(f"""
 ╔══════════════════════════════════════════════════════════╗
 ║              PortDestroyer - System Tray                 ║
 ║  OS: {platform.system():<52} ║
-║  Rango: {self.start_port}-{self.end_port:<47} ║
-║  Actualización: Tiempo real (1.5s)                       ║
+║  Puertos: {str(self.ports)[:45]:<45} ║
+║  {interval_text:<55} ║
 ╚══════════════════════════════════════════════════════════╝
         """)
         
@@ -383,14 +543,13 @@ class PortDestroyerTray:
         
         if IS_LINUX:
             # Actualizar menú inicial
-            self.update_linux_menu()
             self._update_ui_linux()
             # Ejecutar GTK main loop
             try:
                 Gtk.main()
             except KeyboardInterrupt:
                 print("\n[INFO] Cerrando...")
-                self.stop_event.set()
+                self.stop()
         else:
             # macOS
             try:
@@ -401,11 +560,13 @@ class PortDestroyerTray:
                 pass
             
             # Crear icono pystray
-            image = self.create_macos_icon(len(self.processes) > 0)
+            self.update_macos_menu(self.snapshot)
+            self._icon_state = bool(self.snapshot)
+            image = self.create_macos_icon(self._icon_state)
             self.icon = pystray.Icon(
                 "PortDestroyer",
                 image,
-                f"PortDestroyer - {len(self.processes)} proceso(s)",
+                f"PortDestroyer - {len(self.snapshot)} proceso(s)",
                 menu=pystray.Menu(self.create_macos_menu)
             )
             
@@ -422,18 +583,73 @@ def main():
     parser = argparse.ArgumentParser(description='PortDestroyer System Tray')
     parser.add_argument('--start', type=int, default=3000, help='Puerto inicial (default: 3000)')
     parser.add_argument('--end', type=int, default=9000, help='Puerto final (default: 9000)')
+    parser.add_argument('--ports', metavar='SPEC',
+                        help="Puertos y rangos a vigilar en lugar de --start/--end, "
+                             "p. ej. '3000-3010,5432,8000-8100,!8080' (! excluye)")
+    parser.add_argument('--exclude', metavar='SPEC',
+                        help='Puertos o rangos a excluir de la selección')
+    parser.add_argument('--grace', type=float, default=2.0,
+                        help='Segundos de espera tras SIGTERM antes de SIGKILL (default: 2)')
+    parser.add_argument('--tree', action='store_true',
+                        help='Matar también los procesos descendientes')
+    parser.add_argument('--all-netns', action='store_true',
+                        help='Incluir los namespaces de red de contenedores y de `ip netns`')
+    parser.add_argument('--no-history', action='store_true',
+                        help='No guardar el historial de eventos que consulta --history')
+    parser.add_argument('--policy', metavar='PATH',
+                        help='Fichero de reglas allow/deny que protegen procesos de los kills '
+                             '(default: ~/.config/port-destroyer/policy)')
+    parser.add_argument('--no-policy', action='store_true',
+                        help='Ignorar la política de protección')
+    parser.add_argument('--min-interval', type=float, default=0.5,
+                        help='Intervalo mínimo de sondeo tras un cambio (default: 0.5s)')
+    parser.add_argument('--max-interval', type=float, default=5.0,
+                        help='Intervalo máximo de sondeo en reposo (default: 5s)')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='No servir el snapshot a la CLI por socket Unix')
+    parser.add_argument('--backend', choices=('auto',) + tuple(SCANNER_BACKENDS), default='auto',
+                        help='Backend de escaneo (default: auto, elegido por calibración)')
+    parser.add_argument('--calibrate', action='store_true',
+                        help='Recalibrar el backend de escaneo al iniciar')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='Servir métricas Prometheus en http://127.0.0.1:PORT/metrics')
     args = parser.parse_args()
     
-    if args.start >= args.end:
+    if args.ports is None and args.start >= args.end:
         print("[ERROR] El puerto inicial debe ser menor que el final")
         sys.exit(1)
     
-    app = PortDestroyerTray(start_port=args.start, end_port=args.end)
+    try:
+        ports = PortSet.parse(args.ports if args.ports is not None
+                              else f"{args.start}-{args.end}", args.exclude)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    
+    policy = None
+    if not args.no_policy:
+        from port_destroyer_policy import load_policy
+        try:
+            policy = load_policy(args.policy)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Política: {e}")
+            sys.exit(1)
+    
+    app = PortDestroyerTray(ports=ports, backend=args.backend,
+                            grace_period=max(0.0, args.grace), kill_tree=args.tree,
+                            serve=not args.no_daemon, all_netns=args.all_netns,
+                            history=not args.no_history, policy=policy,
+                            metrics_port=args.metrics_port,
+                            min_interval=max(0.1, args.min_interval),
+                            max_interval=args.max_interval)
+    if args.calibrate and args.backend == 'auto':
+        app.destroyer.calibrate()
+    print(f"[INFO] Backend de escaneo: {app.destroyer.resolve_backend()}")
     
     # Manejar señales
     def signal_handler(sig, frame):
         print("\n[INFO] Cerrando...")
-        app.stop_event.set()
+        app.stop()
         if IS_LINUX:
             Gtk.main_quit()
         elif app.icon:
@@ -448,9 +664,11 @@ def main():
     try:
         app.run()
     except KeyboardInterrupt:
-        app.stop_event.set()
+        app.stop()
     except SystemExit:
         pass
+    finally:
+        app.stop_daemon()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,55 @@
+"""Tests de AsyncPortDestroyer: kills concurrentes y política sin salida por consola"""
+
+import asyncio
+import os
+import signal
+
+import pytest
+
+from port_destroyer_async import AsyncPortDestroyer
+from port_destroyer_kill import OUTCOME_KILLED, OUTCOME_TERMINATED
+from port_destroyer_policy import Policy
+from test_kill import spawn
+
+
+def test_kill_processes_escalates_per_process():
+    polite, stubborn = spawn(), spawn(ignore_sigterm=True)
+    destroyer = AsyncPortDestroyer(grace_period=0.3)
+
+    results = asyncio.run(destroyer.kill_processes([polite.pid, stubborn.pid, polite.pid]))
+
+    assert len(results) == 2
+    assert results[polite.pid].outcome == OUTCOME_TERMINATED
+    assert results[stubborn.pid].outcome == OUTCOME_KILLED
+    assert polite.wait(5) == -signal.SIGTERM
+    assert stubborn.wait(5) == -signal.SIGKILL
+
+
+def test_resolve_names_reads_proc_for_own_children():
+    process = spawn()
+    try:
+        names = asyncio.run(AsyncPortDestroyer().resolve_names([process.pid]))
+        assert names[process.pid].startswith('python')
+    finally:
+        process.kill()
+        process.wait()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/net/tcp'), reason="requiere /proc/net/tcp")
+def test_kill_all_honours_the_policy_silently(capsys):
+    victim, kept = spawn(listen=True), spawn(listen=True)
+    try:
+        destroyer = AsyncPortDestroyer(port_range=f'{victim.port},{kept.port}', backend='proc',
+                                       grace_period=1.0,
+                                       policy=Policy.parse(f"deny port={kept.port}\n"))
+
+        assert asyncio.run(destroyer.kill_all()) == 1
+        assert victim.wait(5) == -signal.SIGTERM
+        assert kept.poll() is None
+        assert [proc.pid for proc, _ in destroyer.last_protected] == [kept.pid]
+        assert capsys.readouterr().out == ''
+    finally:
+        for process in (victim, kept):
+            if process.poll() is None:
+                process.kill()
+                process.wait()
@@ -0,0 +1,58 @@
+"""Tests del parser rápido de la CLI frente a argparse y de los imports del arranque"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from port_destroyer import _build_parser, _parse_args_fast
+
+AGREEING = [
+    [],
+    ['--list'],
+    ['--kill', '3000'],
+    ['--kill=3000', '--tree', '--grace', '0.5'],
+    ['--kill-all', '--ports', '3000-3010,5432', '--exclude', '3005'],
+    ['--list', '--format', 'ndjson', '--fields', 'port,pid'],
+    ['--list', '--start', '5000', '--end', '8000', '--backend', 'proc'],
+    ['--kill', '3000', '--wait-free', '--timeout', '5'],
+    ['--history', '8080', '--since', '1h'],
+    ['--find-free', '2', '--reserve', '30'],
+    ['--daemon', '--no-history', '--metrics-port', '9464'],
+    ['--watch', '--interval', '0.1', '--all-netns'],
+    ['--kill-all', '--no-policy'],
+]
+
+
+@pytest.mark.parametrize('argv', AGREEING, ids=' '.join)
+def test_fast_parser_agrees_with_argparse(argv):
+    fast = _parse_args_fast(argv)
+    assert fast is not None
+    assert vars(fast) == vars(_build_parser().parse_args(argv))
+
+
+@pytest.mark.parametrize('argv', [
+    ['--help'],
+    ['--kil', '3000'],
+    ['--kill'],
+    ['--kill', 'abc'],
+    ['--kill', '--list'],
+    ['--list=1'],
+    ['--backend', 'magic'],
+    ['--format', 'xml'],
+    ['3000'],
+])
+def test_fast_parser_defers_to_argparse(argv):
+    assert _parse_args_fast(argv) is None
+
+
+def test_start_path_skips_heavy_imports():
+    code = ("import sys, port_destroyer\n"
+            "port_destroyer._parse_args_fast(['--list', '--ports', '3000-3010'])\n"
+            "print(' '.join(sorted({'typing', 'json', 'subprocess', 'shutil', 'argparse'}"
+            " & set(sys.modules))))\n")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            check=True).stdout
+    assert output.split() == []
@@ -0,0 +1,89 @@
+"""Tests del protocolo del daemon: tramas, dueño del socket y peticiones"""
+
+import os
+import socket
+import struct
+
+import pytest
+
+from port_destroyer import PortDestroyer
+from port_destroyer_daemon import (
+    MAX_FRAME_SIZE, SnapshotDaemon, check_socket_owner, private_runtime_dir, query_daemon,
+    recv_frame, send_frame
+)
+from port_destroyer_snapshot import ListenerRecord, Snapshot
+
+from test_kill import spawn
+
+
+def test_frames_round_trip():
+    left, right = socket.socketpair()
+    with left, right:
+        send_frame(left, {'op': 'list', 'ports': '3000-3010,!3005'})
+        send_frame(left, {'op': 'ping'})
+        assert recv_frame(right) == {'op': 'list', 'ports': '3000-3010,!3005'}
+        assert recv_frame(right) == {'op': 'ping'}
+        left.close()
+        # Conexión cerrada entre tramas
+        assert recv_frame(right) is None
+
+
+def test_oversized_frames_are_rejected():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(struct.pack('>I', MAX_FRAME_SIZE + 1))
+        with pytest.raises(ValueError):
+            recv_frame(right)
+
+
+def test_runtime_dir_prefers_xdg(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert private_runtime_dir() == str(tmp_path)
+
+
+def test_socket_owner_check(tmp_path):
+    assert check_socket_owner(str(tmp_path / 'missing.sock')) is False
+
+    fake = tmp_path / 'fake.sock'
+    fake.write_text('')
+    with pytest.raises(PermissionError):
+        check_socket_owner(str(fake))
+    # El cliente no habla con un socket que no supera la comprobación
+    with pytest.raises(PermissionError):
+        query_daemon({'op': 'ping'}, str(fake))
+
+    path = str(tmp_path / 'real.sock')
+    with socket.socket(socket.AF_UNIX) as server:
+        server.bind(path)
+        assert check_socket_owner(path) is True
+
+
+def test_daemon_serves_the_published_snapshot(tmp_path):
+    destroyer = PortDestroyer(port_range='3000-3010')
+    daemon = SnapshotDaemon(destroyer, str(tmp_path / 'd.sock'), refresh_interval=None)
+    daemon.publish(Snapshot([ListenerRecord(3000, 4242, 'node', 'dev'),
+                             ListenerRecord(9000, 7, 'otro', 'dev')]))
+    daemon.start()
+    try:
+        assert query_daemon({'op': 'ping'}, daemon.socket_path)['pid'] == os.getpid()
+        response = query_daemon({'op': 'list'}, daemon.socket_path)
+        assert response['ports'] == '3000-3010'
+        assert [record['pid'] for record in response['processes']] == [4242, 7]
+        assert query_daemon({'op': 'nope'}, daemon.socket_path)['ok'] is False
+    finally:
+        daemon.stop()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/net/tcp'), reason="requiere /proc/net/tcp")
+def test_kill_response_carries_outcomes_and_messages(capsys):
+    process = spawn(listen=True)
+    destroyer = PortDestroyer(port_range=(process.port, process.port), backend='proc')
+    daemon = SnapshotDaemon(destroyer, refresh_interval=None)
+
+    response = daemon.handle_request({'op': 'kill', 'port': process.port, 'grace': 1.0})
+    process.wait(5)
+    assert response['killed'] == 1
+    assert response['outcomes'] == {str(process.pid): 'terminated'}
+    assert any(f"(PID: {process.pid})" in message for message in response['messages'])
+    # Los mensajes van al cliente, no a la salida del daemon
+    assert 'Matando' not in capsys.readouterr().out
@@ -0,0 +1,72 @@
+"""Tests de --fields y de los formatos de salida de --list"""
+
+import io
+import json
+
+import pytest
+
+from port_destroyer_format import parse_fields, write_records
+from port_destroyer_snapshot import ListenerRecord
+
+RECORDS = [ListenerRecord(3000, 4242, 'node', 'dev'),
+           ListenerRecord(5432, 812, 'postgres: main, replica', 'root', 'docker:db')]
+
+
+def write(fmt, fields, records=RECORDS):
+    out = io.StringIO()
+    count = write_records(records, out, fmt, fields)
+    return count, out.getvalue()
+
+
+def test_parse_fields():
+    assert parse_fields('port, pid,port') == ('port', 'pid')
+    assert parse_fields('netns') == ('netns',)
+    with pytest.raises(ValueError, match='uid'):
+        parse_fields('port,uid')
+    with pytest.raises(ValueError):
+        parse_fields(' , ')
+
+
+@pytest.mark.parametrize('records', [RECORDS, []])
+def test_json_is_a_single_document(records):
+    count, text = write('json', ('port', 'name'), records)
+    assert count == len(records)
+    assert json.loads(text) == [{'port': r.port, 'name': r.name} for r in records]
+
+
+def test_ndjson_writes_one_document_per_line():
+    _, text = write('ndjson', ('pid', 'netns'))
+    assert [json.loads(line) for line in text.splitlines()] == [
+        {'pid': 4242, 'netns': ''}, {'pid': 812, 'netns': 'docker:db'}]
+
+
+def test_csv_quotes_values_and_writes_the_header():
+    _, text = write('csv', ('port', 'name'))
+    assert text.splitlines() == ['port,name', '3000,node', '5432,"postgres: main, replica"']
+
+
+def test_table_has_only_the_selected_columns():
+    _, text = write('table', ('port', 'user'))
+    header, rule, first, second = text.splitlines()
+    assert header.split() == ['Puerto', 'Usuario']
+    assert first.split() == ['3000', 'dev']
+    assert second.split() == ['5432', 'root']
+
+
+def test_rows_are_written_as_records_arrive():
+    out = io.StringIO()
+    seen = []
+
+    def records():
+        yield RECORDS[0]
+        # La primera fila ya está escrita antes de pedir la segunda
+        seen.append(out.getvalue())
+        yield RECORDS[1]
+
+    write_records(records(), out, 'ndjson', ('port',))
+    assert seen == ['{"port":3000}\n']
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        write('xml', ('port',))
@@ -0,0 +1,141 @@
+"""Tests del historial: anillo, cadenas por puerto, holders_at y escritor único"""
+
+import pytest
+
+from port_destroyer_history import HistoryLog, parse_since
+from port_destroyer_ports import PortSet
+from port_destroyer_snapshot import EVENT_CLOSED, EVENT_OPENED, ListenerRecord, Snapshot
+
+
+def record(port, pid, name='node'):
+    return ListenerRecord(port, pid, name, 'dev')
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'history.log')
+
+
+def open_log(path, capacity=16, readonly=False):
+    log = HistoryLog(path, capacity=capacity, readonly=readonly)
+    log.open()
+    return log
+
+
+def events(log, port):
+    return [(entry.timestamp, entry.event, entry.record.pid) for entry in log.port_events(port)]
+
+
+def test_record_and_query_by_port(path):
+    with open_log(path) as log:
+        first = Snapshot([record(3000, 1), record(8080, 2)], taken_at=10.0)
+        second = Snapshot([record(8080, 2), record(8080, 3)], taken_at=20.0)
+        assert log.update(first) == 2
+        assert log.update(second, first) == 2
+        assert events(log, 3000) == [(20.0, 'closed', 1), (10.0, 'opened', 1)]
+        assert events(log, 8080) == [(20.0, 'opened', 3), (10.0, 'opened', 2)]
+        assert [entry.timestamp for entry in log.query(8080, since=15.0)] == [20.0]
+
+
+def test_ring_wraparound_keeps_the_newest_records(path):
+    with open_log(path, capacity=4) as log:
+        previous = Snapshot(taken_at=0.0)
+        log.update(previous)
+        for step in range(1, 6):
+            snapshot = Snapshot([record(3000, step)], taken_at=float(step))
+            log.update(snapshot, previous)
+            previous = snapshot
+        # 9 eventos en un anillo de 4: solo quedan los 4 últimos
+        assert log.written == 9
+        assert events(log, 3000) == [(5.0, 'opened', 5), (5.0, 'closed', 4),
+                                     (4.0, 'opened', 4), (4.0, 'closed', 3)]
+        assert [entry.record.pid for entry in log.holders_at(3000, 4.5)] == [4]
+
+
+def test_holders_at(path):
+    with open_log(path) as log:
+        a = Snapshot([record(3000, 1)], taken_at=10.0)
+        b = Snapshot([record(3000, 1), record(3000, 2)], taken_at=20.0)
+        c = Snapshot([record(3000, 2, 'python')], taken_at=30.0)
+        log.update(a)
+        log.update(b, a)
+        log.update(c, b)
+        assert log.holders_at(3000, 5.0) == []
+        assert [e.record.pid for e in log.holders_at(3000, 15.0)] == [1]
+        assert [e.record.pid for e in log.holders_at(3000, 25.0)] == [1, 2]
+        holders = log.holders_at(3000, 35.0)
+        assert [(e.event, e.record.name) for e in holders] == [('changed', 'python')]
+
+
+def test_holders_at_stops_once_every_holder_is_found(path, monkeypatch):
+    with open_log(path, capacity=64) as log:
+        previous = Snapshot(taken_at=0.0)
+        log.update(previous)
+        # Mucha actividad antigua en el puerto y dos titulares recientes
+        for step in range(1, 30):
+            snapshot = Snapshot([record(3000, step)], taken_at=float(step))
+            log.update(snapshot, previous)
+            previous = snapshot
+        log.update(Snapshot([record(3000, 100), record(3000, 101)], taken_at=40.0), previous)
+
+        chain = log._chain
+        visited = []
+
+        def counting_chain(port):
+            for item in chain(port):
+                visited.append(item)
+                yield item
+
+        monkeypatch.setattr(log, '_chain', counting_chain)
+        assert [e.record.pid for e in log.holders_at(3000, 100.0)] == [100, 101]
+        assert len(visited) == 2
+
+
+def test_record_initial_closes_listeners_that_vanished(path):
+    with open_log(path) as log:
+        log.update(Snapshot([record(3000, 1), record(5432, 2), record(9000, 3)], taken_at=10.0))
+    # Reinicio: el 3000 sigue, el 5432 cambió de PID y el 9000 queda fuera del escaneo
+    with open_log(path) as log:
+        restart = Snapshot([record(3000, 1), record(5432, 4)], taken_at=50.0)
+        assert log.update(restart, ports=PortSet.parse('3000-6000')) == 2
+        assert events(log, 5432) == [(50.0, 'opened', 4), (50.0, 'closed', 2),
+                                     (10.0, 'opened', 2)]
+        assert events(log, 3000) == [(10.0, 'opened', 1)]
+        assert events(log, 9000) == [(10.0, 'opened', 3)]
+
+
+def test_only_one_process_writes(path):
+    writer = open_log(path)
+    second = open_log(path)
+    try:
+        assert writer.writer and not second.writer
+        snapshot = Snapshot([record(3000, 1)], taken_at=10.0)
+        assert writer.update(snapshot) == 1
+        assert second.update(snapshot) == 0
+        assert events(second, 3000) == [(10.0, 'opened', 1)]
+
+        # Al cerrar el escritor, el segundo lo releva y reconcilia
+        writer.close()
+        later = Snapshot(taken_at=20.0)
+        assert second.update(later, snapshot) == 1
+        assert second.writer
+        assert events(second, 3000)[0] == (20.0, EVENT_CLOSED, 1)
+    finally:
+        writer.close()
+        second.close()
+
+
+def test_readonly_never_writes(path):
+    with open_log(path) as log:
+        log.update(Snapshot([record(3000, 1)], taken_at=10.0))
+    with open_log(path, readonly=True) as reader:
+        assert not reader.writer
+        assert reader.update(Snapshot(taken_at=20.0)) == 0
+        assert events(reader, 3000) == [(10.0, EVENT_OPENED, 1)]
+
+
+def test_parse_since():
+    assert parse_since('30m', now=10000.0) == 10000.0 - 1800
+    assert parse_since('2d', now=200000.0) == 200000.0 - 2 * 86400
+    with pytest.raises(ValueError):
+        parse_since('ayer')
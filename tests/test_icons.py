@@ -0,0 +1,46 @@
+"""Tests de la caché de iconos de la bandeja"""
+
+import os
+
+import pytest
+
+import port_destroyer_icons as icons
+
+
+@pytest.fixture
+def svg(tmp_path, monkeypatch):
+    monkeypatch.setattr(icons, 'ICON_CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'icon.svg'
+    path.write_text('<svg xmlns="http://www.w3.org/2000/svg"/>')
+    return path
+
+
+def test_cache_key_follows_svg_content_and_render_version(svg, monkeypatch):
+    key = icons._svg_digest(str(svg))
+    assert icons._svg_digest(str(svg)) == key
+
+    svg.write_text('<svg xmlns="http://www.w3.org/2000/svg" width="1"/>')
+    edited = icons._svg_digest(str(svg))
+    assert edited != key
+
+    monkeypatch.setattr(icons, 'ICON_RENDER_VERSION', icons.ICON_RENDER_VERSION + 1)
+    assert icons._svg_digest(str(svg)) not in (key, edited)
+
+
+def test_cached_variants_are_loaded_without_rendering(svg, monkeypatch):
+    paths = icons._variant_paths(icons._svg_digest(str(svg)), 64)
+    for path in paths.values():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+    monkeypatch.setattr(icons, '_rasterize_svg', pytest.fail)
+
+    assert icons.icon_paths(64, str(svg)) == paths
+
+
+def test_unrenderable_svg_falls_back_outside_the_svg_key(svg, monkeypatch):
+    pytest.importorskip('PIL')
+    monkeypatch.setattr(icons, '_rasterize_svg', lambda path, size: None)
+
+    paths = icons.icon_paths(32, str(svg))
+    assert paths == icons._variant_paths('fallback', 32)
+    assert all(os.path.getsize(path) > 0 for path in paths.values())
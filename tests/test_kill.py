@@ -0,0 +1,142 @@
+"""Tests del motor de kills, de --wait-free y de la expansión de árboles de --tree"""
+
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from port_destroyer import PortDestroyer
+from port_destroyer_kill import (
+    OUTCOME_KILLED, OUTCOME_NOT_FOUND, OUTCOME_TERMINATED, KillEngine, build_children_index,
+    expand_process_tree, own_ancestors, parse_ps_children
+)
+from port_destroyer_policy import Policy
+from port_destroyer_snapshot import ListenerRecord
+
+PS_OUTPUT = """\
+    1     0
+  100     1
+  200   100
+  201   100
+  300   200
+  basura
+  400
+"""
+
+# 100 -> 200 -> 300 y 100 -> 201
+TREE = {0: [1], 1: [100], 100: [200, 201], 200: [300]}
+
+
+def spawn(ignore_sigterm=False, listen=False):
+    """
+    Proceso hijo que duerme; devuelve cuando ya tiene instalado su manejador
+    (y, con `listen`, un socket en LISTEN cuyo puerto queda en `.port`)
+    """
+    code = "import signal, socket, time\n"
+    if ignore_sigterm:
+        code += "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+    if listen:
+        code += ("s = socket.socket()\ns.bind(('127.0.0.1', 0))\ns.listen()\n"
+                 "print(s.getsockname()[1], flush=True)\n")
+    else:
+        code += "print(0, flush=True)\n"
+    code += "time.sleep(60)\n"
+    process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)
+    process.port = int(process.stdout.readline())
+    return process
+
+
+def test_kill_engine_sends_sigterm_first():
+    processes = [spawn(), spawn()]
+    results = KillEngine(grace_period=2.0).terminate([p.pid for p in processes])
+    assert {result.outcome for result in results.values()} == {OUTCOME_TERMINATED}
+    for process in processes:
+        assert process.wait(5) == -signal.SIGTERM
+
+
+def test_kill_engine_escalates_to_sigkill_after_the_grace_period():
+    process = spawn(ignore_sigterm=True)
+    result = KillEngine(grace_period=0.2).terminate([process.pid])[process.pid]
+    assert result.outcome == OUTCOME_KILLED
+    assert result.elapsed >= 0.2
+    assert process.wait(5) == -signal.SIGKILL
+
+
+def test_kill_engine_reports_processes_that_already_exited():
+    process = spawn()
+    process.kill()
+    process.wait()
+    assert KillEngine().terminate([process.pid])[process.pid].outcome == OUTCOME_NOT_FOUND
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/net/tcp'), reason="requiere /proc/net/tcp")
+def test_kill_port_and_wait_returns_once_the_port_is_free():
+    process = spawn(ignore_sigterm=True, listen=True)
+    destroyer = PortDestroyer(port_range=(process.port, process.port), backend='proc',
+                              grace_period=0.1)
+    killed, elapsed = destroyer.kill_port_and_wait(process.port, timeout=5.0)
+    assert killed == 1
+    assert elapsed is not None
+    assert not destroyer.port_in_use(process.port)
+    process.wait(5)
+
+
+def test_parse_ps_children():
+    assert parse_ps_children(PS_OUTPUT) == TREE
+
+
+def test_build_children_index_from_proc(tmp_path):
+    (tmp_path / 'self').mkdir()
+    (tmp_path / 'self' / 'stat').write_text("1 (init) S 0 1 1\n")
+    for pid, ppid, name in ((1, 0, 'init'), (100, 1, 'npm run'), (200, 100, 'no) de (')):
+        (tmp_path / str(pid)).mkdir()
+        (tmp_path / str(pid) / 'stat').write_text(f"{pid} ({name}) S {ppid} {pid} {pid}\n")
+    children = build_children_index(str(tmp_path))
+    assert children == {0: [1], 1: [100], 100: [200]}
+
+
+def test_expand_process_tree_children_first():
+    order = expand_process_tree([100], TREE)
+    assert sorted(order) == [100, 200, 201, 300]
+    assert order.index(300) < order.index(200) < order.index(100)
+    assert order.index(201) < order.index(100)
+
+
+def test_expand_process_tree_never_includes_init_or_duplicates():
+    assert expand_process_tree([1, 200, 300, 200], TREE) == [300, 200]
+
+
+def test_expand_process_tree_skips_own_ancestors():
+    me = os.getpid()
+    parent = os.getppid()
+    # El listener es nuestro padre: ni él ni nosotros recibimos la señal
+    children = {1: [parent], parent: [me, 5000], 5000: [5001]}
+    assert own_ancestors(children) >= {me, parent}
+    assert expand_process_tree([parent, 5000], children) == [5001, 5000]
+
+
+def test_tree_targets_checks_descendants_against_the_policy(monkeypatch):
+    destroyer = PortDestroyer(port_range=(3000, 3999),
+                              policy=Policy.parse("deny name=postgres\n"))
+    names = {100: 'npm', 200: 'node', 201: 'postgres', 300: 'esbuild'}
+    monkeypatch.setattr(destroyer.name_cache, 'resolve_many',
+                        lambda pids: {pid: names[pid] for pid in pids if pid in names})
+    tree = {100: [200, 201], 200: [300], 201: [400]}
+    listener = ListenerRecord(3000, 100, 'npm', 'dev')
+
+    targets, protected = destroyer.tree_targets([listener], tree)
+    # 201 está protegido y lo que cuelga de él tampoco se señala
+    assert targets == [300, 200, 100]
+    assert [(record.pid, record.port) for record, _ in protected] == [(201, 3000), (400, 3000)]
+    assert protected[1][1] == "descendiente del PID protegido 201"
+
+
+def test_tree_targets_skips_pids_protected_as_listeners():
+    destroyer = PortDestroyer(port_range=(3000, 3999))
+    listener = ListenerRecord(3000, 100, 'npm', 'dev')
+    targets, protected = destroyer.tree_targets([listener], {100: [200], 200: [300]},
+                                                protected_pids={200})
+    assert targets == [100]
+    assert [record.pid for record, _ in protected] == [300]
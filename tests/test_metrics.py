@@ -0,0 +1,73 @@
+"""Tests de los histogramas, del texto de Prometheus y del endpoint /metrics"""
+
+import io
+import urllib.request
+
+from port_destroyer_metrics import Histogram, MetricsRegistry, serve_metrics, write_profile
+
+
+def test_histogram_buckets_are_upper_bounds():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 3.65
+
+
+def test_render_counters_and_histograms():
+    registry = MetricsRegistry()
+    registry.inc('port_destroyer_kills_total', outcome='terminated')
+    registry.inc('port_destroyer_kills_total', 2, outcome='killed')
+    registry.observe('port_destroyer_scan_seconds', 0.003, backend='proc')
+    registry.observe('port_destroyer_scan_seconds', 20.0, backend='proc')
+
+    lines = registry.render().splitlines()
+    assert lines[:4] == [
+        '# HELP port_destroyer_kills_total Procesos a los que se envió una señal, por resultado',
+        '# TYPE port_destroyer_kills_total counter',
+        'port_destroyer_kills_total{outcome="killed"} 2',
+        'port_destroyer_kills_total{outcome="terminated"} 1',
+    ]
+    assert '# TYPE port_destroyer_scan_seconds histogram' in lines
+    assert 'port_destroyer_scan_seconds_bucket{backend="proc",le="0.0025"} 0' in lines
+    assert 'port_destroyer_scan_seconds_bucket{backend="proc",le="0.005"} 1' in lines
+    assert 'port_destroyer_scan_seconds_bucket{backend="proc",le="10"} 1' in lines
+    assert 'port_destroyer_scan_seconds_bucket{backend="proc",le="+Inf"} 2' in lines
+    assert 'port_destroyer_scan_seconds_sum{backend="proc"} 20.003' in lines
+    assert lines[-1] == 'port_destroyer_scan_seconds_count{backend="proc"} 2'
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.inc('custom_total', command='a"b\\c\nd')
+    assert 'custom_total{command="a\\"b\\\\c\\nd"} 1' in registry.render().splitlines()
+    # Sin descripción propia, la métrica se describe con su nombre
+    assert '# HELP custom_total custom_total' in registry.render()
+
+
+def test_timer_and_profile():
+    registry = MetricsRegistry()
+    with registry.timer('port_destroyer_scan_seconds', backend='ss') as timer:
+        pass
+    registry.inc('port_destroyer_subprocesses_total', command='ss')
+    assert registry.histograms('port_destroyer_scan_seconds')[0][1].sum == timer.elapsed
+
+    out = io.StringIO()
+    write_profile(out, registry)
+    assert 'escaneo [ss]' in out.getvalue()
+    assert out.getvalue().endswith('Subprocesos: 1 (ss=1)\n')
+
+
+def test_serve_metrics_over_http():
+    registry = MetricsRegistry()
+    registry.inc('port_destroyer_tray_polls_total', result='ok')
+    server = serve_metrics(0, registry=registry)
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert response.read().decode() == registry.render()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,80 @@
+"""Tests del filtro bytecode INET_DIAG y del parser de respuestas netlink"""
+
+import struct
+
+import pytest
+
+from port_destroyer_netlink import (
+    BC_OP, DIAG_MSG_SIZE, DIAG_MSG_SPORT_OFFSET, DIAG_MSG_UID_OFFSET, INET_DIAG_BC_JMP,
+    INET_DIAG_BC_S_GE, INET_DIAG_BC_S_LE, NLMSG_DONE, NLMSGHDR, SOCK_DIAG_BY_FAMILY,
+    build_port_filter, parse_messages
+)
+
+
+def run_filter(bytecode, sport):
+    """Ejecuta el programa como inet_diag_bc_run() del kernel"""
+    position = 0
+    remaining = len(bytecode)
+    while remaining > 0:
+        code, yes, no = BC_OP.unpack_from(bytecode, position)
+        if code == INET_DIAG_BC_JMP:
+            matched = False
+        elif code == INET_DIAG_BC_S_GE:
+            matched = sport >= BC_OP.unpack_from(bytecode, position + BC_OP.size)[2]
+        elif code == INET_DIAG_BC_S_LE:
+            matched = sport <= BC_OP.unpack_from(bytecode, position + BC_OP.size)[2]
+        else:
+            raise AssertionError(f"operación inesperada {code}")
+        step = yes if matched else no
+        remaining -= step
+        position += step
+    return remaining == 0
+
+
+def audit_jumps(bytecode):
+    """Los saltos `yes` deben caer dentro del programa, como exige el kernel"""
+    position = 0
+    total = len(bytecode)
+    while position < total:
+        code, yes, no = BC_OP.unpack_from(bytecode, position)
+        assert code in (INET_DIAG_BC_JMP, INET_DIAG_BC_S_GE, INET_DIAG_BC_S_LE)
+        if code != INET_DIAG_BC_JMP:
+            assert BC_OP.size <= yes <= total - position
+        assert no % BC_OP.size == 0 and position + no <= total + BC_OP.size
+        position += BC_OP.size * (1 if code == INET_DIAG_BC_JMP else 2)
+
+
+@pytest.mark.parametrize('ranges', [
+    ((3000, 3000),),
+    ((3000, 9000),),
+    ((22, 22), (80, 80), (443, 443)),
+    ((1, 1023), (3000, 3010), (5432, 5432), (8000, 8100), (65535, 65535)),
+])
+def test_port_filter_accepts_exactly_the_ranges(ranges):
+    bytecode = build_port_filter(ranges)
+    audit_jumps(bytecode)
+    for port in range(0, 65536):
+        expected = any(start <= port <= end for start, end in ranges)
+        assert run_filter(bytecode, port) == expected, port
+
+
+def diag_message(port, uid, inode):
+    body = bytearray(DIAG_MSG_SIZE)
+    struct.pack_into('>H', body, DIAG_MSG_SPORT_OFFSET, port)
+    struct.pack_into('=LL', body, DIAG_MSG_UID_OFFSET, uid, inode)
+    return NLMSGHDR.pack(NLMSGHDR.size + len(body), SOCK_DIAG_BY_FAMILY, 0, 1, 0) + bytes(body)
+
+
+def test_parse_messages_collects_listeners_until_done():
+    data = (diag_message(3000, 1000, 111) + diag_message(8080, 0, 0)
+            + diag_message(5432, 0, 222) + NLMSGHDR.pack(NLMSGHDR.size, NLMSG_DONE, 0, 1, 0))
+    listeners = []
+    assert parse_messages(memoryview(data), listeners)
+    # Los sockets sin inodo (ya cerrados) se descartan
+    assert listeners == [(3000, 111, 1000), (5432, 222, 0)]
+
+
+def test_parse_messages_without_done_asks_for_more():
+    listeners = []
+    assert not parse_messages(memoryview(diag_message(3000, 0, 5)), listeners)
+    assert listeners == [(3000, 5, 0)]
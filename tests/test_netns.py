@@ -0,0 +1,76 @@
+"""Tests del índice de namespaces de red sobre un /proc de prueba"""
+
+import os
+
+import pytest
+
+import port_destroyer_netns
+from port_destroyer_netns import NetNamespaceIndex
+
+CONTAINER_ID = '0123456789abcdef0123'
+
+
+@pytest.fixture
+def proc_root(tmp_path, monkeypatch):
+    """
+    /proc con el namespace propio (pids self y 1), un contenedor Docker
+    (10 y 11), un namespace de `ip netns` (20) y uno anónimo (30)
+    """
+    root = tmp_path / 'proc'
+    namespaces = tmp_path / 'ns'
+    namespaces.mkdir()
+    for name in ('own', 'docker', 'named', 'anonymous'):
+        (namespaces / name).write_text('')
+
+    for pid, namespace in (('self', 'own'), ('1', 'own'), ('10', 'docker'), ('11', 'docker'),
+                           ('20', 'named'), ('30', 'anonymous')):
+        (root / pid / 'ns').mkdir(parents=True)
+        os.symlink(namespaces / namespace, root / pid / 'ns' / 'net')
+        (root / pid / 'cgroup').write_text('0::/user.slice\n')
+    (root / '10' / 'cgroup').write_text(f'0::/system.slice/docker-{CONTAINER_ID}.scope\n')
+
+    netns_dir = tmp_path / 'run-netns'
+    netns_dir.mkdir()
+    os.link(namespaces / 'named', netns_dir / 'sandbox')
+    monkeypatch.setattr(port_destroyer_netns, 'NAMED_NETNS_DIRS', (str(netns_dir),))
+    return root
+
+
+def labels(index):
+    return {namespace.pid: namespace.label for namespace in index.namespaces()}
+
+
+def test_namespaces_are_labelled_and_own_namespace_skipped(proc_root, tmp_path):
+    index = NetNamespaceIndex(str(proc_root))
+    anonymous = os.stat(tmp_path / 'ns' / 'anonymous').st_ino
+    assert labels(index) == {
+        10: f'docker:{CONTAINER_ID[:12]}',
+        20: 'netns:sandbox',
+        30: f'net:[{anonymous}]',
+    }
+
+
+def test_dead_representative_is_replaced(proc_root):
+    index = NetNamespaceIndex(str(proc_root))
+    index.namespaces()
+    (proc_root / '10' / 'ns' / 'net').unlink()
+    (proc_root / '10' / 'ns').rmdir()
+    (proc_root / '10' / 'cgroup').unlink()
+    (proc_root / '10').rmdir()
+    # La etiqueta del namespace se conserva aunque cambie su PID representativo
+    assert labels(index)[11] == f'docker:{CONTAINER_ID[:12]}'
+
+
+def test_read_all_drops_namespaces_whose_pid_changed(proc_root):
+    index = NetNamespaceIndex(str(proc_root))
+
+    def reader(namespace):
+        if namespace.pid == 20:
+            # El PID se reutiliza en otro namespace mientras se lee su tabla
+            os.unlink(proc_root / '20' / 'ns' / 'net')
+            os.symlink(proc_root / 'self' / 'ns' / 'net', proc_root / '20' / 'ns' / 'net')
+        return [namespace.pid]
+
+    results = index.read_all(reader, max_workers=1)
+    assert sorted(result for _, result in results) == [[10], [30]]
+    assert sorted(namespace.pid for namespace in index.namespaces()) == [10, 30]
@@ -0,0 +1,158 @@
+"""Tests del compilador de políticas y de su evaluación sobre cada backend"""
+
+import subprocess
+
+import pytest
+
+from port_destroyer import PortDestroyer
+from port_destroyer_policy import ALLOW, DENY, Policy, ProcessFacts
+from port_destroyer_ports import PortSet
+from port_destroyer_snapshot import ListenerRecord
+
+from test_scanners import LSOF_OUTPUT, NETSTAT_OUTPUT, SS_OUTPUT
+
+PORTS = PortSet.parse('3000-9000')
+
+# pid -> (uid real, ppid, nombre, cmdline)
+PROCESSES = {
+    4242: (1000, 4000, 'node', 'node server.js --port 3000'),
+    4000: (1000, 1, 'npm', 'npm run dev'),
+    812: (0, 1, 'postgres', '/usr/lib/postgresql/16/bin/postgres -D /var/lib/postgresql'),
+}
+USERS = {0: 'root', 1000: 'dev'}
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    """/proc falso con status, stat y cmdline de PROCESSES"""
+    (tmp_path / 'self').mkdir()
+    for pid, (uid, ppid, name, cmdline) in PROCESSES.items():
+        directory = tmp_path / str(pid)
+        directory.mkdir()
+        (directory / 'status').write_text(
+            f"Name:\t{name}\nPPid:\t{ppid}\nUid:\t{uid}\t{uid}\t{uid}\t{uid}\n")
+        (directory / 'stat').write_text(f"{pid} ({name}) S {ppid} {pid} {pid} 0 -1\n")
+        (directory / 'cmdline').write_bytes(cmdline.replace(' ', '\x00').encode() + b'\x00')
+    return str(tmp_path)
+
+
+class CountingNames:
+    """resolve_names que registra los PIDs que se le piden"""
+
+    def __init__(self):
+        self.requested = set()
+
+    def __call__(self, pids):
+        self.requested |= set(pids)
+        return {pid: PROCESSES[pid][2] for pid in pids if pid in PROCESSES}
+
+
+def listener(port, pid):
+    return ListenerRecord(port, pid, '', '')
+
+
+def facts_for(proc_root, names=None):
+    return ProcessFacts(names or CountingNames(), proc_root=proc_root,
+                        user_name=lambda uid: USERS.get(uid, str(uid)))
+
+
+def test_port_decision_table():
+    policy = Policy.parse("deny port=5432\n"
+                          "allow port=3000-3999 name=node\n"
+                          "deny port=3000-3100\n")
+    assert policy.port_decision(5432) == DENY
+    assert policy.port_decision(3000) is None
+    assert policy.port_decision(3500) is None
+    assert policy.port_decision(8080) == ALLOW
+
+
+def test_default_deny_and_first_match_wins():
+    policy = Policy.parse("default deny\nallow port=3000\ndeny port=3000\n")
+    assert policy.port_decision(3000) == ALLOW
+    assert policy.port_decision(3001) == DENY
+
+
+@pytest.mark.parametrize('text', [
+    "deny color=red\n",
+    "deny port=abc\n",
+    "deny name=\n",
+    "deny port=1 port=2\n",
+    "default maybe\n",
+])
+def test_parse_errors_name_the_line(text):
+    with pytest.raises(ValueError, match=r'^policy:2: '):
+        Policy.parse("# comentario\n" + text, 'policy')
+
+
+def test_port_only_rules_do_not_resolve_anything(proc_root):
+    names = CountingNames()
+    policy = Policy.parse("deny port=5432\n", '/etc/policy')
+    records = [listener(5432, 812), listener(3000, 4242)]
+    targets, protected = policy.split(records, facts_for(proc_root, names))
+    assert targets == [listener(3000, 4242)]
+    assert [(record.pid, reason) for record, reason in protected] == [(812, 'policy:1')]
+    assert names.requested == set()
+
+
+def test_name_parent_and_cmdline_conditions(proc_root):
+    records = [listener(3000, 4242), listener(5432, 812)]
+    for rule, protected_pid in (("deny name=postgres", 812),
+                                ("deny parent=npm", 4242),
+                                ("deny cmdline='postgresql/1[0-9]/bin'", 812)):
+        targets, protected = Policy.parse(rule).split(records, facts_for(proc_root))
+        assert [record.pid for record, _ in protected] == [protected_pid], rule
+        assert protected_pid not in [record.pid for record in targets]
+
+
+def test_pid_protected_on_one_port_is_not_killed_through_another(proc_root):
+    policy = Policy.parse("deny port=5432\n")
+    records = [listener(5432, 812), listener(5433, 812)]
+    targets, protected = policy.split(records, facts_for(proc_root))
+    assert targets == []
+    assert protected[1][1] == "PID protegido en el puerto 5432"
+
+
+def backend_records(backend, destroyer):
+    """Registros con los usuarios que produce cada backend (nombres sin resolver)"""
+    if backend == 'lsof':
+        entries, names = destroyer._parse_lsof(LSOF_OUTPUT, PORTS)
+    elif backend in ('ss', 'netstat'):
+        output = SS_OUTPUT if backend == 'ss' else NETSTAT_OUTPUT
+        entries, names = destroyer._parse_socket_table(output, PORTS)
+    else:
+        # proc y netlink dan el UID de cada socket
+        entries = {(3000, 4242): 1000, (5432, 812): 0}
+        names = {}
+    return list(destroyer.build_records(entries, frozenset(('user',)), names=names))
+
+
+@pytest.mark.parametrize('backend', ['lsof', 'ss', 'netstat', 'proc'])
+def test_user_rule_matches_records_of_every_backend(backend, proc_root):
+    destroyer = PortDestroyer(port_range=PORTS)
+    destroyer._user_names.update(USERS)
+    records = backend_records(backend, destroyer)
+    assert {record.key for record in records} == {(3000, 4242), (5432, 812)}
+
+    policy = Policy.parse("deny user=root\n")
+    targets, protected = policy.split(records, facts_for(proc_root))
+    assert [record.pid for record in targets] == [4242]
+    assert [record.pid for record, _ in protected] == [812]
+
+
+def test_user_rule_uses_ps_without_proc(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_run(argv, **kwargs):
+        calls.append(argv)
+        stdout = "  812     1 root     postgres -D /var/lib/postgresql\n 4242  4000 dev      node\n"
+        return subprocess.CompletedProcess(argv, 0, stdout, '')
+
+    monkeypatch.setattr(subprocess, 'run', fake_run)
+    facts = ProcessFacts(CountingNames(), proc_root=str(tmp_path / 'missing'))
+    records = [listener(3000, 4242), listener(5432, 812)]
+    targets, protected = Policy.parse("deny user=root\n").split(records, facts)
+    assert [record.pid for record in targets] == [4242]
+    assert [record.pid for record, _ in protected] == [812]
+    # Una sola llamada a ps para toda la tanda
+    assert len(calls) == 1 and 'pid=,ppid=,user=,command=' in calls[0]
+    assert facts.cmdline(812) == 'postgres -D /var/lib/postgresql'
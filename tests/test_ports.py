@@ -0,0 +1,69 @@
+"""Tests de PortSet: especificaciones, filtros externos y subconjuntos"""
+
+import pytest
+
+from port_destroyer_ports import MAX_PORT, MIN_PORT, PortSet
+
+
+def test_parse_ranges_and_single_ports():
+    ports = PortSet.parse('3000-3010,5432, 8000-8002')
+    assert ports.ranges == ((3000, 3010), (5432, 5432), (8000, 8002))
+    assert len(ports) == 11 + 1 + 3
+    assert 5432 in ports and 5433 not in ports
+    assert str(ports) == '3000-3010,5432,8000-8002'
+
+
+def test_parse_merges_overlapping_and_adjacent_ranges():
+    assert PortSet.parse('3000-3005,3003-3010,3011').ranges == ((3000, 3011),)
+
+
+def test_parse_exclusions():
+    ports = PortSet.parse('3000-3010,!3005', exclude='3009-3010')
+    assert ports.ranges == ((3000, 3004), (3006, 3008))
+
+
+def test_parse_only_exclusions_starts_from_all_ports():
+    ports = PortSet.parse('!22')
+    assert ports.ranges == ((MIN_PORT, 21), (23, MAX_PORT))
+
+
+@pytest.mark.parametrize('spec', ['', 'abc', '0', '65536', '3010-3000', '3000-3000,!3000'])
+def test_parse_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        PortSet.parse(spec)
+
+
+def test_coerce_accepts_tuple_spec_and_portset():
+    ports = PortSet.coerce((3000, 3005))
+    assert ports.ranges == ((3000, 3005),)
+    assert PortSet.coerce('3000-3005') == ports
+    assert PortSet.coerce(ports) is ports
+
+
+def test_filter_ranges_keeps_ranges_under_the_limit():
+    ports = PortSet.parse('1-2,10-11,20')
+    assert ports.filter_ranges(3) is ports.ranges
+
+
+def test_filter_ranges_merges_smallest_gaps_first():
+    ports = PortSet.parse('100,102,110,200,201-205,1000')
+    covering = ports.filter_ranges(3)
+    assert covering == ((100, 110), (200, 205), (1000, 1000))
+
+
+def test_filter_ranges_never_drops_a_port():
+    spec = ','.join(str(port) for port in range(1000, 2000, 7))
+    ports = PortSet.parse(spec)
+    for limit in (1, 2, 5, 32):
+        covering = ports.filter_ranges(limit)
+        assert len(covering) <= limit
+        assert ports.issubset(PortSet(covering))
+
+
+def test_issubset():
+    outer = PortSet.parse('3000-3100,5000-5010')
+    assert PortSet.parse('3000-3010,3050,5005-5010').issubset(outer)
+    assert not PortSet.parse('3095-3105').issubset(outer)
+    assert not PortSet.parse('2999').issubset(outer)
+    assert not PortSet.parse('4000').issubset(outer)
+    assert PortSet().issubset(outer)
@@ -0,0 +1,73 @@
+"""Tests de find_free_ports y de las reservas compartidas entre procesos"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from port_destroyer import PortDestroyer
+from port_destroyer_reserve import PortReservations
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'reservations')
+
+
+def test_reservations_persist_until_they_expire(path):
+    with PortReservations(path) as reservations:
+        reservations.reserve([3000, 3001], ttl=60)
+        reservations.reserve([3002], ttl=-1)
+    with PortReservations(path) as reservations:
+        assert set(reservations.active) == {3000, 3001}
+        reservations.release([3000])
+    with PortReservations(path) as reservations:
+        assert set(reservations.active) == {3001}
+    # Las caducadas y las liberadas ya no están en el fichero
+    with open(path) as f:
+        assert [line.split()[0] for line in f] == ['3001']
+
+
+def test_missing_file_without_create_means_no_reservations(path):
+    with PortReservations(path, create=False) as reservations:
+        assert reservations.active == {}
+    assert not os.path.exists(path)
+
+
+def test_symlinked_file_is_refused(path, tmp_path):
+    os.symlink(tmp_path / 'elsewhere', path)
+    with pytest.raises(PermissionError):
+        with PortReservations(path):
+            pass
+
+
+def test_reservations_are_exclusive_while_held(path):
+    entered = []
+
+    def second():
+        with PortReservations(path):
+            entered.append(time.monotonic())
+
+    with PortReservations(path):
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.2)
+        assert entered == []
+        released = time.monotonic()
+    thread.join(2)
+    assert entered and entered[0] >= released
+
+
+def test_find_free_ports_skips_listeners_and_reservations(path, monkeypatch):
+    destroyer = PortDestroyer(port_range='3000-3005')
+    monkeypatch.setattr(destroyer, 'listening_ports', lambda ports: {3000, 3002})
+
+    assert destroyer.find_free_ports(2, reservations_path=path) == [3001, 3003]
+    # Sin reserva, la misma llamada devuelve lo mismo
+    assert destroyer.find_free_ports(2, reservations_path=path) == [3001, 3003]
+
+    assert destroyer.find_free_ports(2, reserve_ttl=60, reservations_path=path) == [3001, 3003]
+    assert destroyer.find_free_ports(3, reserve_ttl=60, reservations_path=path) == [3004, 3005]
+    # Si no hay bastantes, no se reserva ninguno
+    assert destroyer.find_free_ports(1, '3004-3005', reservations_path=path) == [3004]
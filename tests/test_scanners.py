@@ -0,0 +1,134 @@
+"""Tests de los parsers de lsof, ss, netstat, /proc/net/tcp y ps, y del índice de inodos"""
+
+import os
+import shutil
+
+import pytest
+
+from port_destroyer import PortDestroyer, ProcessNameCache, SocketInodeIndex
+from port_destroyer_ports import PortSet
+
+LSOF_OUTPUT = """\
+COMMAND     PID USER   FD   TYPE             DEVICE SIZE/OFF NODE NAME
+node       4242 dev    23u  IPv4 0x8d2a1c3e7f1b2a01      0t0  TCP *:3000 (LISTEN)
+node       4242 dev    24u  IPv6 0x8d2a1c3e7f1b2a02      0t0  TCP [::1]:3000 (LISTEN)
+postgres    812 root    7u  IPv4 0x8d2a1c3e7f1b2a03      0t0  TCP 127.0.0.1:5432 (LISTEN)
+sshd         99 root    3u  IPv4 0x8d2a1c3e7f1b2a04      0t0  TCP *:22 (LISTEN)
+"""
+
+SS_OUTPUT = """\
+State  Recv-Q Send-Q Local Address:Port  Peer Address:Port Process
+LISTEN 0      511          0.0.0.0:3000       0.0.0.0:*     users:(("node",pid=4242,fd=23))
+LISTEN 0      511             [::]:3000          [::]:*     users:(("node",pid=4242,fd=24))
+LISTEN 0      244        127.0.0.1:5432       0.0.0.0:*     users:(("postgres",pid=812,fd=7))
+LISTEN 0      128          0.0.0.0:22         0.0.0.0:*     users:(("sshd",pid=99,fd=3))
+LISTEN 0      128          0.0.0.0:8080       0.0.0.0:*
+"""
+
+NETSTAT_OUTPUT = """\
+Active Internet connections (only servers)
+Proto Recv-Q Send-Q Local Address           Foreign Address         State       PID/Program name
+tcp        0      0 0.0.0.0:3000            0.0.0.0:*               LISTEN      4242/node
+tcp6       0      0 :::3000                 :::*                    LISTEN      4242/node
+tcp        0      0 127.0.0.1:5432          0.0.0.0:*               LISTEN      812/postgres
+tcp        0      0 0.0.0.0:22              0.0.0.0:*               LISTEN      99/sshd
+tcp        0      0 0.0.0.0:8080            0.0.0.0:*               LISTEN      -
+"""
+
+PROC_NET_TCP = """\
+  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 00000000:0BB8 00000000:0000 0A 00000000:00000000 00:00000000 00000000  1000        0 5001 1
+   1: 0100007F:1538 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 5002 1
+   2: 0100007F:0BB8 0100007F:D431 01 00000000:00000000 00:00000000 00000000  1000        0 5003 1
+   3: 00000000:0016 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 5004 1
+   4: 00000000:1F90 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 0 1
+"""
+
+PORTS = PortSet.parse('3000-9000')
+
+
+@pytest.fixture
+def destroyer():
+    return PortDestroyer(port_range=PORTS)
+
+
+def test_parse_lsof(destroyer):
+    entries, names = destroyer._parse_lsof(LSOF_OUTPUT, PORTS)
+    assert entries == {(3000, 4242): 'dev', (5432, 812): 'root'}
+    assert names == {4242: 'node', 812: 'postgres'}
+
+
+def test_parse_ss(destroyer):
+    entries, names = destroyer._parse_socket_table(SS_OUTPUT, PORTS)
+    # Sin la columna Process (otro usuario, sin permisos) no hay PID
+    assert entries == {(3000, 4242): '', (5432, 812): ''}
+    assert names == {}
+
+
+def test_parse_netstat(destroyer):
+    entries, _ = destroyer._parse_socket_table(NETSTAT_OUTPUT, PORTS)
+    assert entries == {(3000, 4242): '', (5432, 812): ''}
+
+
+def test_read_proc_listeners(destroyer, tmp_path):
+    path = tmp_path / 'tcp'
+    path.write_text(PROC_NET_TCP)
+    listeners = destroyer.read_proc_listeners(PORTS, files=[str(path), str(tmp_path / 'tcp6')])
+    # Solo LISTEN, dentro de la selección y con inodo
+    assert listeners == [(3000, 5001, 1000), (5432, 5002, 0)]
+
+
+def test_read_proc_listeners_applies_the_bitmap(destroyer, tmp_path):
+    path = tmp_path / 'tcp'
+    path.write_text(PROC_NET_TCP)
+    listeners = destroyer.read_proc_listeners(PortSet.parse('1-9000,!5432'), files=[str(path)])
+    assert [port for port, _, _ in listeners] == [3000, 22]
+
+
+def fake_process(proc_root, pid, sockets):
+    fd_dir = proc_root / str(pid) / 'fd'
+    fd_dir.mkdir(parents=True)
+    for fd, inode in sockets.items():
+        os.symlink(f'socket:[{inode}]', fd_dir / str(fd))
+    os.symlink('/dev/null', fd_dir / '0')
+
+
+def test_socket_inode_index_follows_processes(tmp_path):
+    fake_process(tmp_path, 100, {3: 5001})
+    fake_process(tmp_path, 200, {4: 5002, 5: 5003})
+    (tmp_path / 'self').mkdir()
+    index = SocketInodeIndex(proc_root=str(tmp_path))
+
+    assert index.lookup({5001, 5002}) == {5001: 100, 5002: 200}
+
+    # Un proceso que termina deja de ser dueño; uno nuevo se encuentra
+    shutil.rmtree(tmp_path / '200')
+    fake_process(tmp_path, 300, {7: 5002})
+    assert index.lookup({5001, 5002, 5003}) == {5001: 100, 5002: 300}
+    assert index.stats['refreshes'] == 1
+
+
+def test_parse_ps_names():
+    output = "  4242 node\n   812 postgres: main\nbasura\n"
+    names = ProcessNameCache.parse_ps(output, [4242, 812, 7])
+    assert names == {4242: 'node', 812: 'postgres: main', 7: 'PID-7'}
+
+
+def test_explicit_backend_must_be_registered():
+    assert PortDestroyer(port_range=PORTS, backend='ss').resolve_backend() == 'ss'
+    with pytest.raises(ValueError):
+        PortDestroyer(port_range=PORTS, backend='nope').resolve_backend()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/net/tcp'), reason="requiere /proc/net/tcp")
+def test_listener_fingerprint_follows_ports_and_inodes(monkeypatch):
+    destroyer = PortDestroyer(port_range=PORTS, backend='proc')
+    listeners = [(3000, 5001, 1000), (5432, 5002, 0)]
+    monkeypatch.setattr(destroyer, 'read_proc_listeners', lambda ports: listeners)
+
+    first = destroyer.listener_fingerprint()
+    listeners = listeners[::-1]
+    assert destroyer.listener_fingerprint() == first
+    # Un socket recreado en el mismo puerto tiene otro inodo
+    listeners = [(3000, 5009, 1000), (5432, 5002, 0)]
+    assert destroyer.listener_fingerprint() != first
@@ -0,0 +1,49 @@
+"""Tests de ListenerRecord y Snapshot.diff"""
+
+import pytest
+
+from port_destroyer_snapshot import ListenerRecord, Snapshot
+
+
+def record(port, pid, name='node', user='dev'):
+    return ListenerRecord(port, pid, name, user)
+
+
+def test_record_fields_and_dict_round_trip():
+    item = ListenerRecord(3000, 1, 'node', 'dev')
+    assert item.netns == '' and item.key == (3000, 1)
+    assert item['name'] == 'node'
+    assert ListenerRecord.from_dict(item.to_dict()) == item
+    # Sin __dict__: un registro ocupa lo que su tupla
+    with pytest.raises(AttributeError):
+        item.extra = 1
+
+
+def test_records_are_sorted_and_deduplicated_by_key():
+    snapshot = Snapshot([record(8080, 2), record(3000, 1), record(8080, 2, 'python')])
+    assert [r.key for r in snapshot] == [(3000, 1), (8080, 2)]
+    assert snapshot.get((8080, 2)).name == 'python'
+
+
+def test_diff_added_removed_changed():
+    before = Snapshot([record(3000, 1), record(5432, 2), record(8080, 3)])
+    after = Snapshot([record(3000, 1), record(8080, 3, 'python'), record(9000, 4)])
+    diff = after.diff(before)
+    assert diff.added == (record(9000, 4),)
+    assert diff.removed == (record(5432, 2),)
+    assert diff.changed == (record(8080, 3, 'python'),)
+    assert diff.summary() == '+1 -1 ~1'
+
+
+def test_diff_without_changes_is_false():
+    before = Snapshot([record(3000, 1)])
+    assert not Snapshot([record(3000, 1)]).diff(before)
+    assert not before.diff(before)
+
+
+def test_diff_against_none_adds_everything():
+    snapshot = Snapshot([record(3000, 1), record(3001, 2)])
+    diff = snapshot.diff(None)
+    assert diff.added == snapshot.records
+    assert diff.removed == () and diff.changed == ()
+
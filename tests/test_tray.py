@@ -0,0 +1,170 @@
+"""
+Tests de la bandeja: sondeo por huella con backoff y menús incrementales.
+
+La bandeja se importa con un Gtk/AppIndicator3 mínimo en lugar de gi, así
+que solo se prueba la lógica propia (sondeo y diffs del menú), no el
+toolkit.
+"""
+
+import importlib
+import platform
+import sys
+import threading
+import time
+import types
+from unittest import mock
+
+import pytest
+
+from port_destroyer_snapshot import ListenerRecord, Snapshot
+
+
+class FakeMenuItem:
+    def __init__(self, label=''):
+        self.label = label
+        self.visible = True
+
+    def set_label(self, label):
+        self.label = label
+
+    def set_visible(self, visible):
+        self.visible = visible
+
+    def set_sensitive(self, sensitive):
+        pass
+
+    def connect(self, signal, callback):
+        pass
+
+    def show(self):
+        pass
+
+    def destroy(self):
+        pass
+
+
+class FakeMenu:
+    def __init__(self):
+        self.children = []
+
+    def append(self, widget):
+        self.children.append(widget)
+
+    def insert(self, widget, position):
+        self.children.insert(position, widget)
+
+    def remove(self, widget):
+        self.children.remove(widget)
+
+    def show_all(self):
+        pass
+
+
+@pytest.fixture
+def tray_module(monkeypatch):
+    if platform.system() != 'Linux':
+        pytest.skip("la bandeja de Linux solo se importa en Linux")
+    gi = types.ModuleType('gi')
+    gi.require_version = lambda name, version: None
+    repository = types.ModuleType('gi.repository')
+    repository.Gtk = types.SimpleNamespace(Menu=FakeMenu, MenuItem=FakeMenuItem,
+                                           SeparatorMenuItem=FakeMenuItem)
+    repository.AppIndicator3 = mock.MagicMock()
+    repository.GLib = mock.MagicMock()
+    gi.repository = repository
+    monkeypatch.setitem(sys.modules, 'gi', gi)
+    monkeypatch.setitem(sys.modules, 'gi.repository', repository)
+    monkeypatch.delitem(sys.modules, 'port_destroyer_tray', raising=False)
+
+    module = importlib.import_module('port_destroyer_tray')
+    monkeypatch.setattr(module, 'icon_paths', lambda size: {False: 'green.png', True: 'red.png'})
+    yield module
+    sys.modules.pop('port_destroyer_tray', None)
+
+
+def make_tray(module, **kwargs):
+    return module.PortDestroyerTray(ports='3000-3010', serve=False, history=False, **kwargs)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "la condición no se cumplió a tiempo"
+        time.sleep(0.005)
+
+
+def test_polling_backs_off_until_the_fingerprint_changes(tray_module):
+    tray = make_tray(tray_module, min_interval=0.01, max_interval=0.04)
+    fingerprint = [1]
+    scans = []
+
+    def snapshot():
+        scans.append(fingerprint[0])
+        return Snapshot([ListenerRecord(3000, 100 + fingerprint[0], 'node', 'dev')])
+
+    tray.destroyer.listener_fingerprint = lambda: fingerprint[0]
+    tray.destroyer.snapshot = snapshot
+    thread = threading.Thread(target=tray.update_processes, daemon=True)
+    thread.start()
+    try:
+        # Sin cambios solo se mira la huella y el intervalo crece hasta el máximo
+        wait_until(lambda: tray.update_interval == 0.04)
+        assert scans == [1]
+
+        fingerprint[0] = 2
+        wait_until(lambda: scans == [1, 2])
+        wait_until(lambda: [record.pid for record in tray.snapshot] == [102])
+    finally:
+        tray.stop_event.set()
+        tray.wake_event.set()
+        thread.join(2)
+
+
+def menu_labels(tray):
+    """Etiquetas de las entradas de procesos, en el orden del menú GTK"""
+    items = set(map(id, tray.process_items.values()))
+    return [widget.label for widget in tray.menu.children if id(widget) in items]
+
+
+def test_linux_menu_applies_only_the_diff(tray_module):
+    tray = make_tray(tray_module)
+    tray.update_linux_menu(Snapshot([ListenerRecord(3000, 10, 'node', 'dev'),
+                                     ListenerRecord(3005, 20, 'vite', 'dev')]))
+    kept = tray.process_items[(3005, 20)]
+
+    tray.update_linux_menu(Snapshot([ListenerRecord(3002, 30, 'api', 'dev'),
+                                     ListenerRecord(3005, 20, 'vite-dev', 'dev')]))
+    # La entrada que sigue se reutiliza y la nueva queda en su sitio
+    assert tray.process_items[(3005, 20)] is kept
+    assert menu_labels(tray) == ["Puerto 3002: api (PID: 30)",
+                                 "Puerto 3005: vite-dev (PID: 20)"]
+    assert tray.title_item.label == "2 procesos activos"
+    assert not tray.no_proc_item.visible
+
+    tray.update_linux_menu(Snapshot())
+    assert menu_labels(tray) == []
+    assert tray.no_proc_item.visible and not tray.kill_all_item.visible
+
+
+def test_macos_menu_reuses_items(tray_module, monkeypatch):
+    # Los métodos de macOS solo usan MenuItem y Menu.SEPARATOR de pystray
+    monkeypatch.setattr(tray_module, 'item', lambda text, action, **kwargs: (text, action),
+                        raising=False)
+    monkeypatch.setattr(tray_module, 'pystray',
+                        types.SimpleNamespace(Menu=types.SimpleNamespace(SEPARATOR='-')),
+                        raising=False)
+    tray = make_tray(tray_module)
+    tray._init_macos()
+
+    assert tray.update_macos_menu(Snapshot([ListenerRecord(3000, 10, 'node', 'dev')]))
+    first = tray._macos_items[(3000, 10)]
+    assert not tray.update_macos_menu(Snapshot([ListenerRecord(3000, 10, 'node', 'dev')]))
+    assert tray.update_macos_menu(Snapshot([ListenerRecord(3000, 10, 'next', 'dev'),
+                                            ListenerRecord(3001, 11, 'api', 'dev')]))
+
+    assert tray._macos_items[(3000, 10)] is first
+    # Las etiquetas dinámicas se leen al pintar el menú
+    labels = [entry[0](None) for entry in tray.create_macos_menu()
+              if isinstance(entry, tuple) and callable(entry[0])]
+    assert labels == ["2 procesos activos", "Puerto 3000: next (PID: 10)",
+                      "Puerto 3001: api (PID: 11)"]
@@ -0,0 +1,63 @@
+"""Tests de --watch: eventos de los diffs, sondeo por huella y salida NDJSON"""
+
+import json
+import types
+
+from port_destroyer import PortDestroyer, stream_watch
+from port_destroyer_snapshot import (
+    EVENT_CHANGED, EVENT_CLOSED, EVENT_OPENED, ListenerRecord, Snapshot, diff_events
+)
+
+
+def record(port, pid, name='node', user='dev'):
+    return ListenerRecord(port, pid, name, user)
+
+
+def test_diff_events_order_and_first_seen():
+    first_seen = {}
+    opened = Snapshot([record(3000, 1), record(3001, 2)], taken_at=10.0)
+    events = list(diff_events(opened.diff(None), 10.0, first_seen))
+    assert [e.event for e in events] == [EVENT_OPENED, EVENT_OPENED]
+    assert first_seen == {(3000, 1): 10.0, (3001, 2): 10.0}
+
+    later = Snapshot([record(3001, 2, 'python'), record(4000, 3)], taken_at=25.0)
+    events = list(diff_events(later.diff(opened), 25.0, first_seen))
+    assert [(e.event, e.record.key) for e in events] == [
+        (EVENT_CLOSED, (3000, 1)), (EVENT_CHANGED, (3001, 2)), (EVENT_OPENED, (4000, 3))]
+    closed = events[0]
+    assert closed.first_seen == 10.0
+    assert closed.to_dict()['duration'] == 15.0
+    assert events[1].first_seen == 10.0
+    assert (3000, 1) not in first_seen and first_seen[(4000, 3)] == 25.0
+
+
+def test_watch_scans_only_when_the_fingerprint_changes(monkeypatch):
+    destroyer = PortDestroyer(port_range=(3000, 3010))
+    fingerprints = iter([1, 1, 2])
+    snapshots = iter([Snapshot([record(3000, 1)], taken_at=1.0),
+                      Snapshot([record(3000, 1), record(3001, 2)], taken_at=3.0)])
+    scans = []
+
+    def snapshot():
+        scans.append(1)
+        return next(snapshots)
+
+    monkeypatch.setattr(destroyer, 'listener_fingerprint', lambda: next(fingerprints))
+    monkeypatch.setattr(destroyer, 'snapshot', snapshot)
+    events = destroyer.watch(interval=0)
+
+    assert (next(events).event, len(scans)) == (EVENT_OPENED, 1)
+    # El segundo sondeo ve la misma huella y no escanea
+    event = next(events)
+    assert (event.event, event.record.key, len(scans)) == (EVENT_OPENED, (3001, 2), 2)
+
+
+def test_stream_watch_writes_one_json_line_per_event(capsys):
+    opened = Snapshot([record(3000, 1), record(3001, 2)], taken_at=5.0)
+    events = list(diff_events(opened.diff(None), 5.0, {}))
+    stream_watch(types.SimpleNamespace(watch=lambda interval: iter(events)), 0.1)
+
+    lines = capsys.readouterr().out.splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [(row['event'], row['port'], row['pid']) for row in rows] == [
+        ('opened', 3000, 1), ('opened', 3001, 2)]